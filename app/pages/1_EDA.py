@@ -4,8 +4,10 @@ import pandas as pd
 import streamlit as st
 
 from src.config import PATHS
-from src.components.plotting import plot_rating_distribution, plot_top_restaurants_by_reviews
+from src.components.plotting import rating_histogram_image, top_restaurants_image
 from src.components.ui_helpers import render_kpis
+from src.eda_aggregates import SAMPLE_COLUMNS, load_eda_aggregates, reviews_at_least, sample_reviews, top_restaurants
+from src.review_store import read_reviews, review_files
 import traceback
 
 
@@ -14,12 +16,20 @@ def _ensure_file(p):
         raise FileNotFoundError(f"Required file not found: {p}")
 
 
-@st.cache_data(show_spinner="Loading dataset...")
-def load_data():
-    """Load cleaned reviews and restaurant profiles with caching."""
-    df_clean = pd.read_parquet(PATHS.CLEAN_PARQUET)
-    profiles = pd.read_parquet(PATHS.PROFILES_PARQUET)
-    return df_clean, profiles
+SAMPLE_ROWS = 25
+
+
+# Keyed on the file's mtime so a rebuild is picked up without a restart
+@st.cache_data(show_spinner="Loading dataset...", max_entries=2)
+def load_data(mtime_ns):
+    """Load the precomputed EDA aggregates (their size does not grow with the review count)."""
+    return load_eda_aggregates(PATHS.EDA_AGGREGATES)
+
+
+@st.cache_data(show_spinner="Loading reviews...", max_entries=4)
+def load_reviews(min_rating, files_stamp):
+    """Every review rated at least ``min_rating``; row groups below it are skipped."""
+    return read_reviews(columns=SAMPLE_COLUMNS, min_rating=min_rating)
 
 
 def main():
@@ -28,10 +38,9 @@ def main():
 
     # Load data
     try:
-        _ensure_file(PATHS.CLEAN_PARQUET)
-        _ensure_file(PATHS.PROFILES_PARQUET)
+        _ensure_file(PATHS.EDA_AGGREGATES)
         with st.spinner("Loading data..."):
-            df_clean, profiles = load_data()
+            aggregates = load_data(PATHS.EDA_AGGREGATES.stat().st_mtime_ns)
     except FileNotFoundError:
         st.info("Processed data missing — attempting to build pipeline now. This may take a few minutes.")
         try:
@@ -42,7 +51,7 @@ def main():
 
             # Re-load after building
             with st.spinner("Loading data..."):
-                df_clean, profiles = load_data()
+                aggregates = load_data(PATHS.EDA_AGGREGATES.stat().st_mtime_ns)
             st.success("Pipeline built and data loaded.")
         except Exception as e:
             st.error("Failed to build pipeline automatically. Run `python -m src.pipeline_build` locally and try again.")
@@ -59,9 +68,9 @@ def main():
 
     # Key metrics
     st.header("📈 Key Metrics")
-    avg_rating = float(profiles["avg_rating"].mean())
-    num_restaurants = int(profiles.shape[0])
-    total_reviews = int(df_clean.shape[0])
+    avg_rating = float(aggregates["mean_restaurant_rating"] or 0.0)
+    num_restaurants = int(aggregates["num_restaurants"])
+    total_reviews = int(aggregates["total_reviews"])
 
     render_kpis(avg_rating, num_restaurants, total_reviews)
 
@@ -73,19 +82,23 @@ def main():
         st.subheader("Sample Reviews")
         # Add filter for rating
         min_rating = st.slider("Filter by minimum rating", 1.0, 5.0, 1.0, 0.5)
-        filtered_df = df_clean[df_clean["Rating"] >= min_rating]
-        st.dataframe(
-            filtered_df.head(25)[["Restaurant", "Reviewer", "Review", "Rating", "Time"]],
-            width='stretch'
-        )
-        st.caption(f"Showing {len(filtered_df.head(25))} of {len(filtered_df)} reviews (filtered by rating ≥ {min_rating})")
+        n_filtered = reviews_at_least(aggregates, min_rating)
+        if st.checkbox("Load all matching reviews", help="Reads the review table; the default view is a precomputed random sample."):
+            # appended part files change the key, so a delta build is picked up
+            stamp = tuple(p.stat().st_mtime_ns for p in review_files(PATHS.CLEAN_PARQUET))
+            sample = load_reviews(min_rating, stamp)
+        else:
+            sample = sample_reviews(aggregates, min_rating, n=SAMPLE_ROWS)
+        st.dataframe(sample, width='stretch')
+        st.caption(f"Showing {len(sample)} of {n_filtered} reviews (filtered by rating ≥ {min_rating})")
 
     with col2:
         st.subheader("Data Summary")
         st.metric("Total Reviews", f"{total_reviews:,}")
         st.metric("Unique Restaurants", f"{num_restaurants:,}")
         st.metric("Avg Reviews per Restaurant", f"{total_reviews / num_restaurants:.1f}")
-        st.metric("Date Range", f"{df_clean['Time'].min().date()} to {df_clean['Time'].max().date()}")
+        first, last = pd.Timestamp(aggregates["date_min"]), pd.Timestamp(aggregates["date_max"])
+        st.metric("Date Range", f"{first.date()} to {last.date()}")
 
     # Visualizations
     st.header("📊 Visualizations")
@@ -93,15 +106,16 @@ def main():
 
     with col1:
         st.subheader("Rating Distribution")
-        fig = plot_rating_distribution(df_clean)
-        st.pyplot(fig)
+        histogram = aggregates["rating_histogram"]
+        st.image(rating_histogram_image(
+            histogram["counts"], histogram["edges"], aggregates["mean_rating"], version=aggregates["data_version"]
+        ))
         st.caption("Distribution of customer ratings across all reviews.")
 
     with col2:
         st.subheader("Top Restaurants by Reviews")
         top_n = st.slider("Number of restaurants to show", 5, 20, 15)
-        fig = plot_top_restaurants_by_reviews(profiles, top_n=top_n)
-        st.pyplot(fig)
+        st.image(top_restaurants_image(top_restaurants(aggregates, top_n), top_n=top_n, version=aggregates["data_version"]))
         st.caption(f"Most reviewed restaurants (top {top_n}).")
 
 
@@ -3,8 +3,10 @@ from __future__ import annotations
 import pandas as pd
 import streamlit as st
 
-from src.config import CFG, PATHS
-from src.recommender import load_model, recommend_from_preferences, recommend_similar_restaurants
+from src.ann import load_ivf_index, load_pq_index
+from src.config import CFG
+from src.generations import artifacts_for
+from src.recommender import artifact_version, load_model, load_neighbors, recommend_from_preferences, recommend_similar_restaurants
 from src.components.ui_helpers import render_reco_table
 import traceback
 
@@ -14,18 +16,40 @@ def _ensure_file(p):
         raise FileNotFoundError(f"Required file not found: {p}")
 
 
-@st.cache_data(show_spinner="Loading processed data...")
-def load_processed():
-    """Load restaurant profiles and corpus with caching."""
-    profiles = pd.read_parquet(PATHS.PROFILES_PARQUET)
-    corpus = pd.read_parquet(PATHS.CORPUS_PARQUET)
-    return profiles, corpus
+# Loaders are keyed on the published artifact generation: a new build is picked up on
+# the next rerun, and the previous entry keeps serving until the new one has loaded.
+# Profiles are a cached resource, not cached data: the recommender engine is reused only
+# while it is handed the same profiles object, and st.cache_data returns a copy per rerun.
+@st.cache_resource(show_spinner="Loading processed data...", max_entries=2)
+def load_processed(generation):
+    """Load restaurant profiles with caching (shared, treat as read-only)."""
+    return pd.read_parquet(artifacts_for(generation).profiles)
 
 
-@st.cache_resource(show_spinner="Loading ML models...")
-def load_artifacts():
+@st.cache_resource(show_spinner="Loading ML models...", max_entries=2)
+def load_artifacts(generation):
     """Load TF-IDF models and index with caching."""
-    return load_model(PATHS.TFIDF_VECTORIZER, PATHS.TFIDF_MATRIX, PATHS.RESTAURANT_INDEX)
+    artifacts = artifacts_for(generation)
+    return load_model(artifacts.tfidf_dir, artifacts.restaurant_index)
+
+
+@st.cache_resource(show_spinner="Loading neighbor table...", max_entries=2)
+def load_neighbor_table(generation):
+    """Load the precomputed top-K neighbor table (None if not built yet)."""
+    artifacts = artifacts_for(generation)
+    return load_neighbors(artifacts.neighbor_ids, artifacts.neighbor_scores)
+
+
+@st.cache_resource(show_spinner="Loading ANN index...", max_entries=2)
+def load_ann_index(generation):
+    """Load the approximate retrieval index when CFG.USE_ANN is on (None otherwise or if not built)."""
+    return load_ivf_index(artifacts_for(generation).ann_dir) if CFG.USE_ANN else None
+
+
+@st.cache_resource(show_spinner="Loading compact PQ index...", max_entries=2)
+def load_compact_index(generation):
+    """Load the product-quantized first-stage index when CFG.USE_PQ is on (None otherwise or if not built)."""
+    return load_pq_index(artifacts_for(generation).ann_dir) if CFG.USE_PQ else None
 
 
 def main():
@@ -34,14 +58,17 @@ def main():
 
     # Load data with explicit checks and clearer errors
     try:
-        _ensure_file(PATHS.PROFILES_PARQUET)
-        _ensure_file(PATHS.CORPUS_PARQUET)
-        _ensure_file(PATHS.TFIDF_VECTORIZER)
-        _ensure_file(PATHS.TFIDF_MATRIX)
-        _ensure_file(PATHS.RESTAURANT_INDEX)
-
-        profiles, corpus = load_processed()
-        vectorizer, tfidf_matrix, index = load_artifacts()
+        generation = artifact_version()
+        artifacts = artifacts_for(generation)
+        _ensure_file(artifacts.profiles)
+        _ensure_file(artifacts.tfidf_dir)
+        _ensure_file(artifacts.restaurant_index)
+
+        profiles = load_processed(generation)
+        vectorizer, tfidf_matrix, index = load_artifacts(generation)
+        neighbors = load_neighbor_table(generation)
+        ann = load_ann_index(generation)
+        pq = load_compact_index(generation)
     except FileNotFoundError:
         # Attempt to build pipeline automatically if artifacts are missing
         st.info("Required artifacts missing — attempting to build pipeline now. This may take a few minutes.")
@@ -52,8 +79,12 @@ def main():
                 build_pipeline()
 
             # Re-run load after building
-            profiles, corpus = load_processed()
-            vectorizer, tfidf_matrix, index = load_artifacts()
+            generation = artifact_version()
+            profiles = load_processed(generation)
+            vectorizer, tfidf_matrix, index = load_artifacts(generation)
+            neighbors = load_neighbor_table(generation)
+            ann = load_ann_index(generation)
+            pq = load_compact_index(generation)
             st.success("Pipeline built and artifacts are now available.")
         except Exception as e:
             st.error("Failed to build pipeline automatically. Check logs and try running `python -m src.pipeline_build` locally.")
@@ -107,7 +138,9 @@ def main():
         if st.button("🔍 Get Recommendations", type="primary", use_container_width=True):
             with st.spinner("Finding similar restaurants..."):
                 try:
-                    recs = recommend_similar_restaurants(seed, profiles, tfidf_matrix, index, top_n=top_n)
+                    recs = recommend_similar_restaurants(
+                        seed, profiles, tfidf_matrix, index, top_n=top_n, neighbors=neighbors, ann=ann, pq=pq
+                    )
                     if recs:
                         out = pd.DataFrame([r.__dict__ for r in recs])
                         st.success(f"✅ Found {len(recs)} restaurants similar to **{seed}**")
@@ -146,7 +179,9 @@ def main():
 
             with st.spinner("Analyzing your preferences..."):
                 try:
-                    recs = recommend_from_preferences(user_text, profiles, vectorizer, tfidf_matrix, index, top_n=top_n)
+                    recs = recommend_from_preferences(
+                        user_text, profiles, vectorizer, tfidf_matrix, index, top_n=top_n, ann=ann, pq=pq
+                    )
                     if recs:
                         out = pd.DataFrame([r.__dict__ for r in recs])
                         st.success(f"✅ Found {len(recs)} restaurants matching your preferences")
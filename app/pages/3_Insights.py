@@ -1,11 +1,10 @@
 from __future__ import annotations
 
-import numpy as np
-import pandas as pd
 import streamlit as st
 
-from src.config import PATHS
-from src.recommender import load_model
+from src.config import CFG
+from src.generations import artifacts_for
+from src.recommender import artifact_version, load_model, top_terms
 import traceback
 
 
@@ -14,16 +13,12 @@ def _ensure_file(p):
         raise FileNotFoundError(f"Required file not found: {p}")
 
 
-@st.cache_data(show_spinner="Loading corpus data...")
-def load_corpus():
-    """Load restaurant review corpus with caching."""
-    return pd.read_parquet(PATHS.CORPUS_PARQUET)
-
-
-@st.cache_resource(show_spinner="Loading ML models...")
-def load_artifacts():
+# Keyed on the published artifact generation so a new build is picked up without a restart
+@st.cache_resource(show_spinner="Loading ML models...", max_entries=2)
+def load_artifacts(generation):
     """Load TF-IDF models and index with caching."""
-    return load_model(PATHS.TFIDF_VECTORIZER, PATHS.TFIDF_MATRIX, PATHS.RESTAURANT_INDEX)
+    artifacts = artifacts_for(generation)
+    return load_model(artifacts.tfidf_dir, artifacts.restaurant_index)
 
 
 def main():
@@ -32,23 +27,22 @@ def main():
 
     # Load data
     try:
-        _ensure_file(PATHS.CORPUS_PARQUET)
-        _ensure_file(PATHS.TFIDF_VECTORIZER)
-        _ensure_file(PATHS.TFIDF_MATRIX)
-        _ensure_file(PATHS.RESTAURANT_INDEX)
+        generation = artifact_version()
+        artifacts = artifacts_for(generation)
+        _ensure_file(artifacts.tfidf_dir)
+        _ensure_file(artifacts.restaurant_index)
 
-        corpus_df = load_corpus()
-        vectorizer, tfidf_matrix, index = load_artifacts()
+        vectorizer, tfidf_matrix, index = load_artifacts(generation)
     except FileNotFoundError:
-        st.info("Corpus or model artifacts missing — attempting to build pipeline now. This may take a few minutes.")
+        st.info("Model artifacts missing — attempting to build pipeline now. This may take a few minutes.")
         try:
             from src.pipeline_build import main as build_pipeline
 
             with st.spinner("Building data pipeline and training TF-IDF..."):
                 build_pipeline()
 
-            corpus_df = load_corpus()
-            vectorizer, tfidf_matrix, index = load_artifacts()
+            generation = artifact_version()
+            vectorizer, tfidf_matrix, index = load_artifacts(generation)
             st.success("Pipeline built and artifacts are now available.")
         except Exception as e:
             st.error("Failed to build pipeline automatically. Run `python -m src.pipeline_build` locally and try again.")
@@ -57,14 +51,14 @@ def main():
             st.text(traceback.format_exc())
             return
     except Exception as e:
-        st.error("Failed to load corpus or model artifacts for Insights.")
+        st.error("Failed to load model artifacts for Insights.")
         st.exception(e)
         st.text("Full traceback:")
         st.text(traceback.format_exc())
         return
 
     # Restaurant selection
-    restaurant_list = sorted([r for r in corpus_df["Restaurant"].astype(str).unique() if r in index])
+    restaurant_list = sorted(index)
     if not restaurant_list:
         st.error("No restaurants available for analysis.")
         return
@@ -77,32 +71,23 @@ def main():
     )
 
     if selected_restaurant:
-        # Get TF-IDF vector
-        row = index[selected_restaurant]
-        vec = tfidf_matrix[row].toarray().ravel()
-        feature_names = np.array(vectorizer.get_feature_names_out())
-
         # Settings
         col1, col2 = st.columns([1, 2])
         with col1:
             top_k = st.slider(
                 "Number of top keywords to show",
                 min_value=5,
-                max_value=30,
+                max_value=CFG.INSIGHTS_MAX_TERMS,
                 value=15,
                 step=5,
                 help="How many keywords to display"
             )
 
-        # Calculate top keywords
-        top_idx = np.argsort(vec)[::-1][:top_k]
-        keywords = pd.DataFrame({
-            "keyword": feature_names[top_idx],
-            "tfidf_weight": vec[top_idx],
-        }).sort_values("tfidf_weight", ascending=False)
+        # Top keywords, ranked from the row's nonzeros of the already loaded matrix
+        keywords = top_terms(selected_restaurant, vectorizer, tfidf_matrix, index, k=top_k)
 
         with col2:
-            st.metric("Vocabulary Size", f"{len(feature_names):,}")
+            st.metric("Vocabulary Size", f"{vectorizer.n_features:,}")
             st.metric("Selected Restaurant", selected_restaurant)
 
         # Display results
@@ -145,6 +130,7 @@ def main():
                 ax.axis('off')
                 ax.set_title(f"Word Cloud for {selected_restaurant}", fontsize=16)
                 st.pyplot(fig)
+                plt.close(fig)
             except ImportError:
                 st.info("Install 'wordcloud' package for word cloud visualization: `pip install wordcloud`")
 
@@ -0,0 +1,63 @@
+"""
+Cold import time of the modules each entry point loads, each in a fresh interpreter,
+and a check that the serving modules stay free of sklearn/matplotlib.
+
+    python -m benchmarks.bench_imports --runs 5 --max-seconds 1.0
+
+Exits non-zero when a serving module pulls in a heavy dependency or any module's
+median import time exceeds ``--max-seconds``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# module -> heavy dependencies it must not import
+MODULES = {
+    "src.recommender": ("sklearn", "matplotlib"),
+    "src.service": ("sklearn", "matplotlib"),
+    "src.shared_serving": ("sklearn", "matplotlib"),
+    "src.components.plotting": ("matplotlib",),
+    "src.pipeline_build": ("matplotlib",),
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module)], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (median is reported).")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Fail if a median import exceeds this.")
+    args = parser.parse_args()
+
+    failures = []
+    for module, forbidden in MODULES.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        median = statistics.median(r["seconds"] for r in runs)
+        heavy_roots = sorted({m.split(".")[0] for r in runs for m in r["modules"] if m.split(".")[0] in forbidden})
+        print(f"{module:26s} {median * 1000:7.1f} ms  heavy={heavy_roots or '-'}")
+        if heavy_roots:
+            failures.append(f"{module} imports {', '.join(heavy_roots)}")
+        if args.max_seconds is not None and median > args.max_seconds:
+            failures.append(f"{module} took {median:.3f}s > {args.max_seconds:.3f}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compare the row-wise `re` cleaning used before with the vectorized pyarrow path.
+
+    python -m benchmarks.bench_preprocessing --repeat 20
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import pandas as pd
+
+from src.config import PATHS
+from src.preprocessing import _clean_text, _parse_metadata, clean_text_series, parse_metadata_series
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def _rowwise_metadata(meta: pd.Series) -> pd.DataFrame:
+    parsed = meta.map(_parse_metadata)
+    return pd.DataFrame({
+        "reviewer_total_reviews": parsed.map(lambda x: x[0]),
+        "reviewer_followers": parsed.map(lambda x: x[1]),
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20, help="How many copies of the raw CSV to stack.")
+    args = parser.parse_args()
+
+    raw = pd.read_csv(PATHS.RAW_CSV)
+    reviews = pd.concat([raw["Review"].astype(str)] * args.repeat, ignore_index=True)
+    meta = pd.concat([raw["Metadata"]] * args.repeat, ignore_index=True)
+    print(f"rows={len(reviews):,}")
+
+    old_text, t_old_text = _timed(lambda s: s.map(_clean_text), reviews)
+    new_text, t_new_text = _timed(clean_text_series, reviews)
+    assert old_text.equals(new_text), "text cleaning differs"
+    print(f"clean_text:    rowwise {t_old_text:.3f}s | vectorized {t_new_text:.3f}s | x{t_old_text / t_new_text:.1f}")
+
+    old_meta, t_old_meta = _timed(_rowwise_metadata, meta)
+    new_meta, t_new_meta = _timed(parse_metadata_series, meta)
+    for col in old_meta.columns:
+        assert old_meta[col].astype("Int32").equals(new_meta[col]), f"{col} differs"
+    print(f"metadata:      rowwise {t_old_meta:.3f}s | vectorized {t_new_meta:.3f}s | x{t_old_meta / t_new_meta:.1f}")
+
+
+if __name__ == "__main__":
+    main()
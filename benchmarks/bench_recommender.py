@@ -0,0 +1,244 @@
+"""
+End-to-end recommender benchmark on a synthetic dataset of configurable size.
+
+Runs pipeline_build on a scratch copy of the repo, then measures in fresh processes:
+stage times, train_tfidf time, artifact size, load time, single-query and batch latency
+percentiles for both recommend functions, and peak RSS of each phase.
+
+    python -m benchmarks.bench_recommender --output results.json
+    python -m benchmarks.bench_recommender --restaurants 5000 --reviews 40 --vocab 50000
+    python -m benchmarks.bench_recommender --update-baseline   # after an intended change
+
+Results are compared with ``benchmarks/baseline.json`` when it was recorded with the
+same dataset settings; the exit code is 1 if any metric regressed beyond ``--tolerance``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE = Path(__file__).with_name("baseline.json")
+
+# Differences below these (per unit suffix) are noise, whatever the ratio
+_NOISE_FLOOR = {"_s": 0.05, "_ms": 0.5, "_mb": 5.0, "_bytes": 0.0, "_qps": 0.0}
+
+
+def _peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 1e6
+
+
+def _percentiles(name: str, seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000.0
+    return {f"{name}.p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in (50, 90, 99)}
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _run_phase(phase: str, work: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one measurement phase in a fresh interpreter so its peak RSS is its own."""
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_recommender", "--phase", phase, "--work", str(work),
+        "--queries", str(args.queries), "--batch-size", str(args.batch_size), "--top-n", str(args.top_n),
+        "--vocab", str(args.vocab),
+    ]
+    out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def phase_build(work: Path) -> Dict[str, Any]:
+    """pipeline_build from scratch on the scratch tree; stage times come from its manifest."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "src.pipeline_build"], cwd=work, capture_output=True, check=True)
+    metrics: Dict[str, Any] = {"pipeline.total_s": round(time.perf_counter() - start, 3)}
+    manifest = json.loads((work / "data" / "processed" / "build_manifest.json").read_text(encoding="utf-8"))
+    for name, stage in manifest["stages"].items():
+        metrics[f"pipeline.{name}_s"] = stage["seconds"]
+    metrics["pipeline.peak_rss_mb"] = round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1)
+    metrics["artifacts.size_bytes"] = _dir_bytes((work / "models" / "current").resolve())
+    return metrics
+
+
+def phase_train(work: Path) -> Dict[str, Any]:
+    import pandas as pd
+
+    from src.recommender import train_tfidf
+
+    corpus = pd.read_parquet(work / "data" / "processed" / "restaurant_review_corpus.parquet")
+    start = time.perf_counter()
+    train_tfidf(corpus)
+    return {"train_tfidf_s": round(time.perf_counter() - start, 3), "train.peak_rss_mb": round(_peak_rss_mb(), 1)}
+
+
+def phase_serve(work: Path, n_queries: int, batch_size: int, top_n: int, vocab: int) -> Dict[str, Any]:
+    import pandas as pd
+
+    from benchmarks.synthetic import make_queries
+    from src import recommender as reco
+    from src.generations import current_artifacts
+
+    start = time.perf_counter()
+    artifacts = current_artifacts(work / "models")
+    vectorizer, tfidf_matrix, index = reco.load_model(artifacts.tfidf_dir, artifacts.restaurant_index)
+    profiles = pd.read_parquet(artifacts.profiles)
+    neighbors = reco.load_neighbors(artifacts.neighbor_ids, artifacts.neighbor_scores)
+    metrics: Dict[str, Any] = {"load_s": round(time.perf_counter() - start, 3)}
+
+    queries = make_queries(n_queries, vocab_size=vocab)
+    seeds = list(index)[: n_queries]
+
+    def cold() -> None:
+        # measure scoring, not the result caches
+        reco._RESULTS.clear()
+        reco._QUERY_VECTORS.clear()
+
+    # first call builds the engine (normalized vectors, inverted index); report it separately
+    start = time.perf_counter()
+    reco.recommend_from_preferences(queries[0], profiles, vectorizer, tfidf_matrix, index, top_n=top_n)
+    metrics["engine_build_s"] = round(time.perf_counter() - start, 3)
+
+    timings = []
+    for query in queries:
+        cold()
+        start = time.perf_counter()
+        reco.recommend_from_preferences(query, profiles, vectorizer, tfidf_matrix, index, top_n=top_n)
+        timings.append(time.perf_counter() - start)
+    metrics.update(_percentiles("preferences", timings))
+
+    for name, table in (("similar", None), ("similar_neighbors", neighbors)):
+        timings = []
+        for seed in seeds:
+            cold()
+            start = time.perf_counter()
+            reco.recommend_similar_restaurants(seed, profiles, tfidf_matrix, index, top_n=top_n, neighbors=table)
+            timings.append(time.perf_counter() - start)
+        metrics.update(_percentiles(name, timings))
+
+    timings = []
+    for i in range(0, len(queries), batch_size):
+        cold()
+        start = time.perf_counter()
+        reco.recommend_from_preferences_batch(queries[i:i + batch_size], profiles, vectorizer, tfidf_matrix, index, top_n=top_n)
+        timings.append(time.perf_counter() - start)
+    metrics.update(_percentiles("preferences_batch", timings))
+    metrics["preferences_batch.throughput_qps"] = round(len(queries) / sum(timings), 1)
+    metrics["serve.peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return metrics
+
+
+def compare(metrics: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Metrics worse than the baseline by more than ``tolerance`` (relative) and the noise floor."""
+    regressions = []
+    for name, base in baseline.items():
+        if name not in metrics or not base:
+            continue
+        value = metrics[name]
+        floor = next((f for suffix, f in _NOISE_FLOOR.items() if name.endswith(suffix)), 0.0)
+        higher_is_better = name.endswith("_qps")
+        worse = base - value if higher_is_better else value - base
+        if worse > tolerance * base and worse > floor:
+            regressions.append(f"{name}: {base} -> {value} ({worse / base:+.0%})")
+    return regressions
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.synthetic import make_reviews
+
+    with tempfile.TemporaryDirectory(prefix="reco-bench-") as tmp:
+        work = Path(tmp)
+        shutil.copytree(ROOT / "src", work / "src", ignore=shutil.ignore_patterns("__pycache__"))
+        raw_dir = work / "data" / "raw"
+        raw_dir.mkdir(parents=True)
+        reviews = make_reviews(args.restaurants, args.reviews, args.vocab, seed=args.seed)
+        reviews.to_csv(raw_dir / "Restaurant reviews.csv", index=False)
+        del reviews
+
+        metrics = phase_build(work)
+        metrics.update(_run_phase("train", work, args))
+        metrics.update(_run_phase("serve", work, args))
+
+    return {
+        "config": {
+            "restaurants": args.restaurants,
+            "reviews_per_restaurant": args.reviews,
+            "vocab": args.vocab,
+            "seed": args.seed,
+            "queries": args.queries,
+            "batch_size": args.batch_size,
+            "top_n": args.top_n,
+        },
+        "env": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+        },
+        "metrics": metrics,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=500)
+    parser.add_argument("--reviews", type=int, default=20, help="Reviews per restaurant.")
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200, help="Queries (and seed restaurants) to time.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON results here.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative slowdown per metric.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--phase", choices=["train", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--work", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == "train":
+        print(json.dumps(phase_train(args.work)))
+        return
+    if args.phase == "serve":
+        print(json.dumps(phase_serve(args.work, args.queries, args.batch_size, args.top_n, args.vocab)))
+        return
+
+    results = run(args)
+    for name, value in results["metrics"].items():
+        print(f"{name:34s} {value}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print("No baseline to compare against (run with --update-baseline).")
+        return
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline["config"] != results["config"]:
+        print("Baseline was recorded with different settings; skipping comparison.")
+        return
+    regressions = compare(results["metrics"], baseline["metrics"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Synthetic review datasets in the raw CSV schema, sized restaurants × reviews × vocabulary.
+
+    python -m benchmarks.synthetic --restaurants 2000 --reviews 50 --vocab 20000 --out /tmp/reviews.csv
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_CONSONANTS = list("bcdfghjklmnprstvz")
+_VOWELS = list("aeiou")
+# Share of a review's words drawn from the restaurant's own "cuisine" terms
+_TOPIC_SHARE = 0.3
+_TOPIC_WORDS = 40
+
+
+def make_vocabulary(size: int, seed: int = 0) -> np.ndarray:
+    """``size`` distinct pronounceable words (2-4 syllables)."""
+    rng = np.random.default_rng(seed)
+    words: dict = {}
+    while len(words) < size:
+        syllables = rng.integers(2, 5)
+        word = "".join(rng.choice(_CONSONANTS) + rng.choice(_VOWELS) for _ in range(syllables))
+        words.setdefault(word, None)
+    return np.array(list(words), dtype=object)
+
+
+def make_reviews(
+    n_restaurants: int = 500,
+    reviews_per_restaurant: int = 20,
+    vocab_size: int = 5000,
+    words_per_review: int = 40,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Reviews with Zipf-distributed words plus a per-restaurant topic, so similarity
+    search has structure to find. Columns match ``data/raw/Restaurant reviews.csv``.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = make_vocabulary(vocab_size, seed)
+    weights = 1.0 / np.arange(1, vocab_size + 1) ** 1.1
+    weights /= weights.sum()
+
+    n = n_restaurants * reviews_per_restaurant
+    restaurant_ids = np.repeat(np.arange(n_restaurants), reviews_per_restaurant)
+    topics = rng.integers(0, vocab_size, size=(n_restaurants, _TOPIC_WORDS))
+    lengths = rng.integers(max(1, words_per_review // 4), words_per_review * 2, size=n)
+
+    reviews = []
+    for i in range(n):
+        n_topic = int(lengths[i] * _TOPIC_SHARE)
+        ids = np.concatenate([
+            rng.choice(vocab_size, size=lengths[i] - n_topic, p=weights),
+            rng.choice(topics[restaurant_ids[i]], size=n_topic),
+        ])
+        reviews.append(" ".join(vocab[ids]))
+
+    quality = rng.uniform(2.0, 5.0, size=n_restaurants)
+    ratings = np.clip(np.round(rng.normal(quality[restaurant_ids], 0.8)), 1, 5).astype(int)
+    times = pd.Timestamp("2016-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365 * 24 * 60, size=n), unit="min")
+    return pd.DataFrame({
+        "Restaurant": [f"Restaurant {r:05d}" for r in restaurant_ids],
+        "Reviewer": [f"Reviewer {r}" for r in rng.integers(0, max(1, n // 3), size=n)],
+        "Review": reviews,
+        "Rating": ratings.astype(str),
+        "Metadata": [f"{a} Reviews , {b} Followers" for a, b in zip(rng.integers(1, 500, size=n), rng.integers(0, 2000, size=n))],
+        "Time": times.strftime("%m/%d/%Y %H:%M"),
+        "Pictures": rng.integers(0, 5, size=n),
+    })
+
+
+def make_queries(n: int, vocab_size: int = 5000, words: int = 4, seed: int = 1) -> list:
+    """Free-text preference queries over the same vocabulary."""
+    rng = np.random.default_rng(seed)
+    vocab = make_vocabulary(vocab_size, 0)
+    weights = 1.0 / np.arange(1, vocab_size + 1) ** 1.1
+    weights /= weights.sum()
+    return [" ".join(vocab[rng.choice(vocab_size, size=words, p=weights)]) for _ in range(n)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=500)
+    parser.add_argument("--reviews", type=int, default=20, help="Reviews per restaurant.")
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    df = make_reviews(args.restaurants, args.reviews, args.vocab, seed=args.seed)
+    df.to_csv(args.out, index=False)
+    print(f"Wrote {len(df):,} reviews to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .artifacts import save_npy
+from .config import CFG
+from .utils import ensure_dir, get_logger, read_json, write_json
+
+logger = get_logger(__name__)
+
+
+ANN_FORMAT_VERSION = 1
+
+_META = "meta.json"
+_COMPONENTS = "components_t.npy"
+_EMBEDDINGS = "embeddings.npy"
+_CENTROIDS = "centroids.npy"
+_LIST_PTR = "list_ptr.npy"
+_LIST_IDS = "list_ids.npy"
+_PQ_META = "pq_meta.json"
+_PQ_CODEBOOKS = "pq_codebooks.npy"
+_PQ_CODES = "pq_codes.npy"
+_PQ_PROJ_TERMS = "pq_projection_terms.npy"
+_PQ_PROJ_ROWS = "pq_projection_rows.npy"
+_PQ_PROJ_SCALES = "pq_projection_scales.npy"
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norms > 0, norms, 1.0)
+
+
+def _top_desc(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def embed_queries(components_t: np.ndarray, q_matrix: sparse.csr_matrix) -> np.ndarray:
+    """Project TF-IDF query rows into the SVD embedding space (one L2-normalized row per query)."""
+    q_matrix = sparse.csr_matrix(q_matrix)
+    # Gather only the query terms' rows: a plain sparse @ dense product would
+    # upcast the whole (n_terms x dims) float32 projection to float64 per call.
+    weighted = components_t[q_matrix.indices] * q_matrix.data[:, None].astype(np.float32)
+    query_of_nnz = np.repeat(np.arange(q_matrix.shape[0]), np.diff(q_matrix.indptr))
+    summed = np.zeros((q_matrix.shape[0], components_t.shape[1]), dtype=np.float32)
+    np.add.at(summed, query_of_nnz, weighted)
+    return _l2_normalize(summed)
+
+
+def fit_svd_embeddings(
+    tfidf_matrix: sparse.csr_matrix,
+    n_components: int = CFG.ANN_COMPONENTS,
+    random_state: int = CFG.RANDOM_STATE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    TruncatedSVD of the TF-IDF matrix. Returns the (n_terms x dims) float32 projection
+    and the L2-normalized float32 restaurant embeddings.
+    """
+    from sklearn.decomposition import TruncatedSVD
+
+    n_rows, n_terms = tfidf_matrix.shape
+    n_components = max(1, min(int(n_components), n_rows - 1, n_terms - 1))
+    svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+    svd.fit(tfidf_matrix)
+    components_t = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+    embeddings = _l2_normalize(np.asarray(tfidf_matrix @ components_t, dtype=np.float32))
+    logger.info(
+        "Fitted SVD embeddings: rows=%d | dims=%d | explained_variance=%.3f",
+        n_rows,
+        n_components,
+        float(svd.explained_variance_ratio_.sum()),
+    )
+    return components_t, embeddings
+
+
+class IVFIndex:
+    """
+    Inverted-file index over SVD-reduced TF-IDF rows.
+
+    Restaurants are embedded as L2-normalized float32 vectors (``tfidf @ components_t``)
+    and bucketed by spherical k-means. A query probes the ``nprobe`` buckets whose
+    centroids score highest and ranks only their members by inner product, so
+    cost follows bucket size rather than catalog size.
+
+    List ``j`` holds matrix rows ``list_ids[list_ptr[j]:list_ptr[j + 1]]``.
+    """
+
+    def __init__(
+        self,
+        components_t: np.ndarray,
+        embeddings: np.ndarray,
+        centroids: np.ndarray,
+        list_ptr: np.ndarray,
+        list_ids: np.ndarray,
+    ) -> None:
+        self.components_t = components_t
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self.list_ptr = list_ptr
+        self.list_ids = list_ids
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def embed(self, q_matrix: sparse.csr_matrix) -> np.ndarray:
+        return embed_queries(self.components_t, q_matrix)
+
+    def probe(self, query: np.ndarray, nprobe: int = CFG.ANN_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """All members of the ``nprobe`` lists nearest to ``query``, with their embedding similarity."""
+        lists = _top_desc(self.centroids @ query, max(1, nprobe))
+        rows = np.concatenate([self.list_ids[self.list_ptr[j]:self.list_ptr[j + 1]] for j in lists])
+        return rows, self.embeddings[rows] @ query
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = CFG.ANN_NPROBE) -> np.ndarray:
+        """Matrix rows of the ``k`` most similar members of the probed lists, best first."""
+        rows, sims = self.probe(query, nprobe)
+        return rows[_top_desc(sims, k)]
+
+
+def kmeans(
+    x: np.ndarray,
+    n_clusters: int,
+    n_iter: int = CFG.ANN_KMEANS_ITERS,
+    random_state: int = CFG.RANDOM_STATE,
+    spherical: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lloyd's k-means; ``spherical=True`` clusters by cosine on the unit sphere and
+    returns L2-normalized centroids. Returns (centroids, labels). Empty clusters are
+    re-seeded with the points worst served by their centroid.
+    """
+    rng = np.random.default_rng(random_state)
+    n_clusters = max(1, min(int(n_clusters), len(x)))
+    centroids = np.array(x[rng.choice(len(x), size=n_clusters, replace=False)], dtype=np.float32)
+
+    def assign(c: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if spherical:
+            sims = x @ c.T
+        else:
+            # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+            sims = x @ c.T - 0.5 * (c * c).sum(axis=1)
+        labels = sims.argmax(axis=1)
+        return labels, sims[np.arange(len(x)), labels]
+
+    labels = np.full(len(x), -1, dtype=np.int64)
+    for _ in range(n_iter):
+        new_labels, best = assign(centroids)
+        counts = np.bincount(new_labels, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, new_labels, x)
+
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            worst = np.argsort(best, kind="stable")[: len(empty)]
+            sums[empty] = x[worst]
+            counts[empty] = 1
+        centroids = _l2_normalize(sums) if spherical else sums / counts[:, None]
+        centroids = centroids.astype(np.float32)
+
+        if np.array_equal(new_labels, labels) and not len(empty):
+            break
+        labels = new_labels
+
+    return centroids, assign(centroids)[0]
+
+
+def build_ivf_index(
+    components_t: np.ndarray,
+    embeddings: np.ndarray,
+    n_lists: int = CFG.ANN_LISTS,
+    random_state: int = CFG.RANDOM_STATE,
+) -> IVFIndex:
+    """
+    Bucket SVD embeddings (from :func:`fit_svd_embeddings`) with spherical k-means.
+    ``n_lists=0`` picks about sqrt(n_rows) lists.
+    """
+    n_lists = int(n_lists) or int(round(np.sqrt(len(embeddings))))
+    centroids, labels = kmeans(embeddings, n_lists, random_state=random_state, spherical=True)
+
+    list_ids = np.argsort(labels, kind="stable").astype(np.int32)
+    list_ptr = np.zeros(len(centroids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=len(centroids)), out=list_ptr[1:])
+
+    logger.info("Built IVF index: rows=%d | lists=%d", len(embeddings), len(centroids))
+    return IVFIndex(components_t, embeddings, centroids, list_ptr, list_ids)
+
+
+class QuantizedProjection:
+    """
+    Compact SVD projection for embedding text queries: only the terms carrying most
+    of the projection's mass are kept (rare terms barely move the embedding), each
+    as an int8 row with a float32 scale. Dropped terms contribute nothing.
+    """
+
+    def __init__(self, terms: np.ndarray, rows: np.ndarray, scales: np.ndarray) -> None:
+        self.terms = terms  # sorted term ids that were kept
+        self.rows = rows  # (n_kept, dims) int8
+        self.scales = scales  # (n_kept,) float32
+
+    @property
+    def dims(self) -> int:
+        return self.rows.shape[1]
+
+    def embed(self, q_matrix: sparse.csr_matrix) -> np.ndarray:
+        q_matrix = sparse.csr_matrix(q_matrix)
+        pos = np.searchsorted(self.terms, q_matrix.indices)
+        pos = np.minimum(pos, len(self.terms) - 1)
+        kept = self.terms[pos] == q_matrix.indices
+        query_of_nnz = np.repeat(np.arange(q_matrix.shape[0]), np.diff(q_matrix.indptr))[kept]
+        weights = (q_matrix.data[kept] * self.scales[pos[kept]]).astype(np.float32)
+        summed = np.zeros((q_matrix.shape[0], self.dims), dtype=np.float32)
+        np.add.at(summed, query_of_nnz, self.rows[pos[kept]] * weights[:, None])
+        return _l2_normalize(summed)
+
+
+def quantize_projection(components_t: np.ndarray, keep_mass: float = CFG.PQ_PROJECTION_MASS) -> QuantizedProjection:
+    """Keep the highest-norm projection rows covering ``keep_mass`` of the squared norm, as int8."""
+    energy = np.einsum("ij,ij->i", components_t, components_t, dtype=np.float64)
+    order = np.argsort(-energy, kind="stable")
+    n_keep = int(np.searchsorted(np.cumsum(energy[order]), keep_mass * energy.sum())) + 1
+    terms = np.sort(order[: min(n_keep, len(order))]).astype(np.int32)
+
+    kept = components_t[terms]
+    scales = np.abs(kept).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    rows = np.round(kept / scales[:, None]).astype(np.int8)
+    return QuantizedProjection(terms, rows, scales.astype(np.float32))
+
+
+class PQIndex:
+    """
+    Product-quantized restaurant embeddings: each vector is split into ``n_subspaces``
+    chunks and every chunk is stored as the uint8 id of its nearest codebook entry,
+    so a restaurant costs ``n_subspaces`` bytes instead of its sparse TF-IDF row.
+
+    Queries are scored by asymmetric distance computation: one (n_subspaces x 256)
+    table of query-chunk . codeword inner products, then a table gather + sum per
+    restaurant.
+    """
+
+    def __init__(self, projection: QuantizedProjection, codebooks: np.ndarray, codes: np.ndarray) -> None:
+        self.projection = projection
+        self.codebooks = codebooks  # (n_subspaces, n_codewords, sub_dims)
+        self.codes = codes  # (n_rows, n_subspaces) uint8
+        self._subspaces = np.arange(codebooks.shape[0])
+
+    def embed(self, q_matrix: sparse.csr_matrix) -> np.ndarray:
+        return self.projection.embed(q_matrix)
+
+    def _split(self, query: np.ndarray) -> np.ndarray:
+        n_sub, _, sub_dims = self.codebooks.shape
+        padded = np.zeros(n_sub * sub_dims, dtype=np.float32)
+        padded[: len(query)] = query
+        return padded.reshape(n_sub, sub_dims)
+
+    def lookup_tables(self, query: np.ndarray) -> np.ndarray:
+        """(n_subspaces x n_codewords) inner products of the query chunks with every codeword."""
+        return np.einsum("mkd,md->mk", self.codebooks, self._split(query))
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate inner product of ``query`` with every restaurant embedding."""
+        return self.lookup_tables(query)[self._subspaces, self.codes].sum(axis=1)
+
+    def decode(self, row: int) -> np.ndarray:
+        """Reconstructed, L2-normalized embedding of matrix row ``row``."""
+        n_sub, _, sub_dims = self.codebooks.shape
+        vector = self.codebooks[self._subspaces, self.codes[row]].reshape(n_sub * sub_dims)
+        return _l2_normalize(vector[: self.projection.dims])
+
+
+def build_pq_index(
+    components_t: np.ndarray,
+    embeddings: np.ndarray,
+    n_subspaces: int = CFG.PQ_SUBSPACES,
+    n_codewords: int = 256,
+    random_state: int = CFG.RANDOM_STATE,
+) -> PQIndex:
+    """Train one k-means codebook per embedding chunk and encode every restaurant."""
+    n_rows, dims = embeddings.shape
+    n_subspaces = max(1, min(int(n_subspaces), dims))
+    sub_dims = -(-dims // n_subspaces)
+    padded = np.zeros((n_rows, n_subspaces * sub_dims), dtype=np.float32)
+    padded[:, :dims] = embeddings
+
+    n_codewords = max(1, min(int(n_codewords), 256, n_rows))
+    codebooks = np.zeros((n_subspaces, n_codewords, sub_dims), dtype=np.float32)
+    codes = np.empty((n_rows, n_subspaces), dtype=np.uint8)
+    for m in range(n_subspaces):
+        chunk = np.ascontiguousarray(padded[:, m * sub_dims:(m + 1) * sub_dims])
+        centroids, labels = kmeans(chunk, n_codewords, random_state=random_state + m)
+        codebooks[m, : len(centroids)] = centroids
+        codes[:, m] = labels
+
+    projection = quantize_projection(components_t)
+    logger.info(
+        "Built PQ index: rows=%d | subspaces=%d | codewords=%d | projection terms=%d/%d",
+        n_rows,
+        n_subspaces,
+        n_codewords,
+        len(projection.terms),
+        len(components_t),
+    )
+    return PQIndex(projection, codebooks, codes)
+
+
+def save_ivf_index(ann: IVFIndex, ann_dir: Path) -> None:
+    ensure_dir(ann_dir)
+    save_npy(ann_dir / _COMPONENTS, ann.components_t)
+    save_npy(ann_dir / _EMBEDDINGS, ann.embeddings)
+    save_npy(ann_dir / _CENTROIDS, ann.centroids)
+    save_npy(ann_dir / _LIST_PTR, ann.list_ptr)
+    save_npy(ann_dir / _LIST_IDS, ann.list_ids)
+    write_json(
+        ann_dir / _META,
+        {
+            "format_version": ANN_FORMAT_VERSION,
+            "rows": int(ann.embeddings.shape[0]),
+            "dims": int(ann.embeddings.shape[1]),
+            "lists": ann.n_lists,
+        },
+    )
+
+
+def load_ivf_index(ann_dir: Path, mmap_mode: str | None = "r") -> IVFIndex | None:
+    """Memory-map an index written by :func:`save_ivf_index`, or None if it has not been built."""
+    ann_dir = Path(ann_dir)
+    if not (ann_dir / _META).exists():
+        return None
+    meta = read_json(ann_dir / _META)
+    if meta.get("format_version") != ANN_FORMAT_VERSION:
+        raise ValueError(f"Unsupported ANN index format version {meta.get('format_version')} in {ann_dir}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(ann_dir / name, mmap_mode=mmap_mode)
+
+    return IVFIndex(load(_COMPONENTS), load(_EMBEDDINGS), load(_CENTROIDS), load(_LIST_PTR), load(_LIST_IDS))
+
+
+def save_pq_index(pq: PQIndex, ann_dir: Path) -> None:
+    ensure_dir(ann_dir)
+    save_npy(ann_dir / _PQ_PROJ_TERMS, pq.projection.terms)
+    save_npy(ann_dir / _PQ_PROJ_ROWS, pq.projection.rows)
+    save_npy(ann_dir / _PQ_PROJ_SCALES, pq.projection.scales)
+    save_npy(ann_dir / _PQ_CODEBOOKS, pq.codebooks)
+    save_npy(ann_dir / _PQ_CODES, pq.codes)
+    write_json(
+        ann_dir / _PQ_META,
+        {
+            "format_version": ANN_FORMAT_VERSION,
+            "rows": int(pq.codes.shape[0]),
+            "subspaces": int(pq.codebooks.shape[0]),
+            "codewords": int(pq.codebooks.shape[1]),
+        },
+    )
+
+
+def load_pq_index(ann_dir: Path, mmap_mode: str | None = "r") -> PQIndex | None:
+    """Memory-map a PQ index written by :func:`save_pq_index`, or None if it has not been built."""
+    ann_dir = Path(ann_dir)
+    if not (ann_dir / _PQ_META).exists():
+        return None
+    meta = read_json(ann_dir / _PQ_META)
+    if meta.get("format_version") != ANN_FORMAT_VERSION:
+        raise ValueError(f"Unsupported PQ index format version {meta.get('format_version')} in {ann_dir}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(ann_dir / name, mmap_mode=mmap_mode)
+
+    projection = QuantizedProjection(load(_PQ_PROJ_TERMS), load(_PQ_PROJ_ROWS), load(_PQ_PROJ_SCALES))
+    return PQIndex(projection, load(_PQ_CODEBOOKS), load(_PQ_CODES))
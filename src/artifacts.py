@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import bisect
+import os
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .utils import ensure_dir, get_logger, read_json, write_json
+
+logger = get_logger(__name__)
+
+
+# Bump when the on-disk layout changes; load_model refuses unknown versions.
+FORMAT_VERSION = 1
+
+_META = "meta.json"
+_MATRIX_DATA = "matrix_data.npy"
+_MATRIX_INDICES = "matrix_indices.npy"
+_MATRIX_INDPTR = "matrix_indptr.npy"
+_VOCAB_TERMS = "vocab_terms.npy"
+_VOCAB_OFFSETS = "vocab_offsets.npy"
+_IDF = "idf.npy"
+
+# TfidfVectorizer settings needed to rebuild its analyzer and weighting at load time
+_VECTORIZER_PARAMS = (
+    "lowercase",
+    "strip_accents",
+    "stop_words",
+    "token_pattern",
+    "ngram_range",
+    "analyzer",
+    "binary",
+    "norm",
+    "sublinear_tf",
+)
+
+
+def _strip_accents_unicode(s: str) -> str:
+    try:
+        s.encode("ASCII", errors="strict")
+        return s
+    except UnicodeEncodeError:
+        return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+
+def _strip_accents_ascii(s: str) -> str:
+    return unicodedata.normalize("NFKD", s).encode("ASCII", "ignore").decode("ASCII")
+
+
+_STRIP_ACCENTS = {None: None, "unicode": _strip_accents_unicode, "ascii": _strip_accents_ascii}
+
+
+def word_analyzer(params: Dict[str, Any]) -> Callable[[str], List[str]] | None:
+    """
+    Pure-Python equivalent of ``TfidfVectorizer(**params).build_analyzer()`` for
+    word analyzers with an explicit stop word list, so serving never imports
+    sklearn. Returns None for settings it does not reproduce (char analyzers, a
+    named stop word list in artifacts saved before lists were stored).
+    """
+    stop_words = params.get("stop_words")
+    if params.get("analyzer", "word") != "word" or isinstance(stop_words, str):
+        return None
+    strip = _STRIP_ACCENTS.get(params.get("strip_accents"), False)
+    if strip is False:
+        return None
+    lowercase = params.get("lowercase", True)
+    token_re = re.compile(params.get("token_pattern", r"(?u)\b\w\w+\b"))
+    stop = frozenset(stop_words or ())
+    min_n, max_n = params.get("ngram_range", (1, 1))
+
+    def analyze(doc: str) -> List[str]:
+        if lowercase:
+            doc = doc.lower()
+        if strip is not None:
+            doc = strip(doc)
+        words = [w for w in token_re.findall(doc) if w not in stop]
+        tokens = list(words) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(words)) + 1):
+            tokens.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return tokens
+
+    return analyze
+
+
+def normalize_rows(X: sparse.csr_matrix, norm: str) -> sparse.csr_matrix:
+    """In-place ``sklearn.preprocessing.normalize`` for CSR rows ("l1" or "l2")."""
+    row_sizes = np.diff(X.indptr)
+    values = np.abs(X.data) if norm == "l1" else X.data * X.data
+    lengths = np.bincount(np.repeat(np.arange(X.shape[0]), row_sizes), weights=values, minlength=X.shape[0])
+    if norm == "l2":
+        lengths = np.sqrt(lengths)
+    lengths[lengths == 0.0] = 1.0
+    X.data /= np.repeat(lengths, row_sizes)
+    return X
+
+
+class _TermView:
+    """Sequence view of term ``i`` as UTF-8 bytes, so ``bisect`` can search the sorted vocabulary."""
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray) -> None:
+        self.terms = terms
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.terms[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+
+class MappedTfidfVectorizer:
+    """
+    Read-only stand-in for a fitted TfidfVectorizer backed by memory-mapped arrays.
+
+    The vocabulary is a UTF-8 blob of the sorted feature names plus offsets
+    (TfidfVectorizer numbers features in sorted order, so a term's position is its
+    column), looked up by binary search instead of a Python dict.
+    """
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, idf: np.ndarray, params: Dict[str, Any]) -> None:
+        self.terms = terms
+        self.offsets = offsets
+        self.idf_ = idf
+        self.params = params
+        self._view = _TermView(terms, offsets)
+        self._analyzer = None
+
+    @property
+    def n_features(self) -> int:
+        return len(self._view)
+
+    def build_analyzer(self):
+        if self._analyzer is None:
+            self._analyzer = word_analyzer(self.params)
+        if self._analyzer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            analyzer_params = {k: v for k, v in self.params.items() if k not in ("binary", "norm", "sublinear_tf")}
+            self._analyzer = TfidfVectorizer(**analyzer_params).build_analyzer()
+        return self._analyzer
+
+    def term_id(self, term: str) -> int:
+        """Column of ``term``, or -1 if it is not in the vocabulary."""
+        key = term.encode("utf-8")
+        i = bisect.bisect_left(self._view, key)
+        return i if i < len(self._view) and self._view[i] == key else -1
+
+    def transform(self, raw_documents: Iterable[str]) -> sparse.csr_matrix:
+        """Same output as ``TfidfVectorizer.transform`` for the fitted model."""
+        analyzer = self.build_analyzer()
+        indptr = [0]
+        indices = []
+        values = []
+        for doc in raw_documents:
+            counts = Counter(j for j in map(self.term_id, analyzer(doc)) if j >= 0)
+            for j in sorted(counts):
+                indices.append(j)
+                values.append(1 if self.params["binary"] else counts[j])
+            indptr.append(len(indices))
+
+        X = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, self.n_features),
+        )
+        if self.params["sublinear_tf"]:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        X.data *= self.idf_[X.indices]
+        if self.params["norm"] is not None:
+            X = normalize_rows(X, self.params["norm"])
+        return X
+
+    def get_params(self) -> Dict[str, Any]:
+        return dict(self.params)
+
+    def get_feature_names_out(self) -> np.ndarray:
+        return np.array([self._view[i].decode("utf-8") for i in range(len(self._view))], dtype=object)
+
+    def feature_names(self, columns: Iterable[int]) -> np.ndarray:
+        """Names of just ``columns``, without decoding the whole vocabulary."""
+        return np.array([self._view[int(i)].decode("utf-8") for i in columns], dtype=object)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+def encode_terms(terms: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 blob + offsets layout used for the vocabulary (see MappedTfidfVectorizer)."""
+    encoded = [str(t).encode("utf-8") for t in terms]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def vectorizer_params(vectorizer) -> Dict[str, Any]:
+    """
+    The TfidfVectorizer settings :func:`save_arrays` stores, as JSON-ready values.
+    A named stop word list is stored as the words themselves (see :func:`word_analyzer`).
+    """
+    params = vectorizer.get_params()
+    if isinstance(params["stop_words"], str) and hasattr(vectorizer, "get_stop_words"):
+        params["stop_words"] = vectorizer.get_stop_words()
+    return {k: _jsonable(params[k]) for k in _VECTORIZER_PARAMS}
+
+
+def save_npy(path: Path, array: np.ndarray) -> None:
+    """
+    Write ``array`` to ``path`` via a temp file + rename, so processes that have the
+    old file memory-mapped keep a valid mapping instead of seeing it truncated.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def save_arrays(vectorizer, tfidf_matrix: sparse.csr_matrix, model_dir: Path) -> None:
+    """
+    Write the fitted vectorizer and TF-IDF matrix as raw .npy arrays + meta.json.
+    """
+    if getattr(vectorizer, "model_type", "tfidf") == "hashing":
+        from .hashing_model import save_hashing_arrays
+
+        save_hashing_arrays(vectorizer, tfidf_matrix, model_dir)
+        return
+
+    ensure_dir(model_dir)
+    tfidf_matrix = sparse.csr_matrix(tfidf_matrix)
+    tfidf_matrix.sort_indices()
+
+    if isinstance(vectorizer, MappedTfidfVectorizer):
+        terms, offsets = vectorizer.terms, vectorizer.offsets
+    else:
+        terms, offsets = encode_terms(vectorizer.get_feature_names_out())
+
+    save_npy(model_dir / _MATRIX_DATA, tfidf_matrix.data)
+    save_npy(model_dir / _MATRIX_INDICES, tfidf_matrix.indices)
+    save_npy(model_dir / _MATRIX_INDPTR, tfidf_matrix.indptr)
+    save_npy(model_dir / _VOCAB_TERMS, terms)
+    save_npy(model_dir / _VOCAB_OFFSETS, offsets)
+    save_npy(model_dir / _IDF, np.asarray(vectorizer.idf_, dtype=np.float64))
+
+    write_json(
+        model_dir / _META,
+        {
+            "format_version": FORMAT_VERSION,
+            "model_type": "tfidf",
+            "shape": list(tfidf_matrix.shape),
+            "vectorizer_params": vectorizer_params(vectorizer),
+        },
+    )
+
+
+def save_matrix(tfidf_matrix: sparse.csr_matrix, model_dir: Path) -> None:
+    """
+    Replace only the TF-IDF matrix of an existing artifact directory, keeping the
+    fitted vocabulary and IDF weights (used by incremental builds).
+    """
+    meta_path = model_dir / _META
+    if not meta_path.exists():
+        raise FileNotFoundError(f"Model artifacts not found: {model_dir}")
+    meta = read_json(meta_path)
+
+    tfidf_matrix = sparse.csr_matrix(tfidf_matrix)
+    tfidf_matrix.sort_indices()
+    save_npy(model_dir / _MATRIX_DATA, tfidf_matrix.data)
+    save_npy(model_dir / _MATRIX_INDICES, tfidf_matrix.indices)
+    save_npy(model_dir / _MATRIX_INDPTR, tfidf_matrix.indptr)
+
+    meta["shape"] = list(tfidf_matrix.shape)
+    write_json(meta_path, meta)
+
+
+def load_arrays(model_dir: Path, mmap_mode: str | None = "r") -> Tuple[Any, sparse.csr_matrix]:
+    """
+    Open an artifact directory written by :func:`save_arrays`. Arrays are
+    memory-mapped, so processes loading the same directory share pages.
+    Returns a MappedTfidfVectorizer, or a HashingTfidf for hashing models.
+    """
+    meta_path = model_dir / _META
+    if not meta_path.exists():
+        raise FileNotFoundError(f"Model artifacts not found: {model_dir}")
+    meta = read_json(meta_path)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version {meta.get('format_version')} in {model_dir}")
+    if meta.get("model_type", "tfidf") == "hashing":
+        from .hashing_model import load_hashing_arrays
+
+        return load_hashing_arrays(model_dir, meta, mmap_mode=mmap_mode)
+
+    def load(name: str) -> np.ndarray:
+        return np.load(model_dir / name, mmap_mode=mmap_mode)
+
+    tfidf_matrix = sparse.csr_matrix(
+        (load(_MATRIX_DATA), load(_MATRIX_INDICES), load(_MATRIX_INDPTR)),
+        shape=tuple(meta["shape"]),
+        copy=False,
+    )
+    params = dict(meta["vectorizer_params"])
+    params["ngram_range"] = tuple(params["ngram_range"])
+    vectorizer = MappedTfidfVectorizer(load(_VOCAB_TERMS), load(_VOCAB_OFFSETS), load(_IDF), params)
+    return vectorizer, tfidf_matrix
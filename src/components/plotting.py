@@ -1,13 +1,44 @@
 from __future__ import annotations
 
-import matplotlib.pyplot as plt
+import hashlib
+import io
+import json
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence
+
+import numpy as np
 import pandas as pd
 
-# Set matplotlib style
-plt.style.use('seaborn-v0_8')  # Use a modern style if available
-plt.rcParams['figure.figsize'] = (10, 6)
-plt.rcParams['axes.grid'] = True
-plt.rcParams['grid.alpha'] = 0.3
+from ..config import CFG, PATHS
+from ..eda_aggregates import top_restaurants
+from ..cache import ResultCache
+from ..utils import ensure_dir, get_logger
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+
+logger = get_logger(__name__)
+
+_STYLED = False
+FIGURE_FORMATS = ("png", "svg")
+# Rendered figure bytes by figure_key(); pages show these instead of re-plotting
+_FIGURES = ResultCache(CFG.FIGURE_CACHE_SIZE)
+
+
+def _pyplot():
+    """Import pyplot on first use (pages that never plot skip it) and apply the style once."""
+    global _STYLED
+    import matplotlib.pyplot as plt
+
+    if not _STYLED:
+        # Set matplotlib style
+        plt.style.use('seaborn-v0_8')  # Use a modern style if available
+        plt.rcParams['figure.figsize'] = (10, 6)
+        plt.rcParams['axes.grid'] = True
+        plt.rcParams['grid.alpha'] = 0.3
+        _STYLED = True
+    return plt
 
 
 def plot_rating_distribution(df_clean: pd.DataFrame) -> plt.Figure:
@@ -20,12 +51,32 @@ def plot_rating_distribution(df_clean: pd.DataFrame) -> plt.Figure:
     Returns:
         matplotlib Figure object
     """
+    ratings = df_clean["Rating"].dropna()
+    counts, edges = np.histogram(ratings, bins=20)
+    return plot_rating_histogram(counts, edges, ratings.mean())
+
+
+def plot_rating_histogram(counts: Sequence[int], edges: Sequence[float], mean_rating: float | None) -> plt.Figure:
+    """
+    Create the rating distribution histogram from precomputed bins (e.g. the
+    pipeline's EDA aggregates), so drawing it does not depend on the review count.
+
+    Args:
+        counts: Reviews per bin
+        edges: Bin edges (one more than counts)
+        mean_rating: Mean rating to mark, or None
+
+    Returns:
+        matplotlib Figure object
+    """
+    plt = _pyplot()
     fig, ax = plt.subplots()
 
     # Plot histogram
-    n, bins, patches = ax.hist(
-        df_clean["Rating"].dropna(),
-        bins=20,
+    ax.hist(
+        edges[:-1],
+        bins=edges,
+        weights=counts,
         edgecolor='black',
         alpha=0.7,
         color='#2E86AB'
@@ -41,9 +92,9 @@ def plot_rating_distribution(df_clean: pd.DataFrame) -> plt.Figure:
     ax.grid(True, alpha=0.3)
 
     # Add mean line
-    mean_rating = df_clean["Rating"].mean()
-    ax.axvline(mean_rating, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_rating:.2f}')
-    ax.legend()
+    if mean_rating is not None:
+        ax.axvline(mean_rating, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_rating:.2f}')
+        ax.legend()
 
     plt.tight_layout()
     return fig
@@ -63,6 +114,7 @@ def plot_top_restaurants_by_reviews(profiles_df: pd.DataFrame, top_n: int = 15)
     # Get top restaurants
     top = profiles_df.sort_values("num_reviews", ascending=False).head(top_n)
 
+    plt = _pyplot()
     fig, ax = plt.subplots()
 
     # Create horizontal bar chart for better readability
@@ -96,4 +148,122 @@ def plot_top_restaurants_by_reviews(profiles_df: pd.DataFrame, top_n: int = 15)
     ax.invert_yaxis()
 
     plt.tight_layout()
-    return fig
\ No newline at end of file
+    return fig
+
+
+def data_version(data: Any) -> str:
+    """Content hash of a plot's input data (DataFrame, array or JSON-serializable value)."""
+    h = hashlib.sha256()
+    if isinstance(data, pd.DataFrame):
+        h.update(",".join(map(str, data.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    elif isinstance(data, np.ndarray):
+        h.update(np.ascontiguousarray(data).tobytes())
+    else:
+        h.update(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def figure_key(name: str, version: str, fmt: str = "png", **params: Any) -> str:
+    """Cache key (and pre-rendered file stem) of one figure variant."""
+    spec = {"name": name, "version": version, "fmt": fmt, "dpi": CFG.FIGURE_DPI, "params": params}
+    return f"{name}-" + hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def render_figure(fig: plt.Figure, fmt: str = "png") -> bytes:
+    """Encode ``fig`` as PNG or SVG bytes and close it, releasing its memory."""
+    if fmt not in FIGURE_FORMATS:
+        raise ValueError(f"Unsupported figure format: {fmt} (expected one of {FIGURE_FORMATS})")
+    plt = _pyplot()
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=CFG.FIGURE_DPI)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def cached_figure(
+    name: str,
+    version: str,
+    draw: Callable[[], plt.Figure],
+    fmt: str = "png",
+    figure_dir: Path = PATHS.FIGURE_CACHE_DIR,
+    **params: Any,
+) -> bytes:
+    """
+    Figure bytes for (``name``, data ``version``, ``params``, ``fmt``): from the
+    in-process LRU, else a file pre-rendered by pipeline_build, else ``draw()``
+    rendered once. Only a miss on both imports or runs matplotlib.
+    """
+    key = figure_key(name, version, fmt, **params)
+    image = _FIGURES.get(key)
+    if image is None:
+        path = figure_dir / f"{key}.{fmt}"
+        image = path.read_bytes() if path.exists() else render_figure(draw(), fmt)
+        _FIGURES.put(key, image)
+    return image
+
+
+def rating_histogram_image(
+    counts: Sequence[int],
+    edges: Sequence[float],
+    mean_rating: float | None,
+    version: str | None = None,
+    fmt: str = "png",
+    figure_dir: Path = PATHS.FIGURE_CACHE_DIR,
+) -> bytes:
+    """Cached :func:`plot_rating_histogram`; ``version`` defaults to a hash of the bins."""
+    if version is None:
+        version = data_version([list(map(int, counts)), list(map(float, edges)), mean_rating])
+    return cached_figure(
+        "rating_histogram", version, lambda: plot_rating_histogram(counts, edges, mean_rating),
+        fmt=fmt, figure_dir=figure_dir,
+    )
+
+
+def top_restaurants_image(
+    profiles_df: pd.DataFrame,
+    top_n: int = 15,
+    version: str | None = None,
+    fmt: str = "png",
+    figure_dir: Path = PATHS.FIGURE_CACHE_DIR,
+) -> bytes:
+    """Cached :func:`plot_top_restaurants_by_reviews`; ``version`` defaults to a hash of the frame."""
+    if version is None:
+        version = data_version(profiles_df[["Restaurant", "num_reviews"]])
+    return cached_figure(
+        "top_restaurants", version, lambda: plot_top_restaurants_by_reviews(profiles_df, top_n=top_n),
+        fmt=fmt, figure_dir=figure_dir, top_n=top_n,
+    )
+
+
+def prerender_eda_figures(
+    aggregates: Dict[str, Any],
+    figure_dir: Path = PATHS.FIGURE_CACHE_DIR,
+    top_ns: Sequence[int] = CFG.FIGURE_PRERENDER_TOP_N,
+    fmts: Sequence[str] = ("png",),
+) -> List[Path]:
+    """
+    Render the EDA page's figures for the given EDA aggregates into ``figure_dir``
+    (replacing its contents) under their :func:`figure_key`, so the page never has
+    to plot them.
+    """
+    if figure_dir.exists():
+        shutil.rmtree(figure_dir)
+    ensure_dir(figure_dir)
+    version = aggregates["data_version"]
+    histogram = aggregates["rating_histogram"]
+    written = []
+    for fmt in fmts:
+        key = figure_key("rating_histogram", version, fmt)
+        fig = plot_rating_histogram(histogram["counts"], histogram["edges"], aggregates["mean_rating"])
+        written.append(figure_dir / f"{key}.{fmt}")
+        written[-1].write_bytes(render_figure(fig, fmt))
+        for top_n in top_ns:
+            key = figure_key("top_restaurants", version, fmt, top_n=top_n)
+            fig = plot_top_restaurants_by_reviews(top_restaurants(aggregates, top_n), top_n=top_n)
+            written.append(figure_dir / f"{key}.{fmt}")
+            written[-1].write_bytes(render_figure(fig, fmt))
+    logger.info("Pre-rendered %d figures into: %s", len(written), figure_dir)
+    return written
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Tuple
 
 
 @dataclass(frozen=True)
@@ -20,12 +21,19 @@ class Paths:
     RAW_CSV: Path = RAW_DIR / "Restaurant reviews.csv"
 
     CLEAN_PARQUET: Path = PROCESSED_DIR / "reviews_clean.parquet"
+    CLEAN_TEXT_PARQUET: Path = PROCESSED_DIR / "reviews_text.parquet"
     PROFILES_PARQUET: Path = PROCESSED_DIR / "restaurant_profiles.parquet"
     CORPUS_PARQUET: Path = PROCESSED_DIR / "restaurant_review_corpus.parquet"
+    EDA_AGGREGATES: Path = PROCESSED_DIR / "eda_aggregates.json"
+    FIGURE_CACHE_DIR: Path = PROCESSED_DIR / "figures"
+    BUILD_MANIFEST: Path = PROCESSED_DIR / "build_manifest.json"
 
-    TFIDF_VECTORIZER: Path = MODELS_DIR / "tfidf_vectorizer.joblib"
-    TFIDF_MATRIX: Path = MODELS_DIR / "tfidf_matrix.joblib"
+    TFIDF_DIR: Path = MODELS_DIR / "tfidf"
     RESTAURANT_INDEX: Path = MODELS_DIR / "restaurant_index.json"
+    NEIGHBOR_IDS: Path = MODELS_DIR / "neighbor_ids.npy"
+    NEIGHBOR_SCORES: Path = MODELS_DIR / "neighbor_scores.npy"
+    TOP_TERMS: Path = MODELS_DIR / "top_terms.parquet"
+    ANN_DIR: Path = MODELS_DIR / "ann"
 
 
 PATHS = Paths()
@@ -36,10 +44,102 @@ class AppConfig:
     RANDOM_STATE: int = 42
     TOP_N_DEFAULT: int = 10
 
+    # Rows per chunk for streaming ingestion of the raw CSV
+    INGEST_CHUNK_ROWS: int = 100_000
+    # Largest row group of the cleaned review files (src/review_store.py); row groups
+    # also break at every rating value so rating filters skip whole groups
+    CLEAN_ROW_GROUP_ROWS: int = 50_000
+
+    # EDA page aggregates (src/eda_aggregates.py): rating histogram bins, reviews kept
+    # per rating value for the filtered sample (>= the rows the page shows) and
+    # restaurants kept for the top-by-reviews chart
+    EDA_RATING_BINS: int = 20
+    EDA_SAMPLE_PER_RATING: int = 25
+    EDA_TOP_RESTAURANTS: int = 50
+
+    # Rendered figure cache (src/components/plotting.py): PNG/SVG bytes kept per process,
+    # and the EDA figure variants pipeline_build pre-renders into FIGURE_CACHE_DIR
+    # (every position of the page's top-restaurants slider)
+    FIGURE_CACHE_SIZE: int = 64
+    FIGURE_DPI: int = 100
+    PRERENDER_FIGURES: bool = True
+    FIGURE_PRERENDER_TOP_N: Tuple[int, ...] = tuple(range(5, 21))
+
+    # Text model: "tfidf" (fitted vocabulary) or "hashing" (HashingVectorizer buckets,
+    # no vocabulary kept)
+    MODEL_TYPE: str = "tfidf"
+    HASHING_N_FEATURES: int = 2**20
+    # Both model types train out of core, streaming the corpus parquet in row groups
+    # of this many restaurants
+    TRAIN_CHUNK_ROWS: int = 5_000
+    # Largest "top keywords" count on the Insights page; hashing models keep term labels
+    # only for buckets that can show up there or in the precomputed top terms (TOP_TERMS_K)
+    INSIGHTS_MAX_TERMS: int = 30
+    # Highest-weighted terms per restaurant precomputed by pipeline_build (models/top_terms.parquet)
+    # for readers that do not load the TF-IDF matrix; the Insights page ranks the loaded row instead
+    PRECOMPUTE_TOP_TERMS: bool = True
+    TOP_TERMS_K: int = 50
+
     # Recommendation scoring weights
     W_SIM: float = 0.65
     W_RATING: float = 0.25
     W_POP: float = 0.10
 
+    # Precomputed restaurant-to-restaurant neighbor table
+    NEIGHBORS_K: int = 50
+    NEIGHBORS_BLOCK_SIZE: int = 1024
+
+    # Score single preference queries through the inverted index
+    USE_INVERTED_INDEX: bool = True
+
+    # Published artifact generations kept under models/generations (see src/generations.py)
+    KEEP_GENERATIONS: int = 3
+
+    # Process-wide LRU caches in front of the recommend_* functions: results per
+    # (normalized query, top_n) and transformed query vectors. TTL 0 = no expiry.
+    RESULT_CACHE_SIZE: int = 1024
+    RESULT_CACHE_TTL_S: float = 0.0
+    QUERY_VECTOR_CACHE_SIZE: int = 4096
+
+    # HTTP recommendation service (src/service.py): concurrent /recommend requests
+    # arriving within the window are scored as one batch of up to SERVICE_MAX_BATCH
+    SERVICE_HOST: str = "127.0.0.1"
+    SERVICE_PORT: int = 8080
+    SERVICE_BATCH_WINDOW_MS: float = 2.0
+    SERVICE_MAX_BATCH: int = 64
+    # Multi-worker mode (src/shared_serving.py): worker processes (-1 = all CPUs) and how
+    # often the parent checks for newly published artifacts to hot-swap. It serves the
+    # exact path only; USE_ANN / USE_PQ do not apply there
+    SHARED_WORKERS: int = -1
+    SHARED_SWAP_POLL_S: float = 2.0
+
+    # Phase timers / counters (src/instrumentation.py); cProfile and tracemalloc
+    # sampling of recommend calls and pipeline stages is off until enable_profiling()
+    INSTRUMENTATION: bool = True
+    PROFILE_SAMPLE_RATE: float = 0.01
+    PROFILE_MEMORY: bool = False
+
+    # Approximate retrieval for large catalogs: SVD embeddings + IVF index (src/ann.py).
+    # USE_ANN builds the index in pipeline_build and makes the app retrieve candidates
+    # from it before exact re-ranking.
+    USE_ANN: bool = False
+    ANN_COMPONENTS: int = 128
+    ANN_LISTS: int = 0  # 0 = about sqrt(n_restaurants)
+    ANN_NPROBE: int = 8
+    ANN_CANDIDATES: int = 200
+    ANN_KMEANS_ITERS: int = 25
+    # Compact mode: product-quantized embeddings (PQ_SUBSPACES bytes per restaurant)
+    # scored with ADC lookup tables as the first stage, TF-IDF rows only for re-ranking
+    USE_PQ: bool = False
+    PQ_SUBSPACES: int = 16
+    # Share of the SVD projection's squared norm kept (highest-norm terms) for embedding text queries
+    PQ_PROJECTION_MASS: float = 0.9
+
+    # Incremental builds: refit TF-IDF from scratch once the new reviews' out-of-vocabulary
+    # token share exceeds the existing reviews' share by more than this
+    INCREMENTAL_MAX_VOCAB_DRIFT: float = 0.15
+    # Existing reviews analyzed to estimate the in-sample out-of-vocabulary share
+    INCREMENTAL_DRIFT_SAMPLE: int = 2000
+
 
 CFG = AppConfig()
\ No newline at end of file
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .config import CFG, PATHS
+from .preprocessing import SCHEMA
+from .review_store import REVIEW_ID, read_review_text, review_files
+from .utils import get_logger, read_json, write_json
+
+
+logger = get_logger(__name__)
+
+AGGREGATES_VERSION = 2
+SAMPLE_COLUMNS = [SCHEMA.restaurant, SCHEMA.reviewer, SCHEMA.review, SCHEMA.rating, SCHEMA.time]
+_SCAN_COLUMNS = [REVIEW_ID, SCHEMA.restaurant, SCHEMA.reviewer, SCHEMA.rating, SCHEMA.time]
+
+
+def build_eda_aggregates(
+    profiles_df: pd.DataFrame,
+    path: Path = PATHS.CLEAN_PARQUET,
+    text_path: Path = PATHS.CLEAN_TEXT_PARQUET,
+    bins: int = CFG.EDA_RATING_BINS,
+    sample_per_rating: int = CFG.EDA_SAMPLE_PER_RATING,
+    top_restaurants: int = CFG.EDA_TOP_RESTAURANTS,
+    seed: int = CFG.RANDOM_STATE,
+) -> Dict[str, Any]:
+    """
+    Everything the EDA page shows, from one streaming pass over the cleaned reviews
+    (text excluded) plus the profiles: counts, date range, rating histogram, reviews
+    at or above each rating, top restaurants by review count and a sample of reviews.
+
+    The sample is a bottom-k reservoir: every review gets a random key and each rating
+    value keeps the ``sample_per_rating`` smallest. The smallest keys among the values
+    >= a threshold are then a uniform sample of the reviews passing it, as long as
+    no more than ``sample_per_rating`` rows are taken.
+    """
+    rng = np.random.default_rng(seed)
+    rating_counts: Dict[float, int] = {}
+    total = 0
+    first = last = None
+    sample = None
+
+    batches = (
+        batch
+        for part in review_files(path)
+        for batch in pq.ParquetFile(part).iter_batches(batch_size=CFG.CLEAN_ROW_GROUP_ROWS, columns=_SCAN_COLUMNS)
+    )
+    for batch in batches:
+        df = batch.to_pandas()
+        total += len(df)
+        for value, n in df[SCHEMA.rating].value_counts().items():
+            rating_counts[float(value)] = rating_counts.get(float(value), 0) + int(n)
+        times = df[SCHEMA.time].dropna()
+        if len(times):
+            first = times.min() if first is None else min(first, times.min())
+            last = times.max() if last is None else max(last, times.max())
+
+        df = df.dropna(subset=[SCHEMA.rating])
+        df = df.assign(
+            key=rng.random(len(df)),
+            **{name: df[name].astype(str) for name in (SCHEMA.restaurant, SCHEMA.reviewer)},
+        )
+        sample = df if sample is None else pd.concat([sample, df], ignore_index=True)
+        sample = sample.sort_values("key", kind="stable").groupby(SCHEMA.rating).head(sample_per_rating)
+
+    if sample is None:
+        raise ValueError(f"No reviews in {path}")
+    sample = sample.reset_index(drop=True)
+    sample[SCHEMA.review] = read_review_text(sample[REVIEW_ID].to_numpy(), text_path).to_pylist()
+
+    values = np.array(sorted(rating_counts), dtype=float)
+    counts = np.array([rating_counts[v] for v in values], dtype=np.int64)
+    hist, edges = np.histogram(values, bins=bins, range=(1.0, 5.0), weights=counts)
+    top = profiles_df.sort_values("num_reviews", ascending=False, kind="stable").head(top_restaurants)
+
+    aggregates = {
+        "version": AGGREGATES_VERSION,
+        "total_reviews": total,
+        "rated_reviews": int(counts.sum()),
+        "mean_rating": float(values @ counts / counts.sum()) if counts.sum() else None,
+        "date_min": first.isoformat() if first is not None else None,
+        "date_max": last.isoformat() if last is not None else None,
+        "num_restaurants": int(len(profiles_df)),
+        "mean_restaurant_rating": float(profiles_df["avg_rating"].mean()) if len(profiles_df) else None,
+        "rating_histogram": {"edges": edges.tolist(), "counts": hist.astype(int).tolist()},
+        # reviews_at_least[i]: reviews rated >= rating_values[i]
+        "rating_values": values.tolist(),
+        "reviews_at_least": np.cumsum(counts[::-1])[::-1].tolist(),
+        "top_restaurants": {
+            SCHEMA.restaurant: top[SCHEMA.restaurant].astype(str).tolist(),
+            "num_reviews": top["num_reviews"].astype(int).tolist(),
+        },
+        "sample": {
+            "key": sample["key"].tolist(),
+            **{c: sample[c].tolist() for c in SAMPLE_COLUMNS if c != SCHEMA.time},
+            SCHEMA.time: [t.isoformat() if pd.notna(t) else None for t in sample[SCHEMA.time]],
+        },
+    }
+    # content hash, so caches of figures drawn from these aggregates know when to re-render
+    encoded = json.dumps(aggregates, sort_keys=True).encode("utf-8")
+    aggregates["data_version"] = hashlib.sha256(encoded).hexdigest()[:16]
+    logger.info("Built EDA aggregates: reviews=%d | rating values=%d | sampled=%d", total, len(values), len(sample))
+    return aggregates
+
+
+def save_eda_aggregates(aggregates: Dict[str, Any], path: Path = PATHS.EDA_AGGREGATES) -> None:
+    write_json(path, aggregates)
+
+
+def load_eda_aggregates(path: Path = PATHS.EDA_AGGREGATES) -> Dict[str, Any]:
+    aggregates = read_json(path)
+    if aggregates.get("version") != AGGREGATES_VERSION:
+        raise ValueError(f"Unsupported EDA aggregates version in {path}; rerun pipeline_build")
+    return aggregates
+
+
+def reviews_at_least(aggregates: Dict[str, Any], min_rating: float) -> int:
+    """Number of reviews rated >= ``min_rating``."""
+    i = bisect.bisect_left(aggregates["rating_values"], min_rating)
+    counts = aggregates["reviews_at_least"]
+    return int(counts[i]) if i < len(counts) else 0
+
+
+def sample_reviews(aggregates: Dict[str, Any], min_rating: float, n: int = CFG.EDA_SAMPLE_PER_RATING) -> pd.DataFrame:
+    """A uniform random sample of up to ``n`` reviews rated >= ``min_rating``."""
+    sample = pd.DataFrame(aggregates["sample"])
+    sample[SCHEMA.time] = pd.to_datetime(sample[SCHEMA.time])
+    sample = sample[sample[SCHEMA.rating] >= min_rating].sort_values("key", kind="stable").head(n)
+    return sample[SAMPLE_COLUMNS].reset_index(drop=True)
+
+
+def top_restaurants(aggregates: Dict[str, Any], n: int) -> pd.DataFrame:
+    """Restaurant / num_reviews of the ``n`` most reviewed restaurants."""
+    return pd.DataFrame(aggregates["top_restaurants"]).head(n)
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import Dict, List
+import time
+from typing import Dict, List, Sequence
 
+import numpy as np
 import pandas as pd
 
-from .recommender import recommend_from_preferences, recommend_similar_restaurants
+from .recommender import RecommenderEngine, recommend_from_preferences, recommend_similar_restaurants
 from .utils import get_logger
 
 
@@ -43,4 +45,137 @@ def sample_qualitative_examples(
         recs = recommend_from_preferences(q, profiles_df, vectorizer, tfidf_matrix, index, top_n=5)
         examples.append({"type": "preference_query", "query": q, "recommendations": [r.__dict__ for r in recs]})
 
-    return examples
\ No newline at end of file
+    return examples
+
+def _recall(expected: List[set], got: List[set]) -> float:
+    hits = sum(len(e & g) for e, g in zip(expected, got))
+    total = sum(len(e) for e in expected)
+    return hits / total if total else 1.0
+
+
+def approx_recall_at_k(
+    profiles_df: pd.DataFrame,
+    vectorizer,
+    tfidf_matrix,
+    index: Dict[str, int],
+    variants: Dict[str, dict],
+    k: int = 10,
+    n_queries: int = 200,
+    random_state: int = 42,
+) -> Dict[str, dict]:
+    """
+    Recall@k of approximate RecommenderEngine configurations against the exact path.
+    ``variants`` maps a label to extra engine kwargs (e.g. ``{"ann": ivf, "ann_nprobe": 4}``).
+    Seed queries are sampled restaurants; preference queries are their sample reviews.
+    Recall is the share of the exact top-k restaurants that the variant also returns.
+    """
+    rng = np.random.default_rng(random_state)
+    names = [r for r in profiles_df["Restaurant"].astype(str) if r in index]
+    seeds = [names[i] for i in rng.choice(len(names), size=min(n_queries, len(names)), replace=False)]
+    reviews = profiles_df["sample_review"] if "sample_review" in profiles_df.columns else pd.Series("", index=profiles_df.index)
+    texts_by_name = dict(zip(profiles_df["Restaurant"].astype(str), reviews.astype(str)))
+    texts = [t for t in (texts_by_name.get(s, "") for s in seeds) if len(t.strip()) >= 3]
+
+    exact = RecommenderEngine(profiles_df, tfidf_matrix, index, vectorizer=vectorizer)
+    exact_similar = [{r.restaurant for r in exact.similar(s, top_n=k)} for s in seeds]
+    exact_prefs = [{r.restaurant for r in recs} for recs in exact.from_preferences_batch(texts, top_n=k)]
+
+    report: Dict[str, dict] = {}
+    for label, kwargs in variants.items():
+        approx = RecommenderEngine(profiles_df, tfidf_matrix, index, vectorizer=vectorizer, **kwargs)
+
+        start = time.perf_counter()
+        got_similar = [{r.restaurant for r in approx.similar(s, top_n=k)} for s in seeds]
+        got_prefs = [{r.restaurant for r in approx.from_preferences(t, top_n=k)} for t in texts]
+        elapsed = time.perf_counter() - start
+
+        report[label] = {
+            "k": k,
+            "n_seed_queries": len(seeds),
+            "n_text_queries": len(texts),
+            "similar_recall": _recall(exact_similar, got_similar),
+            "preferences_recall": _recall(exact_prefs, got_prefs),
+            "mean_latency_ms": 1000 * elapsed / max(1, len(seeds) + len(texts)),
+        }
+        logger.info("Recall@%d %s: %s", k, label, report[label])
+    return report
+
+
+def ann_recall_at_k(
+    profiles_df: pd.DataFrame,
+    vectorizer,
+    tfidf_matrix,
+    index: Dict[str, int],
+    ann,
+    k: int = 10,
+    n_queries: int = 200,
+    nprobe_values: Sequence[int] = (1, 2, 4, 8, 16, 32),
+    random_state: int = 42,
+) -> dict:
+    """
+    Recall@k of the IVF-backed recommenders against the exact path, for each
+    ``nprobe`` in ``nprobe_values``.
+    """
+    variants = {f"nprobe={n}": {"ann": ann, "ann_nprobe": int(n)} for n in nprobe_values}
+    by_variant = approx_recall_at_k(
+        profiles_df, vectorizer, tfidf_matrix, index, variants, k=k, n_queries=n_queries, random_state=random_state
+    )
+    return {
+        "k": k,
+        "by_nprobe": [{"nprobe": int(n), **by_variant[f"nprobe={n}"]} for n in nprobe_values],
+    }
+
+
+def _nbytes(*arrays) -> int:
+    return int(sum(np.asarray(a).nbytes for a in arrays))
+
+
+def pq_report(
+    profiles_df: pd.DataFrame,
+    vectorizer,
+    tfidf_matrix,
+    index: Dict[str, int],
+    pq,
+    k: int = 10,
+    n_queries: int = 200,
+    candidate_values: Sequence[int] = (50, 100, 200, 400),
+    random_state: int = 42,
+) -> dict:
+    """
+    Memory and accuracy of the product-quantized first stage vs the exact TF-IDF path.
+
+    Memory counts what each first stage must keep resident: the whole TF-IDF matrix
+    for exact scoring vs the PQ codes + codebooks (+ the SVD projection used to embed
+    text queries). The vocabulary arrays are needed by both. Accuracy is recall@k of
+    the final (exactly re-ranked) top-k for each candidate-set size.
+    The projection is the pruned int8 one (see ann.quantize_projection).
+    """
+    tfidf_bytes = _nbytes(tfidf_matrix.data, tfidf_matrix.indices, tfidf_matrix.indptr)
+    codes_bytes = _nbytes(pq.codes, pq.codebooks)
+    projection = pq.projection
+    projection_bytes = _nbytes(projection.terms, projection.rows, projection.scales)
+    vocabulary_bytes = _nbytes(vectorizer.terms, vectorizer.offsets, vectorizer.idf_) if hasattr(vectorizer, "terms") else None
+
+    variants = {f"candidates={c}": {"pq": pq, "ann_candidates": int(c)} for c in candidate_values}
+    by_variant = approx_recall_at_k(
+        profiles_df, vectorizer, tfidf_matrix, index, variants, k=k, n_queries=n_queries, random_state=random_state
+    )
+    report = {
+        "memory_bytes": {
+            "tfidf_matrix": tfidf_bytes,
+            "pq_codes_and_codebooks": codes_bytes,
+            "svd_projection": projection_bytes,
+            "vocabulary": vocabulary_bytes,
+        },
+        "first_stage_shrink": {
+            "codes_only": tfidf_bytes / max(1, codes_bytes),
+            "with_projection": tfidf_bytes / max(1, codes_bytes + projection_bytes),
+        },
+        "bytes_per_restaurant": {
+            "tfidf": tfidf_bytes / max(1, tfidf_matrix.shape[0]),
+            "pq": int(pq.codes.shape[1]),
+        },
+        "by_candidates": [{"candidates": int(c), **by_variant[f"candidates={c}"]} for c in candidate_values],
+    }
+    logger.info("PQ memory: %s | shrink: %s", report["memory_bytes"], report["first_stage_shrink"])
+    return report
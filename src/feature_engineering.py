@@ -9,22 +9,65 @@ from .utils import get_logger
 logger = get_logger(__name__)
 
 
-def build_restaurant_profiles(df_clean: pd.DataFrame) -> pd.DataFrame:
+def aggregate_restaurant_profiles(df_clean: pd.DataFrame) -> pd.DataFrame:
     """
-    Build per-restaurant profile features for ranking.
+    Per-restaurant running aggregates (rating sum/count, review count, latest date).
+    Safe to run on shards partitioned by restaurant, or on a batch of new reviews,
+    and combine; call fill_profile_defaults on the combined result.
     """
     g = df_clean.groupby(SCHEMA.restaurant, dropna=True)
 
-    profiles = g.agg(
-        avg_rating=(SCHEMA.rating, "mean"),
+    return g.agg(
+        rating_sum=(SCHEMA.rating, "sum"),
+        rating_count=(SCHEMA.rating, "count"),
         num_reviews=(SCHEMA.review, "count"),
         latest_review_date=(SCHEMA.time, "max"),
         sample_review=(SCHEMA.review, lambda x: x.iloc[0] if len(x) > 0 else ""),
     ).reset_index()
 
+
+def fill_profile_defaults(profiles: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derive avg_rating from the running sums and apply dataset-wide fixes that need
+    every restaurant at once (e.g. the rating median).
+    """
+    avg_rating = profiles["rating_sum"] / profiles["rating_count"].where(profiles["rating_count"] > 0)
     # Handle missing rating gracefully
-    profiles["avg_rating"] = profiles["avg_rating"].fillna(profiles["avg_rating"].median())
+    profiles.insert(1, "avg_rating", avg_rating.fillna(avg_rating.median()))
     profiles["num_reviews"] = profiles["num_reviews"].fillna(0).astype(int)
+    return profiles
+
+
+def merge_restaurant_profiles(profiles: pd.DataFrame, delta_profiles: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fold aggregates of new reviews (from aggregate_restaurant_profiles) into existing
+    profiles. Gives the same result as rebuilding from all reviews.
+    """
+    if "rating_sum" not in profiles.columns:
+        raise ValueError("Profiles have no running rating sums; rebuild them with build_restaurant_profiles")
+
+    combined = pd.concat([profiles.drop(columns=["avg_rating"]), delta_profiles], ignore_index=True)
+    merged = (
+        combined.groupby(SCHEMA.restaurant, dropna=True)
+        .agg(
+            rating_sum=("rating_sum", "sum"),
+            rating_count=("rating_count", "sum"),
+            num_reviews=("num_reviews", "sum"),
+            latest_review_date=("latest_review_date", "max"),
+            sample_review=("sample_review", "first"),
+        )
+        .reset_index()
+    )
+    merged = fill_profile_defaults(merged)
+    logger.info("Merged restaurant profiles: shape=%s", merged.shape)
+    return merged
+
+
+def build_restaurant_profiles(df_clean: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build per-restaurant profile features for ranking.
+    """
+    profiles = fill_profile_defaults(aggregate_restaurant_profiles(df_clean))
 
     logger.info("Built restaurant profiles: shape=%s", profiles.shape)
     return profiles
@@ -43,4 +86,22 @@ def build_restaurant_corpus(df_clean: pd.DataFrame) -> pd.DataFrame:
 
     corpus["corpus"] = corpus["corpus"].astype(str).str.strip()
     logger.info("Built restaurant corpus: shape=%s", corpus.shape)
-    return corpus
\ No newline at end of file
+    return corpus
+
+def merge_restaurant_corpus(corpus: pd.DataFrame, delta_corpus: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append the text of new reviews (from build_restaurant_corpus) to existing corpora.
+    Reviews are joined with a single space, exactly as a full rebuild would.
+    """
+    merged = corpus.set_index(SCHEMA.restaurant)["corpus"]
+    delta = delta_corpus.set_index(SCHEMA.restaurant)["corpus"]
+
+    existing = delta.index.intersection(merged.index)
+    merged.loc[existing] = (merged.loc[existing] + " " + delta.loc[existing]).str.strip()
+    added = delta[~delta.index.isin(merged.index)]
+
+    merged = pd.concat([merged, added]).sort_index(kind="stable")
+    merged.index.name = SCHEMA.restaurant
+    out = merged.reset_index()
+    logger.info("Merged restaurant corpus: shape=%s", out.shape)
+    return out
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from .config import CFG, PATHS
+from .utils import ensure_dir, get_logger, read_json, write_json
+
+logger = get_logger(__name__)
+
+GENERATIONS = "generations"
+CURRENT = "current"
+MANIFEST = "manifest.json"
+
+_HASH_BLOCK = 1 << 20
+
+
+@dataclass(frozen=True)
+class ArtifactSet:
+    """Paths of one consistent set of serving artifacts (a generation, or the working copy)."""
+
+    generation: int | None
+    tfidf_dir: Path
+    restaurant_index: Path
+    neighbor_ids: Path
+    neighbor_scores: Path
+    ann_dir: Path
+    profiles: Path
+    top_terms: Path
+
+    @classmethod
+    def in_dir(cls, root: Path, generation: int | None = None) -> "ArtifactSet":
+        return cls(
+            generation=generation,
+            tfidf_dir=root / PATHS.TFIDF_DIR.name,
+            restaurant_index=root / PATHS.RESTAURANT_INDEX.name,
+            neighbor_ids=root / PATHS.NEIGHBOR_IDS.name,
+            neighbor_scores=root / PATHS.NEIGHBOR_SCORES.name,
+            ann_dir=root / PATHS.ANN_DIR.name,
+            profiles=root / PATHS.PROFILES_PARQUET.name,
+            top_terms=root / PATHS.TOP_TERMS.name,
+        )
+
+
+def working_artifacts() -> ArtifactSet:
+    """Where pipeline_build writes (and incrementally updates) artifacts before publishing."""
+    return ArtifactSet(
+        generation=None,
+        tfidf_dir=PATHS.TFIDF_DIR,
+        restaurant_index=PATHS.RESTAURANT_INDEX,
+        neighbor_ids=PATHS.NEIGHBOR_IDS,
+        neighbor_scores=PATHS.NEIGHBOR_SCORES,
+        ann_dir=PATHS.ANN_DIR,
+        profiles=PATHS.PROFILES_PARQUET,
+        top_terms=PATHS.TOP_TERMS,
+    )
+
+
+def current_generation(models_dir: Path = PATHS.MODELS_DIR) -> int | None:
+    """
+    Number of the published generation, or None before the first publish. This is a
+    single readlink, cheap enough to call on every request as a version probe.
+    """
+    try:
+        return int(Path(os.readlink(models_dir / CURRENT)).name)
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def artifacts_for(generation: int | None, models_dir: Path = PATHS.MODELS_DIR) -> ArtifactSet:
+    """Paths inside ``generation``; None means the working copy (builds made before generations existed)."""
+    if generation is None:
+        return working_artifacts()
+    return ArtifactSet.in_dir(models_dir / GENERATIONS / _dir_name(generation), generation)
+
+
+def current_artifacts(models_dir: Path = PATHS.MODELS_DIR) -> ArtifactSet:
+    """
+    The published generation's artifacts, resolved once so every file comes from the
+    same generation even if a newer one is published while they load.
+    """
+    return artifacts_for(current_generation(models_dir), models_dir)
+
+
+def _dir_name(generation: int) -> str:
+    return f"{generation:06d}"
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _files(root: Path) -> List[Path]:
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.name != MANIFEST)
+
+
+def _place(src: Path, dst: Path) -> None:
+    ensure_dir(dst.parent)
+    # .npy files are only ever replaced via rename (artifacts.save_npy), never rewritten
+    # in place, so a hard link is as good as a copy; everything else is copied
+    if src.suffix == ".npy":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def publish_generation(
+    source: ArtifactSet | None = None,
+    models_dir: Path = PATHS.MODELS_DIR,
+    keep: int = CFG.KEEP_GENERATIONS,
+) -> int:
+    """
+    Snapshot ``source`` (default: the working artifacts) into
+    ``generations/<n>/`` with a manifest of sha256 checksums, then point
+    ``models/current`` at it with an atomic symlink replace. Readers see either the
+    old generation or the new one, never a mix. Keeps the newest ``keep``
+    generations; processes still mapping a pruned one keep their open files.
+    """
+    source = source or working_artifacts()
+    generations_dir = models_dir / GENERATIONS
+    ensure_dir(generations_dir)
+    generation = max((int(p.name) for p in generations_dir.iterdir() if p.name.isdigit()), default=0) + 1
+
+    staging = generations_dir / f".staging-{_dir_name(generation)}"
+    if staging.exists():
+        shutil.rmtree(staging)
+    target = ArtifactSet.in_dir(staging, generation)
+    for name in ("tfidf_dir", "ann_dir"):
+        src = getattr(source, name)
+        if src.is_dir():
+            for path in _files(src):
+                _place(path, getattr(target, name) / path.relative_to(src))
+    for name in ("restaurant_index", "neighbor_ids", "neighbor_scores", "profiles", "top_terms"):
+        src = getattr(source, name)
+        if src.is_file():
+            _place(src, getattr(target, name))
+
+    files = {
+        path.relative_to(staging).as_posix(): {"size": path.stat().st_size, "sha256": _sha256(path)}
+        for path in _files(staging)
+    }
+    write_json(
+        staging / MANIFEST,
+        {
+            "generation": generation,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "files": files,
+        },
+    )
+    final = generations_dir / _dir_name(generation)
+    os.rename(staging, final)
+
+    link = models_dir / f".{CURRENT}.tmp"
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    os.symlink(Path(GENERATIONS) / final.name, link)
+    os.replace(link, models_dir / CURRENT)
+    logger.info("Published artifact generation %d (%d files)", generation, len(files))
+
+    _prune(generations_dir, generation, keep)
+    return generation
+
+
+def _prune(generations_dir: Path, current: int, keep: int) -> None:
+    published = sorted(int(p.name) for p in generations_dir.iterdir() if p.name.isdigit())
+    for generation in published[:-keep] if keep > 0 else []:
+        if generation != current:
+            shutil.rmtree(generations_dir / _dir_name(generation), ignore_errors=True)
+
+
+def verify_generation(generation_dir: Path) -> Dict[str, str]:
+    """
+    Check every file against the generation's manifest. Returns ``{file: problem}``
+    for missing or modified files (empty when the generation is intact).
+    """
+    manifest = read_json(generation_dir / MANIFEST)
+    problems = {}
+    for name, expected in manifest["files"].items():
+        path = generation_dir / name
+        if not path.is_file():
+            problems[name] = "missing"
+        elif path.stat().st_size != expected["size"] or _sha256(path) != expected["sha256"]:
+            problems[name] = "checksum mismatch"
+    return problems
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .artifacts import FORMAT_VERSION, encode_terms, normalize_rows, save_npy
+from .config import CFG
+from .utils import ensure_dir, get_logger, write_json
+
+logger = get_logger(__name__)
+
+
+_META = "meta.json"
+_MATRIX_DATA = "matrix_data.npy"
+_MATRIX_INDICES = "matrix_indices.npy"
+_MATRIX_INDPTR = "matrix_indptr.npy"
+_IDF = "idf.npy"
+_LABEL_BUCKETS = "label_buckets.npy"
+_LABEL_TERMS = "label_terms.npy"
+_LABEL_OFFSETS = "label_offsets.npy"
+
+# HashingVectorizer settings that make it a drop-in for the TfidfVectorizer columns
+_HASHING_FIXED = {"alternate_sign": False, "norm": None}
+_ANALYZER_PARAMS = ("lowercase", "stop_words", "ngram_range")
+
+
+class BucketLabels:
+    """
+    Side table mapping hashed buckets back to sample terms, for display only.
+    Holds just the buckets that can appear in a restaurant's top keywords.
+    """
+
+    def __init__(self, buckets: np.ndarray, terms: np.ndarray, offsets: np.ndarray) -> None:
+        self.buckets = buckets  # sorted bucket ids
+        self.terms = terms  # UTF-8 blob of labels
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    def label(self, bucket: int) -> str:
+        i = int(np.searchsorted(self.buckets, bucket))
+        if i < len(self.buckets) and self.buckets[i] == bucket:
+            return self.terms[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+        return f"#{int(bucket)}"
+
+
+def _encode_labels(labels: Dict[int, str]) -> BucketLabels:
+    buckets = np.array(sorted(labels), dtype=np.int32)
+    terms, offsets = encode_terms(labels[int(b)] for b in buckets)
+    return BucketLabels(buckets, terms, offsets)
+
+
+class HashingTfidf:
+    """
+    TF-IDF over a HashingVectorizer: columns are ``n_features`` hashed buckets, so
+    there is no vocabulary to fit, store or load. Document frequencies are summed
+    over :meth:`partial_fit` calls, so training can stream corpus chunks.
+
+    Weighting matches ``TfidfVectorizer`` (smooth idf, L2 norm); buckets outside
+    the min_df/max_df range get idf 0, mirroring vocabulary pruning.
+
+    The sklearn hasher is created on first use, so loading a model (and showing its
+    labels) does not import sklearn; transforming or hashing text does.
+    """
+
+    model_type = "hashing"
+
+    def __init__(
+        self,
+        params: Dict[str, Any],
+        n_features: int = CFG.HASHING_N_FEATURES,
+        min_df: int = 1,
+        max_df: float = 1.0,
+        idf: np.ndarray | None = None,
+        labels: BucketLabels | None = None,
+    ) -> None:
+        self.params = {k: params[k] for k in _ANALYZER_PARAMS if k in params}
+        self.n_features = int(n_features)
+        self.min_df = min_df
+        self.max_df = max_df
+        self.idf_ = idf
+        self.labels = labels
+        self._hasher = None
+        self._df = np.zeros(self.n_features, dtype=np.int64)
+        self._n_docs = 0
+
+    @property
+    def hasher(self):
+        if self._hasher is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+
+            self._hasher = HashingVectorizer(n_features=self.n_features, **self.params, **_HASHING_FIXED)
+        return self._hasher
+
+    def build_analyzer(self):
+        return self.hasher.build_analyzer()
+
+    def bucket(self, term: str) -> int:
+        from sklearn.utils import murmurhash3_32
+
+        return abs(murmurhash3_32(term, seed=0)) % self.n_features
+
+    def term_id(self, term: str) -> int:
+        """Column of ``term``, or -1 if its bucket was pruned (or never seen in training)."""
+        j = self.bucket(term)
+        return j if self.idf_[j] > 0 else -1
+
+    def partial_fit(self, texts: Iterable[str]) -> "HashingTfidf":
+        counts = self.hasher.transform(texts)
+        counts.sum_duplicates()
+        self._df += np.bincount(counts.indices, minlength=self.n_features)
+        self._n_docs += counts.shape[0]
+        return self
+
+    def finalize(self) -> "HashingTfidf":
+        """Turn the accumulated document frequencies into idf weights."""
+        df = self._df
+        idf = np.log((1.0 + self._n_docs) / (1.0 + df)) + 1.0
+        max_docs = self.max_df if isinstance(self.max_df, int) else self.max_df * self._n_docs
+        idf[(df < self.min_df) | (df > max_docs)] = 0.0
+        self.idf_ = idf
+        logger.info(
+            "Fitted hashing TF-IDF: docs=%d | buckets used=%d/%d",
+            self._n_docs,
+            int((idf > 0).sum()),
+            self.n_features,
+        )
+        return self
+
+    def transform(self, raw_documents: Iterable[str]) -> sparse.csr_matrix:
+        X = self.hasher.transform(raw_documents)
+        X.sum_duplicates()
+        X.data *= self.idf_[X.indices]
+        X.eliminate_zeros()
+        return normalize_rows(X, "l2")
+
+    def feature_names(self, columns: Sequence[int]) -> np.ndarray:
+        labels = self.labels
+        return np.array([labels.label(c) if labels is not None else f"#{int(c)}" for c in columns], dtype=object)
+
+
+# Zero-argument callable returning a fresh iterator of (restaurants, texts) chunks
+CorpusBatches = Callable[[], Iterable[Tuple[List[str], List[str]]]]
+
+
+def build_bucket_labels(
+    model: HashingTfidf,
+    batches: CorpusBatches,
+    tfidf_matrix: sparse.csr_matrix,
+    top_k: int = max(CFG.TOP_TERMS_K, CFG.INSIGHTS_MAX_TERMS),
+    samples: int = 2,
+) -> BucketLabels:
+    """
+    Labels for every bucket in some restaurant's top-``top_k`` weights: the ``samples``
+    most frequent terms that hash there, joined with " / " when they collide. Rows
+    are ranked like :func:`recommender.top_terms`, so every term it shows is labeled.
+    """
+    from .recommender import _row_top_terms
+
+    needed = set()
+    for i in range(tfidf_matrix.shape[0]):
+        needed.update(_row_top_terms(tfidf_matrix, i, top_k)[0].tolist())
+
+    analyzer = model.build_analyzer()
+    bucket_of: Dict[str, int] = {}
+    counts: Dict[int, Counter] = defaultdict(Counter)
+    for _, texts in batches():
+        for text in texts:
+            for term in analyzer(text):
+                j = bucket_of.get(term)
+                if j is None:
+                    j = bucket_of[term] = model.bucket(term)
+                if j in needed:
+                    counts[j][term] += 1
+
+    labels = {j: " / ".join(t for t, _ in c.most_common(samples)) for j, c in counts.items()}
+    logger.info("Built bucket labels: buckets=%d", len(labels))
+    return _encode_labels(labels)
+
+
+def train_hashing_tfidf(
+    batches: CorpusBatches,
+    params: Dict[str, Any],
+    min_df_for: Callable[[int], int],
+    max_df: float,
+    n_features: int = CFG.HASHING_N_FEATURES,
+) -> Tuple[HashingTfidf, sparse.csr_matrix, Dict[str, int]]:
+    """
+    Stream the corpus chunks from ``batches`` three times: document frequencies via
+    partial fits, then the TF-IDF rows, then the display labels. ``min_df_for`` maps
+    the document count to min_df, which is only known after the first pass.
+    """
+    model = HashingTfidf(params, n_features=n_features, max_df=max_df)
+    for _, texts in batches():
+        model.partial_fit(texts)
+    model.min_df = min_df_for(model._n_docs)
+    model.finalize()
+
+    restaurants: List[str] = []
+    blocks = []
+    for names, texts in batches():
+        restaurants.extend(names)
+        blocks.append(model.transform(texts))
+    tfidf_matrix = sparse.vstack(blocks, format="csr") if blocks else sparse.csr_matrix((0, n_features))
+    model.labels = build_bucket_labels(model, batches, tfidf_matrix)
+
+    index = {r: i for i, r in enumerate(restaurants)}
+    return model, tfidf_matrix, index
+
+
+def save_hashing_arrays(model: HashingTfidf, tfidf_matrix: sparse.csr_matrix, model_dir: Path) -> None:
+    """Same layout as artifacts.save_arrays, with idf + bucket labels instead of a vocabulary."""
+    ensure_dir(model_dir)
+    tfidf_matrix = sparse.csr_matrix(tfidf_matrix)
+    tfidf_matrix.sort_indices()
+
+    save_npy(model_dir / _MATRIX_DATA, tfidf_matrix.data)
+    save_npy(model_dir / _MATRIX_INDICES, tfidf_matrix.indices)
+    save_npy(model_dir / _MATRIX_INDPTR, tfidf_matrix.indptr)
+    save_npy(model_dir / _IDF, np.asarray(model.idf_, dtype=np.float64))
+    labels = model.labels or _encode_labels({})
+    save_npy(model_dir / _LABEL_BUCKETS, labels.buckets)
+    save_npy(model_dir / _LABEL_TERMS, labels.terms)
+    save_npy(model_dir / _LABEL_OFFSETS, labels.offsets)
+
+    params = dict(model.params)
+    params["ngram_range"] = list(params["ngram_range"])
+    write_json(
+        model_dir / _META,
+        {
+            "format_version": FORMAT_VERSION,
+            "model_type": "hashing",
+            "shape": list(tfidf_matrix.shape),
+            "n_features": model.n_features,
+            "vectorizer_params": params,
+        },
+    )
+
+
+def load_hashing_arrays(
+    model_dir: Path,
+    meta: Dict[str, Any],
+    mmap_mode: str | None = "r",
+) -> Tuple[HashingTfidf, sparse.csr_matrix]:
+    def load(name: str) -> np.ndarray:
+        return np.load(model_dir / name, mmap_mode=mmap_mode)
+
+    tfidf_matrix = sparse.csr_matrix(
+        (load(_MATRIX_DATA), load(_MATRIX_INDICES), load(_MATRIX_INDPTR)),
+        shape=tuple(meta["shape"]),
+        copy=False,
+    )
+    params = dict(meta["vectorizer_params"])
+    params["ngram_range"] = tuple(params["ngram_range"])
+    labels = BucketLabels(load(_LABEL_BUCKETS), load(_LABEL_TERMS), load(_LABEL_OFFSETS))
+    model = HashingTfidf(params, n_features=meta["n_features"], idf=load(_IDF), labels=labels)
+    return model, tfidf_matrix
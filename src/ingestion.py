@@ -1,15 +1,32 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Iterator
 
 import pandas as pd
 
+from .config import CFG
+from .preprocessing import SCHEMA, preprocess_reviews
+from .review_store import write_clean_reviews
 from .utils import get_logger
 
 
 logger = get_logger(__name__)
 
 
+# Explicit dtypes for chunked reads: categories for the repetitive name columns,
+# plain strings for everything preprocess_reviews parses itself.
+RAW_DTYPES = {
+    SCHEMA.restaurant: "category",
+    SCHEMA.reviewer: "category",
+    SCHEMA.review: str,
+    SCHEMA.rating: str,
+    SCHEMA.metadata: str,
+    SCHEMA.time: str,
+    SCHEMA.pictures: str,
+}
+
+
 def load_raw_csv(csv_path: Path) -> pd.DataFrame:
     """
     Load the raw restaurant reviews CSV reliably and standardize column names.
@@ -20,4 +37,36 @@ def load_raw_csv(csv_path: Path) -> pd.DataFrame:
     df = pd.read_csv(csv_path)
     df.columns = [c.strip() for c in df.columns]
     logger.info("Loaded raw CSV: %s | shape=%s", csv_path.name, df.shape)
-    return df
\ No newline at end of file
+    return df
+
+
+def iter_raw_csv(csv_path: Path, chunksize: int = CFG.INGEST_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Yield the raw CSV in chunks of ``chunksize`` rows with explicit dtypes.
+    """
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV not found: {csv_path}")
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {c: RAW_DTYPES[c.strip()] for c in header if c.strip() in RAW_DTYPES}
+    for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize):
+        chunk.columns = [c.strip() for c in chunk.columns]
+        yield chunk
+
+
+def stream_clean_reviews(
+    csv_path: Path,
+    out_path: Path,
+    text_path: Path,
+    chunksize: int = CFG.INGEST_CHUNK_ROWS,
+) -> int:
+    """
+    Clean the raw CSV chunk by chunk and append each chunk to the columnar review
+    files (``out_path`` rows, ``text_path`` review text; see src/review_store.py),
+    so peak memory is bounded by ``chunksize`` instead of the file size.
+    Returns the number of cleaned rows written.
+    """
+    chunks = (preprocess_reviews(chunk, copy=False) for chunk in iter_raw_csv(csv_path, chunksize=chunksize))
+    rows = write_clean_reviews(chunks, out_path, text_path)
+    logger.info("Streamed clean reviews: %s | rows=%d | chunksize=%d", out_path.name, rows, chunksize)
+    return rows
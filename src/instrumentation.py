@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import bisect
+import cProfile
+import functools
+import io
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+
+from .config import CFG
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile ``q`` (the last finite bound for +Inf)."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return BUCKETS[min(i, len(BUCKETS) - 1)]
+        return 0.0
+
+
+class Registry:
+    """In-process counters and latency histograms, keyed by phase / event name."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, _Histogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = _Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def clear(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counts, totals and bucket-resolution percentiles per phase, plus the counters."""
+        with self._lock:
+            phases = {
+                name: {
+                    "count": h.count,
+                    "total_s": round(h.total, 6),
+                    "mean_ms": round(h.total / h.count * 1000.0, 3) if h.count else 0.0,
+                    "p50_ms": h.quantile(0.5) * 1000.0,
+                    "p99_ms": h.quantile(0.99) * 1000.0,
+                }
+                for name, h in sorted(self.histograms.items())
+            }
+            return {"phases": phases, "counters": dict(sorted(self.counters.items()))}
+
+    def prometheus(self, prefix: str = "reco") -> str:
+        """The registry in Prometheus text exposition format."""
+        with self._lock:
+            histograms = [(name, list(h.counts), h.count, h.total) for name, h in sorted(self.histograms.items())]
+            counters = sorted(self.counters.items())
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent per instrumented phase.",
+            f"# TYPE {prefix}_phase_seconds histogram",
+        ]
+        for name, counts, count, total in histograms:
+            label = f'phase="{_escape(name)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_phase_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{prefix}_phase_seconds_sum{{{label}}} {total!r}")
+            lines.append(f"{prefix}_phase_seconds_count{{{label}}} {count}")
+        lines += [f"# HELP {prefix}_events_total Instrumented event counts.", f"# TYPE {prefix}_events_total counter"]
+        lines += [f'{prefix}_events_total{{event="{_escape(name)}"}} {n}' for name, n in counters]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+_ENABLED = CFG.INSTRUMENTATION
+
+
+def set_enabled(enabled: bool) -> None:
+    """Turn timing on or off process-wide (off: spans and counters are no-ops)."""
+    global _ENABLED
+    _ENABLED = enabled
+
+
+def snapshot() -> Dict[str, Any]:
+    return REGISTRY.snapshot()
+
+
+def prometheus_text() -> str:
+    return REGISTRY.prometheus()
+
+
+def count(name: str, n: int = 1) -> None:
+    if _ENABLED:
+        REGISTRY.count(name, n)
+
+
+class _Profiler:
+    """Sampling cProfile / tracemalloc state shared by every profiled span."""
+
+    def __init__(self, sample_rate: float, memory: bool) -> None:
+        self.sample_rate = sample_rate
+        self.memory = memory
+        self.profile = cProfile.Profile()
+        self.active = False
+        self.samples = 0
+        self.peak_bytes: Dict[str, int] = {}
+
+
+_PROFILER: _Profiler | None = None
+
+
+def enable_profiling(sample_rate: float = CFG.PROFILE_SAMPLE_RATE, memory: bool = CFG.PROFILE_MEMORY) -> None:
+    """
+    Profile a ``sample_rate`` share of the spans opened with ``profile=True``: CPU
+    time goes to one cumulative cProfile, and with ``memory`` tracemalloc records
+    each sampled span's peak allocation. Off (and free) until called.
+    """
+    global _PROFILER
+    _PROFILER = _Profiler(sample_rate, memory)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable_profiling() -> None:
+    global _PROFILER
+    if _PROFILER is not None and _PROFILER.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _PROFILER = None
+
+
+def profile_report(limit: int = 25, sort: str = "cumulative") -> str:
+    """Top functions of the sampled spans, plus their peak allocations when tracing memory."""
+    profiler = _PROFILER
+    if profiler is None or not profiler.samples:
+        return "No profiled samples."
+    out = io.StringIO()
+    out.write(f"{profiler.samples} sampled spans\n")
+    pstats.Stats(profiler.profile, stream=out).sort_stats(sort).print_stats(limit)
+    for name, peak in sorted(profiler.peak_bytes.items()):
+        out.write(f"peak allocation {name}: {peak / 1e6:.2f} MB\n")
+    return out.getvalue()
+
+
+class _Span:
+    __slots__ = ("name", "profile", "start", "sampled", "base_bytes")
+
+    def __init__(self, name: str, profile: bool) -> None:
+        self.name = name
+        self.profile = profile
+        self.sampled: _Profiler | None = None
+
+    def __enter__(self) -> "_Span":
+        profiler = _PROFILER
+        if self.profile and profiler is not None and not profiler.active and random.random() < profiler.sample_rate:
+            # one sampled span at a time: cProfile cannot nest
+            profiler.active = True
+            self.sampled = profiler
+            if profiler.memory:
+                tracemalloc.reset_peak()
+                self.base_bytes = tracemalloc.get_traced_memory()[0]
+            profiler.profile.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        REGISTRY.observe(self.name, time.perf_counter() - self.start)
+        profiler = self.sampled
+        if profiler is not None:
+            profiler.profile.disable()
+            if profiler.memory:
+                peak = tracemalloc.get_traced_memory()[1] - self.base_bytes
+                profiler.peak_bytes[self.name] = max(profiler.peak_bytes.get(self.name, 0), peak)
+            profiler.samples += 1
+            profiler.active = False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, profile: bool = False):
+    """
+    Context manager timing its block into the ``name`` histogram. ``profile`` makes
+    the block eligible for sampling by :func:`enable_profiling`.
+    """
+    return _Span(name, profile) if _ENABLED else _NULL_SPAN
+
+
+def timed(name: str | None = None, profile: bool = False) -> Callable[[Callable], Callable]:
+    """Decorator form of :func:`span` (``name`` defaults to the function's qualified name)."""
+
+    def decorate(fn: Callable) -> Callable:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(label, profile):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
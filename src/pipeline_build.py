@@ -1,54 +1,582 @@
 from __future__ import annotations
 
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
 import pandas as pd
+from scipy import sparse
 
-from src.config import PATHS
-from src.ingestion import load_raw_csv
-from src.preprocessing import preprocess_reviews
-from src.feature_engineering import build_restaurant_profiles, build_restaurant_corpus
-from src.recommender import train_tfidf, save_model
-from src.utils import ensure_dir, get_logger
+from src.config import CFG, PATHS
+from src.ingestion import load_raw_csv, stream_clean_reviews
+from src.preprocessing import SCHEMA, preprocess_reviews
+from src.ann import build_ivf_index, build_pq_index, fit_svd_embeddings, save_ivf_index, save_pq_index
+from src.artifacts import save_matrix
+from src.components.plotting import prerender_eda_figures
+from src.eda_aggregates import build_eda_aggregates, load_eda_aggregates, save_eda_aggregates
+from src.evaluation import ann_recall_at_k, pq_report
+from src.feature_engineering import (
+    aggregate_restaurant_profiles,
+    build_restaurant_corpus,
+    build_restaurant_profiles,
+    fill_profile_defaults,
+    merge_restaurant_corpus,
+    merge_restaurant_profiles,
+)
+from src.recommender import (
+    TFIDF_MIN_DF,
+    TFIDF_MIN_DOCS_FOR_MIN_DF,
+    TFIDF_PARAMS,
+    build_neighbor_table,
+    build_top_terms_table,
+    load_model,
+    load_neighbors,
+    patch_tfidf_rows,
+    save_model,
+    save_neighbors,
+    save_top_terms,
+    train_model,
+    update_neighbor_table,
+    vocabulary_drift,
+)
+from src.generations import current_generation, publish_generation
+from src.instrumentation import enable_profiling, profile_report, span
+from src.pipeline_cache import Stage, StageCache
+from src.review_store import (
+    append_clean_reviews,
+    count_reviews,
+    read_clean_reviews,
+    read_review_text,
+    review_files,
+    write_clean_reviews,
+)
+from src.utils import ensure_dir, get_logger, write_json
 
 logger = get_logger(__name__)
 
 
-def main() -> None:
+def shard_by_restaurant(df: pd.DataFrame, n_shards: int) -> List[pd.DataFrame]:
+    """
+    Split ``df`` into ``n_shards`` frames so every restaurant lands in exactly one.
+    Uses pandas' fixed-key hash (not Python's salted ``hash``), so shards are stable
+    across processes and runs. Row order within a shard is preserved.
+    """
+    key = df[SCHEMA.restaurant].astype(str).str.strip()
+    shard_ids = pd.util.hash_pandas_object(key, index=False).to_numpy() % np.uint64(n_shards)
+    return [df[shard_ids == i] for i in range(n_shards)]
+
+
+def _process_shard(shard: pd.DataFrame, clean: bool) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    if clean:
+        shard = preprocess_reviews(shard, copy=False)
+    return shard, aggregate_restaurant_profiles(shard), build_restaurant_corpus(shard)
+
+
+def build_features(
+    df: pd.DataFrame,
+    n_jobs: int = 1,
+    clean: bool = True,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Clean reviews (unless ``clean=False``) and build profiles + corpus.
+
+    With ``n_jobs > 1`` the rows are sharded by restaurant and each shard is processed
+    in its own worker process. Shards are merged back in original row order / sorted
+    restaurant order, and dataset-wide defaults are filled after the merge, so the
+    result is identical to ``n_jobs=1``. ``n_jobs=-1`` uses every CPU.
+    """
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+
+    if n_jobs <= 1:
+        df_clean = preprocess_reviews(df, copy=False) if clean else df
+        return df_clean, build_restaurant_profiles(df_clean), build_restaurant_corpus(df_clean)
+
+    shards = [s for s in shard_by_restaurant(df, n_jobs) if len(s)]
+    with ProcessPoolExecutor(max_workers=min(n_jobs, max(len(shards), 1))) as pool:
+        results = list(pool.map(_process_shard, shards, [clean] * len(shards)))
+
+    df_clean = pd.concat([r[0] for r in results]).sort_index(kind="stable")
+    profiles = (
+        pd.concat([r[1] for r in results], ignore_index=True)
+        .sort_values(SCHEMA.restaurant, kind="stable")
+        .reset_index(drop=True)
+    )
+    corpus = (
+        pd.concat([r[2] for r in results], ignore_index=True)
+        .sort_values(SCHEMA.restaurant, kind="stable")
+        .reset_index(drop=True)
+    )
+    profiles = fill_profile_defaults(profiles)
+    logger.info("Built features from %d shards: profiles=%s corpus=%s", len(shards), profiles.shape, corpus.shape)
+    return df_clean, profiles, corpus
+
+
+def main(
+    chunksize: int | None = None,
+    n_jobs: int = 1,
+    force: bool = False,
+    ann: bool = CFG.USE_ANN,
+    pq: bool = CFG.USE_PQ,
+) -> None:
+    """
+    Build processed data and model artifacts. With ``chunksize`` the raw CSV is
+    streamed and cleaned in chunks of that many rows instead of loaded at once.
+    ``n_jobs`` spreads cleaning and profile/corpus building over worker processes.
+    ``ann`` / ``pq`` also build the IVF / product-quantized retrieval indexes
+    (models/ann) with their recall and memory reports.
+
+    Each stage is skipped when the content hash of its inputs, settings and code
+    matches the one in ``PATHS.BUILD_MANIFEST`` and its outputs are unchanged;
+    ``force`` rebuilds everything. Raises ``RuntimeError`` rather than re-cleaning
+    the raw CSV while reviews appended by ``update_incremental`` would be lost.
+    """
     # Ensure folders exist
     ensure_dir(PATHS.PROCESSED_DIR)
     ensure_dir(PATHS.MODELS_DIR)
 
-    # 1) Load raw
-    df_raw = load_raw_csv(PATHS.RAW_CSV)
+    cache = StageCache(PATHS.BUILD_MANIFEST, root=PATHS.ROOT, force=force)
+    stages = _stages(ann, pq)
+    deltas = review_files(PATHS.CLEAN_PARQUET)[1:]
+    if deltas and not cache.is_fresh(stages["clean"]):
+        # the clean stage rewrites the review files from the raw CSV and would drop the appended parts
+        raise RuntimeError(
+            f"{len(deltas)} delta part(s) were appended to {PATHS.CLEAN_PARQUET} since the last full build "
+            f"and rebuilding it from {PATHS.RAW_CSV} would drop them. Add the delta reviews to the raw CSV "
+            f"and delete the .part-* files (or keep using --delta)."
+        )
+    # Frames produced by one stage and reused by the next within this run
+    built: Dict[str, object] = {}
 
-    # 2) Clean
-    df_clean = preprocess_reviews(df_raw)
-    df_clean.to_parquet(PATHS.CLEAN_PARQUET, index=False)
-    logger.info("Saved: %s", PATHS.CLEAN_PARQUET)
+    # 1+2) Load + clean raw reviews
+    def clean() -> None:
+        if chunksize:
+            stream_clean_reviews(PATHS.RAW_CSV, PATHS.CLEAN_PARQUET, PATHS.CLEAN_TEXT_PARQUET, chunksize=chunksize)
+        else:
+            df_raw = load_raw_csv(PATHS.RAW_CSV)
+            df_clean, built["profiles"], built["corpus"] = build_features(df_raw, n_jobs=n_jobs)
+            write_clean_reviews([df_clean])
+        logger.info("Saved: %s, %s", PATHS.CLEAN_PARQUET, PATHS.CLEAN_TEXT_PARQUET)
+
+    cache.run(stages["clean"], clean)
 
     # 3) Profiles + corpus
-    profiles = build_restaurant_profiles(df_clean)
-    corpus = build_restaurant_corpus(df_clean)
+    def features() -> None:
+        if "profiles" not in built:
+            _, built["profiles"], built["corpus"] = build_features(
+                read_clean_reviews(), n_jobs=n_jobs, clean=False
+            )
 
-    profiles.to_parquet(PATHS.PROFILES_PARQUET, index=False)
-    corpus.to_parquet(PATHS.CORPUS_PARQUET, index=False)
-    logger.info("Saved: %s", PATHS.PROFILES_PARQUET)
-    logger.info("Saved: %s", PATHS.CORPUS_PARQUET)
+    def profiles() -> None:
+        features()
+        built["profiles"].to_parquet(PATHS.PROFILES_PARQUET, index=False)
+        logger.info("Saved: %s", PATHS.PROFILES_PARQUET)
+
+    def corpus() -> None:
+        features()
+        _save_corpus(built["corpus"])
+        logger.info("Saved: %s", PATHS.CORPUS_PARQUET)
+
+    cache.run(stages["profiles"], profiles)
+    cache.run(stages["corpus"], corpus)
+
+    # 3b) Aggregates behind the EDA page
+    def eda() -> None:
+        profiles_df = built["profiles"] if "profiles" in built else pd.read_parquet(PATHS.PROFILES_PARQUET)
+        save_eda_aggregates(build_eda_aggregates(profiles_df))
+        logger.info("Saved: %s", PATHS.EDA_AGGREGATES)
+
+    cache.run(stages["eda"], eda)
+
+    # 3c) Optional: pre-render the EDA page's figures for these aggregates
+    def figures() -> None:
+        prerender_eda_figures(load_eda_aggregates())
+
+    if CFG.PRERENDER_FIGURES:
+        cache.run(stages["figures"], figures)
 
     # 4) Train TF-IDF + save artifacts
-    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    def tfidf() -> None:
+        built.pop("corpus", None)  # training streams the parquet instead
+        built["tfidf_matrix"] = _fit_and_save_tfidf()
+        logger.info("Saved TF-IDF artifacts into: %s", PATHS.MODELS_DIR)
+
+    cache.run(stages["tfidf"], tfidf)
+
+    # 5) Top-K neighbor table for seed-restaurant recommendations
+    def neighbors() -> None:
+        if "tfidf_matrix" in built:
+            tfidf_matrix = built["tfidf_matrix"]
+        else:
+            _, tfidf_matrix, _ = load_model(PATHS.TFIDF_DIR, PATHS.RESTAURANT_INDEX)
+        _save_neighbor_table(tfidf_matrix)
+        logger.info("Saved: %s", PATHS.NEIGHBOR_IDS)
+
+    cache.run(stages["neighbors"], neighbors)
+
+    # 5b) Top terms per restaurant, for readers that do not load the matrix
+    if CFG.PRECOMPUTE_TOP_TERMS:
+        cache.run(stages["top_terms"], _save_top_terms)
+    elif PATHS.TOP_TERMS.exists():
+        # would be published with a model it no longer matches
+        PATHS.TOP_TERMS.unlink()
+
+    # 6) Optional approximate retrieval: SVD embeddings + IVF index and/or PQ codes,
+    #    with recall@k (and memory) reports vs the exact path
+    def ann_index() -> None:
+        _save_ann_index(ann, pq)
+
+    if ann or pq:
+        cache.run(stages["ann"], ann_index)
+    elif PATHS.ANN_DIR.exists():
+        # would be published and loaded although both modes are off
+        shutil.rmtree(PATHS.ANN_DIR)
+
+    # Readers (app, services) switch to a new generation only once it is complete
+    if cache.built or current_generation() is None:
+        with span("pipeline.publish"):
+            publish_generation()
+
+    logger.info("Pipeline complete ✅ (manifest: %s)", PATHS.BUILD_MANIFEST)
+
+
+def _stages(ann: bool, pq: bool) -> Dict[str, Stage]:
+    """The build's stages by name, shared by ``main`` and the manifest update in ``update_incremental``."""
+    src_dir = PATHS.ROOT / "src"
+    feature_code = [src_dir / "feature_engineering.py"]
+    # base files plus any parts appended by update_incremental
+    clean_files = review_files(PATHS.CLEAN_PARQUET) + review_files(PATHS.CLEAN_TEXT_PARQUET)
+    stages = [
+        Stage(
+            "clean",
+            inputs=[PATHS.RAW_CSV],
+            outputs=[PATHS.CLEAN_PARQUET, PATHS.CLEAN_TEXT_PARQUET],
+            code=[src_dir / "ingestion.py", src_dir / "preprocessing.py", src_dir / "review_store.py"],
+        ),
+        Stage("profiles", clean_files, [PATHS.PROFILES_PARQUET], code=feature_code),
+        Stage("corpus", clean_files, [PATHS.CORPUS_PARQUET], code=feature_code),
+        Stage(
+            "eda",
+            inputs=clean_files + [PATHS.PROFILES_PARQUET],
+            outputs=[PATHS.EDA_AGGREGATES],
+            params={
+                "bins": CFG.EDA_RATING_BINS,
+                "sample_per_rating": CFG.EDA_SAMPLE_PER_RATING,
+                "top_restaurants": CFG.EDA_TOP_RESTAURANTS,
+                "random_state": CFG.RANDOM_STATE,
+            },
+            code=[src_dir / "eda_aggregates.py"],
+        ),
+        Stage(
+            "figures",
+            inputs=[PATHS.EDA_AGGREGATES],
+            outputs=[PATHS.FIGURE_CACHE_DIR],
+            params={"dpi": CFG.FIGURE_DPI, "top_n": list(CFG.FIGURE_PRERENDER_TOP_N)},
+            code=[src_dir / "components" / "plotting.py"],
+        ),
+        Stage(
+            "tfidf",
+            inputs=[PATHS.CORPUS_PARQUET],
+            outputs=[PATHS.TFIDF_DIR, PATHS.RESTAURANT_INDEX],
+            params={
+                "vectorizer": TFIDF_PARAMS,
+                "min_df": TFIDF_MIN_DF,
+                "min_docs_for_min_df": TFIDF_MIN_DOCS_FOR_MIN_DF,
+                "model_type": CFG.MODEL_TYPE,
+                "n_features": CFG.HASHING_N_FEATURES if CFG.MODEL_TYPE == "hashing" else None,
+            },
+            code=[src_dir / "recommender.py", src_dir / "artifacts.py", src_dir / "hashing_model.py"],
+        ),
+        Stage(
+            "neighbors",
+            inputs=[PATHS.TFIDF_DIR],
+            outputs=[PATHS.NEIGHBOR_IDS, PATHS.NEIGHBOR_SCORES],
+            params={"k": CFG.NEIGHBORS_K},
+            code=[src_dir / "recommender.py"],
+        ),
+        Stage(
+            "top_terms",
+            inputs=[PATHS.TFIDF_DIR, PATHS.RESTAURANT_INDEX],
+            outputs=[PATHS.TOP_TERMS],
+            params={"k": CFG.TOP_TERMS_K},
+            code=[src_dir / "recommender.py"],
+        ),
+        Stage(
+            "ann",
+            inputs=[PATHS.TFIDF_DIR, PATHS.PROFILES_PARQUET],
+            outputs=[PATHS.ANN_DIR],
+            params={
+                "ivf": ann,
+                "pq": pq,
+                "components": CFG.ANN_COMPONENTS,
+                "lists": CFG.ANN_LISTS,
+                "kmeans_iters": CFG.ANN_KMEANS_ITERS,
+                "pq_subspaces": CFG.PQ_SUBSPACES,
+                "random_state": CFG.RANDOM_STATE,
+            },
+            code=[src_dir / "ann.py"],
+        ),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+def _save_corpus(corpus: pd.DataFrame) -> None:
+    # Small row groups let train_model stream the file a chunk at a time
+    corpus.to_parquet(PATHS.CORPUS_PARQUET, index=False, row_group_size=CFG.TRAIN_CHUNK_ROWS)
+
 
+def _fit_and_save_tfidf() -> sparse.csr_matrix:
+    vectorizer, tfidf_matrix, index = train_model(PATHS.CORPUS_PARQUET)
     save_model(
         vectorizer=vectorizer,
         tfidf_matrix=tfidf_matrix,
         index=index,
-        vectorizer_path=PATHS.TFIDF_VECTORIZER,
-        matrix_path=PATHS.TFIDF_MATRIX,
+        model_dir=PATHS.TFIDF_DIR,
         index_path=PATHS.RESTAURANT_INDEX,
     )
-    logger.info("Saved TF-IDF artifacts into: %s", PATHS.MODELS_DIR)
+    return tfidf_matrix
 
-    logger.info("Pipeline complete ✅")
+
+def _save_neighbor_table(tfidf_matrix: sparse.csr_matrix) -> None:
+    neighbor_ids, neighbor_scores = build_neighbor_table(tfidf_matrix)
+    save_neighbors(neighbor_ids, neighbor_scores, PATHS.NEIGHBOR_IDS, PATHS.NEIGHBOR_SCORES)
+
+
+def _save_top_terms() -> None:
+    vectorizer, tfidf_matrix, index = load_model(PATHS.TFIDF_DIR, PATHS.RESTAURANT_INDEX)
+    save_top_terms(build_top_terms_table(vectorizer, tfidf_matrix, index), PATHS.TOP_TERMS)
+    logger.info("Saved: %s", PATHS.TOP_TERMS)
+
+
+def _save_ann_index(ann: bool, pq: bool) -> None:
+    # IVF and PQ files share the directory; start empty so a disabled mode leaves nothing behind
+    if PATHS.ANN_DIR.exists():
+        shutil.rmtree(PATHS.ANN_DIR)
+    vectorizer, tfidf_matrix, index = load_model(PATHS.TFIDF_DIR, PATHS.RESTAURANT_INDEX)
+    profiles_df = pd.read_parquet(PATHS.PROFILES_PARQUET)
+    components_t, embeddings = fit_svd_embeddings(tfidf_matrix)
+    if ann:
+        ivf = build_ivf_index(components_t, embeddings)
+        save_ivf_index(ivf, PATHS.ANN_DIR)
+        report = ann_recall_at_k(profiles_df, vectorizer, tfidf_matrix, index, ivf)
+        write_json(PATHS.ANN_DIR / "recall.json", report)
+    if pq:
+        pq_index = build_pq_index(components_t, embeddings)
+        save_pq_index(pq_index, PATHS.ANN_DIR)
+        write_json(PATHS.ANN_DIR / "pq_report.json", pq_report(profiles_df, vectorizer, tfidf_matrix, index, pq_index))
+    logger.info("Saved: %s", PATHS.ANN_DIR)
+
+
+def _refresh_ann_index(ann: bool, pq: bool) -> None:
+    """After the matrix changed outside the ann stage: rebuild the retrieval indexes, or drop them."""
+    if ann or pq:
+        _save_ann_index(ann, pq)
+    elif PATHS.ANN_DIR.exists():
+        # would be published with a matrix it no longer matches
+        shutil.rmtree(PATHS.ANN_DIR)
+
+
+def _fit_and_save_model() -> None:
+    _save_neighbor_table(_fit_and_save_tfidf())
+    if CFG.PRECOMPUTE_TOP_TERMS:
+        _save_top_terms()
+
+
+def update_incremental(
+    delta_csv,
+    max_vocab_drift: float = CFG.INCREMENTAL_MAX_VOCAB_DRIFT,
+    ann: bool = CFG.USE_ANN,
+    pq: bool = CFG.USE_PQ,
+) -> None:
+    """
+    Fold a CSV of new reviews into an existing build without reprocessing old reviews.
+
+    Only the new rows are cleaned. Affected restaurants' profiles are updated from
+    running rating sums/counts and their corpora extended; their TF-IDF rows are
+    re-transformed with the existing vocabulary and patched into the matrix, the
+    restaurant index and the neighbor table. If the new reviews drift too far from
+    the fitted vocabulary (see ``vocabulary_drift``) TF-IDF is refit from scratch.
+    The ``ann`` / ``pq`` retrieval indexes are rebuilt for the new matrix, or removed
+    when neither is enabled. The rewritten outputs are recorded in the build manifest
+    so a later ``main`` reuses them. Falls back to a full build when there is no
+    previous build.
+    """
+    previous = [
+        PATHS.CLEAN_PARQUET,
+        PATHS.CLEAN_TEXT_PARQUET,
+        PATHS.PROFILES_PARQUET,
+        PATHS.CORPUS_PARQUET,
+        PATHS.RESTAURANT_INDEX,
+        PATHS.TFIDF_DIR / "meta.json",
+    ]
+    if not all(p.exists() for p in previous):
+        logger.info("No previous build found; running a full build")
+        main(ann=ann, pq=pq)
+        return
+
+    # 1) Clean only the new rows
+    with span("pipeline.incremental.clean"):
+        df_delta = preprocess_reviews(load_raw_csv(Path(delta_csv)), copy=False)
+    if df_delta.empty:
+        logger.info("No usable reviews in %s; nothing to update", delta_csv)
+        return
+
+    # 2) Append to the cleaned table
+    with span("pipeline.incremental.append"):
+        n_reviews = count_reviews()
+        step = max(1, n_reviews // max(1, CFG.INCREMENTAL_DRIFT_SAMPLE))
+        reference_reviews = read_review_text(np.arange(0, n_reviews, step)).to_pylist()
+        append_clean_reviews(df_delta)
+    logger.info("Appended %d reviews to: %s", len(df_delta), PATHS.CLEAN_PARQUET)
+
+    # 3) Profiles + corpus of the affected restaurants
+    with span("pipeline.incremental.profiles"):
+        profiles = merge_restaurant_profiles(
+            pd.read_parquet(PATHS.PROFILES_PARQUET),
+            aggregate_restaurant_profiles(df_delta),
+        )
+        delta_corpus = build_restaurant_corpus(df_delta)
+        corpus = merge_restaurant_corpus(pd.read_parquet(PATHS.CORPUS_PARQUET), delta_corpus)
+        profiles.to_parquet(PATHS.PROFILES_PARQUET, index=False)
+        _save_corpus(corpus)
+    logger.info("Saved: %s", PATHS.PROFILES_PARQUET)
+    logger.info("Saved: %s", PATHS.CORPUS_PARQUET)
+
+    # EDA aggregates are a single pass over the text-free review file
+    with span("pipeline.incremental.eda"):
+        aggregates = build_eda_aggregates(profiles)
+        save_eda_aggregates(aggregates)
+        if CFG.PRERENDER_FIGURES:
+            prerender_eda_figures(aggregates)
+    logger.info("Saved: %s", PATHS.EDA_AGGREGATES)
+
+    # 4) TF-IDF: patch the changed rows, or refit on vocabulary drift
+    vectorizer, tfidf_matrix, index = load_model(PATHS.TFIDF_DIR, PATHS.RESTAURANT_INDEX)
+    drift = vocabulary_drift(vectorizer, df_delta[SCHEMA.review], reference_reviews)
+    if drift > max_vocab_drift:
+        logger.info("Vocabulary drift %.3f > %.3f; refitting TF-IDF", drift, max_vocab_drift)
+        with span("pipeline.incremental.refit"):
+            _fit_and_save_model()
+        with span("pipeline.incremental.ann"):
+            _refresh_ann_index(ann, pq)
+        _record_incremental_build(ann, pq)
+        with span("pipeline.publish"):
+            publish_generation()
+        logger.info("Incremental update complete (full refit) ✅")
+        return
+
+    with span("pipeline.incremental.tfidf"):
+        changed = delta_corpus[SCHEMA.restaurant].astype(str).tolist()
+        for name in changed:
+            if name not in index:
+                index[name] = len(index)
+        rows = np.array([index[name] for name in changed], dtype=np.int64)
+        texts = corpus.set_index(SCHEMA.restaurant).loc[changed, "corpus"].astype(str).tolist()
+        tfidf_matrix = patch_tfidf_rows(tfidf_matrix, rows, vectorizer.transform(texts))
+
+        save_matrix(tfidf_matrix, PATHS.TFIDF_DIR)
+        write_json(PATHS.RESTAURANT_INDEX, index)
+    logger.info("Patched %d TF-IDF rows (drift %.3f)", len(rows), drift)
+
+    # 5) Neighbor table
+    with span("pipeline.incremental.neighbors"):
+        neighbors = load_neighbors(PATHS.NEIGHBOR_IDS, PATHS.NEIGHBOR_SCORES)
+        if neighbors is None:
+            neighbor_ids, neighbor_scores = build_neighbor_table(tfidf_matrix)
+        else:
+            neighbor_ids, neighbor_scores = update_neighbor_table(tfidf_matrix, *neighbors, changed_rows=rows)
+        save_neighbors(neighbor_ids, neighbor_scores, PATHS.NEIGHBOR_IDS, PATHS.NEIGHBOR_SCORES)
+    if CFG.PRECOMPUTE_TOP_TERMS:
+        with span("pipeline.incremental.top_terms"):
+            _save_top_terms()
+    with span("pipeline.incremental.ann"):
+        _refresh_ann_index(ann, pq)
+    _record_incremental_build(ann, pq)
+    with span("pipeline.publish"):
+        publish_generation()
+
+    logger.info("Incremental update complete ✅")
+
+
+def _record_incremental_build(ann: bool, pq: bool) -> None:
+    """Record the files update_incremental rewrote in the build manifest, so ``main`` reuses them."""
+    cache = StageCache(PATHS.BUILD_MANIFEST, root=PATHS.ROOT)
+    stages = _stages(ann, pq)
+    names = ["profiles", "corpus", "eda", "tfidf", "neighbors"]
+    if CFG.PRERENDER_FIGURES:
+        names.append("figures")
+    if CFG.PRECOMPUTE_TOP_TERMS:
+        names.append("top_terms")
+    if ann or pq:
+        names.append("ann")
+    for name in names:
+        cache.record(stages[name])
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build processed data and TF-IDF artifacts.")
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help=f"Stream the raw CSV in chunks of this many rows (e.g. {CFG.INGEST_CHUNK_ROWS}).",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=1,
+        help="Worker processes for cleaning and profile/corpus building (-1 = all CPUs).",
+    )
+    parser.add_argument(
+        "--delta",
+        type=Path,
+        default=None,
+        help="CSV of new reviews to fold into the existing build instead of rebuilding.",
+    )
+    parser.add_argument(
+        "--max-vocab-drift",
+        type=float,
+        default=CFG.INCREMENTAL_MAX_VOCAB_DRIFT,
+        help="With --delta, refit TF-IDF when vocabulary drift exceeds this.",
+    )
+    parser.add_argument(
+        "--ann",
+        action="store_true",
+        default=CFG.USE_ANN,
+        help="Also build the approximate nearest-neighbor index (models/ann).",
+    )
+    parser.add_argument(
+        "--pq",
+        action="store_true",
+        default=CFG.USE_PQ,
+        help="Also build the product-quantized compact embedding store (models/ann).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every stage even if the build manifest says it is up to date.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        help="cProfile every stage (with tracemalloc peaks) and write the report to this file.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = _parse_args()
+    if args.profile:
+        enable_profiling(sample_rate=1.0, memory=True)
+    if args.delta:
+        update_incremental(args.delta, max_vocab_drift=args.max_vocab_drift, ann=args.ann, pq=args.pq)
+    else:
+        main(chunksize=args.chunksize, n_jobs=args.n_jobs, force=args.force, ann=args.ann, pq=args.pq)
+    if args.profile:
+        args.profile.write_text(profile_report(limit=40), encoding="utf-8")
+        logger.info("Profile written to %s", args.profile)
\ No newline at end of file
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+from .instrumentation import count, span
+from .utils import get_logger, read_json, write_json
+
+logger = get_logger(__name__)
+
+
+MANIFEST_VERSION = 1
+_HASH_BLOCK = 1 << 20
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One pipeline_build step: the files it reads, the files it writes, and every
+    setting that changes its output. ``code`` lists source files whose edits
+    should invalidate the stage.
+    """
+
+    name: str
+    inputs: Sequence[Path]
+    outputs: Sequence[Path]
+    params: Dict[str, Any] = field(default_factory=dict)
+    code: Sequence[Path] = ()
+
+
+class StageCache:
+    """
+    Skips stages whose inputs, params and code hash to the key recorded in the
+    manifest, as long as their outputs are still the files that were written.
+
+    File hashes are memoized by (size, mtime) in the manifest, so unchanged files
+    are not re-read on every run.
+    """
+
+    def __init__(self, manifest_path: Path, root: Path, force: bool = False) -> None:
+        self.manifest_path = manifest_path
+        self.root = root
+        self.force = force
+        manifest = read_json(manifest_path) if manifest_path.exists() else {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            manifest = {}
+        self.stages: Dict[str, Dict[str, Any]] = manifest.get("stages", {})
+        self._files: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+        # names of the stages that ran (were not reused) in this process
+        self.built: List[str] = []
+
+    def _name(self, path: Path) -> str:
+        try:
+            return Path(path).resolve().relative_to(self.root).as_posix()
+        except ValueError:
+            return Path(path).resolve().as_posix()
+
+    def _file_digest(self, path: Path) -> str:
+        stat = path.stat()
+        name = self._name(path)
+        cached = self._files.get(name)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                h.update(block)
+        self._files[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": h.hexdigest()}
+        return h.hexdigest()
+
+    def digest(self, path: Path) -> str | None:
+        """sha256 of a file, or of a directory's files and names; None if missing."""
+        path = Path(path)
+        if path.is_file():
+            return self._file_digest(path)
+        if path.is_dir():
+            h = hashlib.sha256()
+            for child in sorted(p for p in path.rglob("*") if p.is_file()):
+                h.update(child.relative_to(path).as_posix().encode("utf-8"))
+                h.update(self._file_digest(child).encode("ascii"))
+            return h.hexdigest()
+        return None
+
+    def key(self, stage: Stage) -> str:
+        payload = {
+            "inputs": {self._name(p): self.digest(p) for p in stage.inputs},
+            "params": stage.params,
+            "code": {self._name(p): self.digest(p) for p in stage.code},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, stage: Stage) -> bool:
+        previous = self.stages.get(stage.name)
+        if self.force or previous is None or previous.get("key") != self.key(stage):
+            return False
+        return all(self.digest(p) == previous["outputs"].get(self._name(p)) for p in stage.outputs)
+
+    def run(self, stage: Stage, fn: Callable[[], None]) -> bool:
+        """Run ``fn`` unless ``stage`` is fresh. Returns True if it ran."""
+        if self.is_fresh(stage):
+            self.stages[stage.name]["status"] = "reused"
+            count(f"pipeline.{stage.name}.reused")
+            logger.info("Stage %s: up to date, reused", stage.name)
+            self.save()
+            return False
+
+        key = self.key(stage)
+        start = time.perf_counter()
+        with span(f"pipeline.{stage.name}", profile=True):
+            fn()
+        self._record(stage, key, "built", time.perf_counter() - start)
+        logger.info("Stage %s: built in %.2fs", stage.name, self.stages[stage.name]["seconds"])
+        self.built.append(stage.name)
+        self.save()
+        return True
+
+    def record(self, stage: Stage, status: str = "incremental", seconds: float = 0.0) -> None:
+        """Record outputs that were written outside ``run`` as ``stage``'s current build."""
+        self._record(stage, self.key(stage), status, seconds)
+        self.save()
+
+    def _record(self, stage: Stage, key: str, status: str, seconds: float) -> None:
+        self.stages[stage.name] = {
+            "status": status,
+            "key": key,
+            "seconds": round(seconds, 3),
+            "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "inputs": {self._name(p): self.digest(p) for p in stage.inputs},
+            "params": json.loads(json.dumps(stage.params, default=str)),
+            "outputs": {self._name(p): self.digest(p) for p in stage.outputs},
+        }
+
+    def save(self) -> None:
+        write_json(
+            self.manifest_path,
+            {"version": MANIFEST_VERSION, "stages": self.stages, "files": self._files},
+        )
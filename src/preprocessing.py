@@ -6,6 +6,8 @@ from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from .utils import get_logger
 
@@ -31,6 +33,22 @@ _TEXT_WS_RE = re.compile(r"\s+")
 _URL_RE = re.compile(r"http\S+|www\.\S+")
 _NON_PRINTABLE_RE = re.compile(r"[\x00-\x1f\x7f-\x9f]")
 
+_META_REVIEWS_RE = re.compile(r"(\d+)\s*Review", flags=re.IGNORECASE)
+_META_FOLLOWERS_RE = re.compile(r"(\d+)\s*Follower", flags=re.IGNORECASE)
+
+# The vectorized path runs on pyarrow's RE2 kernels, whose \s and \S are ASCII-only.
+# Python's str.isspace() set is spelled out so results match the `re` versions above.
+_PY_WHITESPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+_RE2_WS = r"\t\n\x0b\x0c\r\x1c-\x20\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}"
+_RE2_URL = rf"http[^{_RE2_WS}]+|www\.[^{_RE2_WS}]+"
+# Non-printables become spaces and whitespace runs collapse to one space, so one
+# pass over runs of either gives the same result as the two `re` passes.
+_RE2_NON_PRINTABLE_OR_WS = rf"[\x00-\x1f\x7f-\x{{9f}}{_RE2_WS}]+"
+# ASCII-only metadata patterns; rows with non-ASCII text go through _parse_metadata.
+_RE2_META_REVIEWS = r"(?P<count>[0-9]+)[\t\n\x0b\x0c\r\x1c-\x20]*(?i:review)"
+_RE2_META_FOLLOWERS = r"(?P<count>[0-9]+)[\t\n\x0b\x0c\r\x1c-\x20]*(?i:follower)"
+_INT32_MAX = np.iinfo(np.int32).max
+
 
 def _clean_text(s: str) -> str:
     s = s.strip()
@@ -49,15 +67,65 @@ def _parse_metadata(meta: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
         return None, None
 
     text = str(meta)
-    reviews_match = re.search(r"(\d+)\s*Review", text, flags=re.IGNORECASE)
-    followers_match = re.search(r"(\d+)\s*Follower", text, flags=re.IGNORECASE)
+    reviews_match = _META_REVIEWS_RE.search(text)
+    followers_match = _META_FOLLOWERS_RE.search(text)
 
     reviews = int(reviews_match.group(1)) if reviews_match else None
     followers = int(followers_match.group(1)) if followers_match else None
     return reviews, followers
 
 
-def preprocess_reviews(df: pd.DataFrame) -> pd.DataFrame:
+def clean_text_series(s: pd.Series) -> pd.Series:
+    """
+    Vectorized :func:`_clean_text` over a Series of str (identical output).
+    """
+    try:
+        arr = pa.array(s, type=pa.string(), from_pandas=True)
+    except (pa.ArrowException, UnicodeEncodeError):
+        # e.g. lone surrogates, which Arrow cannot hold
+        return s.map(_clean_text)
+
+    arr = pc.utf8_trim(arr, characters=_PY_WHITESPACE)
+    arr = pc.replace_substring_regex(arr, pattern=_RE2_URL, replacement="")
+    arr = pc.replace_substring_regex(arr, pattern=_RE2_NON_PRINTABLE_OR_WS, replacement=" ")
+    return pd.Series(arr.to_numpy(zero_copy_only=False), index=s.index, name=s.name)
+
+
+def _extract_count(arr: pa.Array, pattern: str) -> pd.Series:
+    digits = pc.struct_field(pc.extract_regex(arr, pattern=pattern), [0])
+    digits = pc.utf8_ltrim(digits, characters="0")
+    # Counts beyond int32 range are treated as unparseable.
+    digits = pc.if_else(pc.greater(pc.utf8_length(digits), 10), None, digits)
+    digits = pc.if_else(pc.equal(digits, ""), "0", digits)
+    counts = pd.Series(pc.cast(digits, pa.int64()).to_numpy(zero_copy_only=False), dtype="Int64")
+    return counts.where(counts <= _INT32_MAX).astype("Int32")
+
+
+def parse_metadata_series(meta: pd.Series) -> pd.DataFrame:
+    """
+    Vectorized :func:`_parse_metadata`: returns nullable Int32 columns
+    'reviewer_total_reviews' and 'reviewer_followers'.
+    """
+    text = meta.astype(str).where(meta.notna(), None)
+    arr = pa.array(text, type=pa.string(), from_pandas=True)
+    parsed = pd.DataFrame(
+        {
+            "reviewer_total_reviews": _extract_count(arr, _RE2_META_REVIEWS),
+            "reviewer_followers": _extract_count(arr, _RE2_META_FOLLOWERS),
+        }
+    )
+    parsed.index = meta.index
+
+    non_ascii = ~pc.fill_null(pc.string_is_ascii(arr), True).to_numpy(zero_copy_only=False)
+    if non_ascii.any():
+        fallback = [_parse_metadata(m) for m in text[non_ascii]]
+        for col, values in zip(parsed.columns, zip(*fallback)):
+            counts = pd.Series(values, dtype="Int64")
+            parsed.loc[non_ascii, col] = counts.where(counts <= _INT32_MAX).astype("Int32").to_numpy()
+    return parsed
+
+
+def preprocess_reviews(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Clean and standardize the dataset:
     - Drop unnamed/garbage columns
@@ -65,8 +133,11 @@ def preprocess_reviews(df: pd.DataFrame) -> pd.DataFrame:
     - Parse time to datetime
     - Clean review text
     - Parse metadata into numeric features
+
+    Pass copy=False when the caller owns ``df`` (e.g. a streamed chunk) to clean it in place.
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
 
     # Drop unnamed / garbage columns (like '7514' or 'Unnamed: 0')
     drop_cols = [c for c in df.columns if c.lower().startswith("unnamed") or c.strip() == "7514"]
@@ -86,16 +157,16 @@ def preprocess_reviews(df: pd.DataFrame) -> pd.DataFrame:
     df[SCHEMA.time] = pd.to_datetime(df[SCHEMA.time], errors="coerce")
 
     # Text cleaning
-    df[SCHEMA.review] = df[SCHEMA.review].astype(str).map(_clean_text)
+    df[SCHEMA.review] = clean_text_series(df[SCHEMA.review].astype(str))
 
     # Metadata parsing
     if SCHEMA.metadata in df.columns:
-        parsed = df[SCHEMA.metadata].map(_parse_metadata)
-        df["reviewer_total_reviews"] = parsed.map(lambda x: x[0])
-        df["reviewer_followers"] = parsed.map(lambda x: x[1])
+        parsed = parse_metadata_series(df[SCHEMA.metadata])
+        df["reviewer_total_reviews"] = parsed["reviewer_total_reviews"]
+        df["reviewer_followers"] = parsed["reviewer_followers"]
     else:
-        df["reviewer_total_reviews"] = None
-        df["reviewer_followers"] = None
+        df["reviewer_total_reviews"] = pd.Series(pd.NA, index=df.index, dtype="Int32")
+        df["reviewer_followers"] = pd.Series(pd.NA, index=df.index, dtype="Int32")
 
     # Pictures -> numeric if exists
     if SCHEMA.pictures in df.columns:
@@ -1,20 +1,46 @@
 from __future__ import annotations
 
+from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
 
-import joblib
 import numpy as np
 import pandas as pd
 from scipy import sparse
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-from .config import CFG
-from .utils import get_logger, read_json, write_json
+from .ann import IVFIndex, PQIndex
+from .artifacts import (
+    MappedTfidfVectorizer,
+    encode_terms,
+    load_arrays,
+    normalize_rows,
+    save_arrays,
+    save_npy,
+    vectorizer_params,
+)
+from .cache import ResultCache
+from .config import CFG, PATHS
+from .generations import current_generation
+from .instrumentation import count, span, timed
+from .utils import ensure_dir, get_logger, read_json, write_json
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
 logger = get_logger(__name__)
 
+# TfidfVectorizer settings used by train_tfidf (min_df is picked per corpus size)
+TFIDF_PARAMS: Dict[str, object] = {
+    "lowercase": True,
+    "stop_words": "english",
+    "ngram_range": (1, 2),
+    "max_df": 0.95,
+}
+TFIDF_MIN_DF = 2
+# Corpora smaller than this fall back to min_df=1
+TFIDF_MIN_DOCS_FOR_MIN_DF = 20
+
 
 @dataclass(frozen=True)
 class RecoResult:
@@ -26,12 +52,67 @@ class RecoResult:
     sample_review: str
 
 
-def _minmax(series: pd.Series) -> pd.Series:
-    lo = float(series.min())
-    hi = float(series.max())
+def validate_query(user_text: str) -> str:
+    """Stripped preference text; raises ValueError when it is too short to score."""
+    query = (user_text or "").strip()
+    if len(query) < 3:
+        raise ValueError("Please enter a longer preference text (at least 3 characters).")
+    return query
+
+
+def _minmax(values: np.ndarray) -> np.ndarray:
+    if len(values) == 0:
+        return np.asarray(values, dtype=float)
+    lo = float(np.nanmin(values))
+    hi = float(np.nanmax(values))
     if hi - lo < 1e-12:
-        return pd.Series(np.ones(len(series)), index=series.index)
-    return (series - lo) / (hi - lo)
+        return np.ones(len(values))
+    return (values - lo) / (hi - lo)
+
+
+@timed("topk")
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest scores, best first (ties broken by position).
+    NaN scores rank last.
+    """
+    return _top_k_rows(scores[np.newaxis, :], k)[0]
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise :func:`_top_k` over a 2-D score matrix."""
+    n_rows, n = scores.shape
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+
+    ranked = np.where(np.isnan(scores), -np.inf, scores)
+    if k < n:
+        # everything above the k-th value, then the lowest positions tied with it
+        kth = np.partition(ranked, n - k, axis=1)[:, n - k, np.newaxis]
+        above = ranked > kth
+        ties = ranked == kth
+        need = k - above.sum(axis=1, keepdims=True)
+        chosen = above | (ties & (np.cumsum(ties, axis=1) <= need))
+        cand = np.nonzero(chosen)[1].reshape(n_rows, k)
+    else:
+        cand = np.tile(np.arange(n), (n_rows, 1))
+    order = np.lexsort((cand, -np.take_along_axis(ranked, cand, axis=1)), axis=-1)
+    return np.take_along_axis(cand, order, axis=1)
+
+
+def _value_range(values: np.ndarray) -> Tuple[float, float, int, int]:
+    """(min, max, #entries at min, #entries at max), ignoring NaN."""
+    if np.all(np.isnan(values)):
+        return np.nan, np.nan, 0, 0
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    return lo, hi, int(np.count_nonzero(values == lo)), int(np.count_nonzero(values == hi))
+
+
+def _keeps_range(value_range: Tuple[float, float, int, int], dropped: float) -> bool:
+    """True when removing one entry equal to ``dropped`` leaves min and max unchanged."""
+    lo, hi, n_lo, n_hi = value_range
+    return bool((dropped > lo or (dropped == lo and n_lo > 1)) and (dropped < hi or (dropped == hi and n_hi > 1)))
 
 
 def train_tfidf(corpus_df: pd.DataFrame) -> Tuple[TfidfVectorizer, sparse.csr_matrix, Dict[str, int]]:
@@ -58,15 +139,11 @@ def train_tfidf(corpus_df: pd.DataFrame) -> Tuple[TfidfVectorizer, sparse.csr_ma
     # For very small corpora (e.g., unit tests with 3 docs), min_df=2 can prune everything.
     # Keep strong defaults for real datasets, but adapt safely for tiny inputs.
     n_docs = len(texts)
-    effective_min_df = 2 if n_docs >= 20 else 1
-
-    vectorizer = TfidfVectorizer(
-        lowercase=True,
-        stop_words="english",
-        ngram_range=(1, 2),
-        min_df=effective_min_df,
-        max_df=0.95,
-    )
+    effective_min_df = _effective_min_df(n_docs)
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(**TFIDF_PARAMS, min_df=effective_min_df)
     tfidf_matrix = vectorizer.fit_transform(texts)
 
     index = {r: i for i, r in enumerate(restaurants)}
@@ -79,75 +156,1071 @@ def train_tfidf(corpus_df: pd.DataFrame) -> Tuple[TfidfVectorizer, sparse.csr_ma
     return vectorizer, tfidf_matrix, index
 
 
+def _effective_min_df(n_docs: int) -> int:
+    return TFIDF_MIN_DF if n_docs >= TFIDF_MIN_DOCS_FOR_MIN_DF else 1
+
+
+def iter_corpus_batches(corpus_path, batch_rows: int = CFG.TRAIN_CHUNK_ROWS) -> Iterator[Tuple[List[str], List[str]]]:
+    """
+    Stream ``(restaurants, texts)`` from the corpus parquet, at most ``batch_rows``
+    restaurants at a time, without loading the whole file.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(corpus_path)
+    for batch in parquet.iter_batches(batch_size=batch_rows, columns=["Restaurant", "corpus"]):
+        restaurants, texts = batch.column(0).to_pylist(), batch.column(1).to_pylist()
+        yield [str(r) for r in restaurants], [str(t) for t in texts]
+
+
+def train_tfidf_streaming(
+    batches: Callable[[], Iterable[Tuple[List[str], List[str]]]],
+) -> Tuple[MappedTfidfVectorizer, sparse.csr_matrix, Dict[str, int]]:
+    """
+    Out-of-core :func:`train_tfidf`: same vocabulary, weights and matrix, but the
+    corpus is streamed twice from ``batches`` (a callable returning a fresh iterator
+    of ``(restaurants, texts)`` chunks) instead of held in memory.
+
+    Pass one counts document frequencies, pass two builds the CSR matrix chunk by
+    chunk. Peak memory is the vocabulary and the matrix plus one chunk of text.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    template = TfidfVectorizer(**TFIDF_PARAMS)
+    analyzer = template.build_analyzer()
+
+    doc_freq: Counter = Counter()
+    n_docs = 0
+    for _, texts in batches():
+        for text in texts:
+            doc_freq.update(set(analyzer(text)))
+        n_docs += len(texts)
+
+    min_df = _effective_min_df(n_docs)
+    max_doc_count = TFIDF_PARAMS["max_df"] * n_docs
+    terms = sorted(t for t, df in doc_freq.items() if min_df <= df <= max_doc_count)
+    df = np.array([doc_freq[t] for t in terms], dtype=np.float64)
+    del doc_freq
+    # Smooth idf, as TfidfTransformer computes it
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+    vocabulary = {t: j for j, t in enumerate(terms)}
+
+    restaurants: List[str] = []
+    blocks = []
+    for names, texts in batches():
+        indptr = [0]
+        indices: List[int] = []
+        values: List[int] = []
+        for text in texts:
+            counts = Counter(map(vocabulary.get, analyzer(text)))
+            counts.pop(None, None)
+            for j in sorted(counts):
+                indices.append(j)
+                values.append(counts[j])
+            indptr.append(len(indices))
+        block = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(texts), len(terms)),
+        )
+        block.data *= idf[block.indices]
+        blocks.append(normalize_rows(block, "l2"))
+        restaurants.extend(names)
+    del vocabulary
+
+    tfidf_matrix = sparse.vstack(blocks, format="csr") if blocks else sparse.csr_matrix((0, len(terms)))
+    blob, offsets = encode_terms(terms)
+    vectorizer = MappedTfidfVectorizer(blob, offsets, idf, vectorizer_params(template))
+    index = {r: i for i, r in enumerate(restaurants)}
+    logger.info(
+        "Trained TF-IDF (streamed): restaurants=%d | vocab=%d | min_df=%d",
+        len(restaurants),
+        len(terms),
+        min_df,
+    )
+    return vectorizer, tfidf_matrix, index
+
+
+def train_model(
+    corpus_path,
+    model_type: str = CFG.MODEL_TYPE,
+    n_features: int = CFG.HASHING_N_FEATURES,
+    chunk_rows: int = CFG.TRAIN_CHUNK_ROWS,
+) -> Tuple[object, sparse.csr_matrix, Dict[str, int]]:
+    """
+    Train the model type selected in config out of core, streaming the corpus
+    parquet in chunks of ``chunk_rows`` restaurants: ``"tfidf"``
+    (:func:`train_tfidf_streaming`) or ``"hashing"`` (HashingVectorizer + TF-IDF
+    weighting, see src/hashing_model.py).
+    """
+    def batches() -> Iterator[Tuple[List[str], List[str]]]:
+        return iter_corpus_batches(corpus_path, chunk_rows)
+
+    if model_type == "tfidf":
+        return train_tfidf_streaming(batches)
+    if model_type != "hashing":
+        raise ValueError(f"Unknown model type: {model_type!r}")
+
+    from .hashing_model import train_hashing_tfidf
+
+    return train_hashing_tfidf(
+        batches,
+        {k: v for k, v in TFIDF_PARAMS.items() if k != "max_df"},
+        min_df_for=_effective_min_df,
+        max_df=TFIDF_PARAMS["max_df"],
+        n_features=n_features,
+    )
+
+
 def save_model(
     vectorizer: TfidfVectorizer,
     tfidf_matrix: sparse.csr_matrix,
     index: Dict[str, int],
-    vectorizer_path,
-    matrix_path,
+    model_dir,
     index_path,
 ) -> None:
-    joblib.dump(vectorizer, vectorizer_path)
-    joblib.dump(tfidf_matrix, matrix_path)
+    """
+    Save the vectorizer and matrix as raw .npy arrays under ``model_dir``
+    (see src/artifacts.py) and the restaurant index as JSON.
+    """
+    save_arrays(vectorizer, tfidf_matrix, Path(model_dir))
     write_json(index_path, index)
     logger.info("Saved model artifacts to models/ directory")
 
 
-def load_model(vectorizer_path, matrix_path, index_path) -> Tuple[TfidfVectorizer, sparse.csr_matrix, Dict[str, int]]:
-    vectorizer = joblib.load(vectorizer_path)
-    tfidf_matrix = joblib.load(matrix_path)
+def load_model(model_dir, index_path) -> Tuple[MappedTfidfVectorizer, sparse.csr_matrix, Dict[str, int]]:
+    """
+    Memory-map the artifacts written by :func:`save_model`. Nothing is unpickled;
+    the matrix and vocabulary arrays are shared through the OS page cache.
+    """
+    vectorizer, tfidf_matrix = load_arrays(Path(model_dir))
     index = read_json(index_path)
     return vectorizer, tfidf_matrix, index
 
 
-def recommend_similar_restaurants(
-    seed_restaurant: str,
-    profiles_df: pd.DataFrame,
+def patch_tfidf_rows(
+    tfidf_matrix: sparse.csr_matrix,
+    rows: np.ndarray,
+    new_rows: sparse.csr_matrix,
+) -> sparse.csr_matrix:
+    """
+    Return ``tfidf_matrix`` with ``rows`` replaced by the rows of ``new_rows``.
+    Row ids past the end append rows (they must continue the numbering).
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    n_rows = max(tfidf_matrix.shape[0], int(rows.max()) + 1 if len(rows) else 0)
+
+    keep = np.ones(tfidf_matrix.shape[0], dtype=np.float64)
+    keep[rows[rows < len(keep)]] = 0.0
+    base = sparse.diags(keep) @ tfidf_matrix
+    base.resize((n_rows, tfidf_matrix.shape[1]))
+
+    scatter = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, np.arange(len(rows)))),
+        shape=(n_rows, len(rows)),
+    )
+    patched = (base + scatter @ sparse.csr_matrix(new_rows)).tocsr()
+    patched.eliminate_zeros()
+    patched.sort_indices()
+    return patched
+
+
+def vocabulary_drift(vectorizer, new_texts: Iterable[str], reference_texts: Iterable[str]) -> float:
+    """
+    How much more of the new text falls outside the fitted vocabulary than text the
+    model was trained on: out-of-vocabulary token share of ``new_texts`` minus that
+    of ``reference_texts``. Pruned rare terms and bigrams keep the raw share well
+    above zero even in-sample, hence the reference.
+    """
+    analyzer = vectorizer.build_analyzer()
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    in_vocab = vocabulary.__contains__ if vocabulary is not None else (lambda t: vectorizer.term_id(t) >= 0)
+
+    def oov_share(texts: Iterable[str]) -> float:
+        total = missing = 0
+        for text in texts:
+            for term in analyzer(text):
+                total += 1
+                missing += not in_vocab(term)
+        return missing / total if total else 0.0
+
+    return max(0.0, oov_share(new_texts) - oov_share(reference_texts))
+
+
+def _neighbor_rows(
+    tfidf_matrix: sparse.csr_matrix,
+    matrix_t: sparse.csr_matrix,
+    rows: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    block = (tfidf_matrix[rows] @ matrix_t).toarray()
+    block[np.arange(len(rows)), rows] = np.nan
+    top = _top_k_rows(block, k)
+    return top, np.take_along_axis(block, top, axis=1)
+
+
+def build_neighbor_table(
+    tfidf_matrix: sparse.csr_matrix,
+    k: int = CFG.NEIGHBORS_K,
+    block_size: int = CFG.NEIGHBORS_BLOCK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k most similar rows for every row of the (L2-normalized) TF-IDF matrix,
+    excluding the row itself. Rows are scored ``block_size`` at a time so only a
+    block_size x n_rows dense block is held in memory.
+
+    Returns
+    -------
+    neighbor_ids : int32 array (n_rows, k), best first
+    neighbor_scores : float32 array (n_rows, k)
+    """
+    n_rows = tfidf_matrix.shape[0]
+    k = max(0, min(int(k), n_rows - 1))
+    ids = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float32)
+
+    matrix_t = tfidf_matrix.T.tocsr()
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        ids[start:stop], scores[start:stop] = _neighbor_rows(tfidf_matrix, matrix_t, np.arange(start, stop), k)
+
+    logger.info("Built neighbor table: rows=%d | k=%d", n_rows, k)
+    return ids, scores
+
+
+def update_neighbor_table(
+    tfidf_matrix: sparse.csr_matrix,
+    neighbor_ids: np.ndarray,
+    neighbor_scores: np.ndarray,
+    changed_rows: np.ndarray,
+    k: int = CFG.NEIGHBORS_K,
+    block_size: int = CFG.NEIGHBORS_BLOCK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bring a neighbor table up to date after ``changed_rows`` of the matrix were
+    replaced or appended. Gives the same table as :func:`build_neighbor_table`.
+
+    Changed rows, and rows whose list held a changed row (its score may have dropped),
+    are rescored in full. Every other row keeps its list and only merges in its
+    scores against the changed rows.
+    """
+    n_rows = tfidf_matrix.shape[0]
+    k = max(0, min(int(k), n_rows - 1))
+    if neighbor_ids.shape[1] != k:
+        return build_neighbor_table(tfidf_matrix, k=k, block_size=block_size)
+
+    changed = np.unique(np.asarray(changed_rows, dtype=np.int64))
+    stale = np.flatnonzero(np.isin(neighbor_ids, changed).any(axis=1))
+    rescore = np.union1d(changed, stale)
+    keep = np.setdiff1d(np.arange(len(neighbor_ids)), rescore)
+
+    ids = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float32)
+
+    matrix_t = tfidf_matrix.T.tocsr()
+    for start in range(0, len(rescore), block_size):
+        rows = rescore[start:start + block_size]
+        ids[rows], scores[rows] = _neighbor_rows(tfidf_matrix, matrix_t, rows, k)
+
+    changed_t = tfidf_matrix[changed].T.tocsr()
+    for start in range(0, len(keep), block_size):
+        rows = keep[start:start + block_size]
+        cand_ids = np.hstack([neighbor_ids[rows], np.broadcast_to(changed, (len(rows), len(changed)))])
+        cand_scores = np.hstack([neighbor_scores[rows], (tfidf_matrix[rows] @ changed_t).toarray()])
+        # Order candidates by id so ties break the same way as in a full build
+        order = np.argsort(cand_ids, axis=1, kind="stable")
+        cand_ids = np.take_along_axis(cand_ids, order, axis=1)
+        cand_scores = np.take_along_axis(cand_scores, order, axis=1)
+        top = _top_k_rows(cand_scores, k)
+        ids[rows] = np.take_along_axis(cand_ids, top, axis=1)
+        scores[rows] = np.take_along_axis(cand_scores, top, axis=1)
+
+    logger.info("Updated neighbor table: rows=%d | rescored=%d | merged=%d", n_rows, len(rescore), len(keep))
+    return ids, scores
+
+
+def save_neighbors(neighbor_ids: np.ndarray, neighbor_scores: np.ndarray, ids_path, scores_path) -> None:
+    save_npy(Path(ids_path), neighbor_ids.astype(np.int32, copy=False))
+    save_npy(Path(scores_path), neighbor_scores.astype(np.float32, copy=False))
+
+
+def load_neighbors(ids_path, scores_path) -> Tuple[np.ndarray, np.ndarray] | None:
+    """Memory-map the neighbor table, or None if it has not been built."""
+    if not Path(ids_path).exists() or not Path(scores_path).exists():
+        return None
+    return np.load(ids_path, mmap_mode="r"), np.load(scores_path, mmap_mode="r")
+
+
+_TOP_TERMS_K = b"top_terms_k"
+
+
+def _row_top_terms(tfidf_matrix: sparse.csr_matrix, row: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(columns, weights) of the k largest weights in one CSR row, best first, from its nonzeros only."""
+    start, end = tfidf_matrix.indptr[row], tfidf_matrix.indptr[row + 1]
+    weights = np.asarray(tfidf_matrix.data[start:end])
+    columns = np.asarray(tfidf_matrix.indices[start:end])
+    # rows keep sorted columns, so position ties break by column like a dense argsort would
+    top = _top_k_rows(weights[np.newaxis, :], k)[0]
+    return columns[top], weights[top]
+
+
+def _feature_names(vectorizer: TfidfVectorizer, columns: np.ndarray) -> np.ndarray:
+    """Names of ``columns``; a plain sklearn vectorizer has no per-column lookup and decodes its vocabulary."""
+    if hasattr(vectorizer, "feature_names"):
+        return vectorizer.feature_names(columns)
+    return np.asarray(vectorizer.get_feature_names_out(), dtype=object)[np.asarray(columns, dtype=np.intp)]
+
+
+def top_terms(
+    restaurant: str,
+    vectorizer: TfidfVectorizer,
     tfidf_matrix: sparse.csr_matrix,
     index: Dict[str, int],
-    top_n: int = 10,
-) -> List[RecoResult]:
+    k: int = 15,
+) -> pd.DataFrame:
     """
-    Recommend restaurants similar to a given restaurant based on TF-IDF cosine similarity
-    + hybrid ranking with rating and popularity.
+    The ``k`` highest-weighted terms of a restaurant's TF-IDF row (keyword, tfidf_weight),
+    best first. Only the row's nonzeros are ranked and only the winners' names are
+    decoded from the vocabulary, so the cost does not depend on the vocabulary size.
     """
-    if seed_restaurant not in index:
-        raise ValueError(f"Unknown restaurant: {seed_restaurant}")
+    if restaurant not in index:
+        raise KeyError(f"Unknown restaurant: {restaurant}")
+    columns, weights = _row_top_terms(tfidf_matrix, index[restaurant], k)
+    return pd.DataFrame({"keyword": _feature_names(vectorizer, columns), "tfidf_weight": weights})
 
-    seed_idx = index[seed_restaurant]
-    sims = cosine_similarity(tfidf_matrix[seed_idx], tfidf_matrix).ravel()
 
-    df = profiles_df.copy()
-    df["similarity"] = df["Restaurant"].map(lambda r: float(sims[index[r]]) if r in index else 0.0)
+def build_top_terms_table(
+    vectorizer: TfidfVectorizer,
+    tfidf_matrix: sparse.csr_matrix,
+    index: Dict[str, int],
+    k: int = CFG.TOP_TERMS_K,
+) -> pd.DataFrame:
+    """:func:`top_terms` of every restaurant as one long frame (Restaurant, rank, keyword, tfidf_weight)."""
+    names = sorted(index)
+    per_row = [_row_top_terms(tfidf_matrix, index[name], k) for name in names]
+    columns = np.concatenate([c for c, _ in per_row]) if per_row else np.empty(0, dtype=np.int64)
+    # decode each distinct term once
+    unique, inverse = np.unique(columns, return_inverse=True)
+    counts = [len(c) for c, _ in per_row]
+    table = pd.DataFrame({
+        "Restaurant": np.repeat(np.array(names, dtype=object), counts),
+        "rank": np.concatenate([np.arange(n, dtype=np.int32) for n in counts]) if per_row else np.empty(0, dtype=np.int32),
+        "keyword": _feature_names(vectorizer, unique)[inverse] if len(unique) else np.empty(0, dtype=object),
+        "tfidf_weight": np.concatenate([w for _, w in per_row]) if per_row else np.empty(0),
+    })
+    logger.info("Built top terms: restaurants=%d | k=%d | distinct terms=%d", len(names), k, len(unique))
+    return table
+
 
-    # remove itself
-    df = df[df["Restaurant"] != seed_restaurant]
+def save_top_terms(table: pd.DataFrame, path, k: int = CFG.TOP_TERMS_K) -> None:
+    """
+    Write the table sorted by restaurant, so a lookup reads only the row groups
+    holding it; ``k`` is recorded in the file metadata.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 
-    # normalize rating and popularity
-    df["rating_norm"] = _minmax(df["avg_rating"])
-    df["pop_norm"] = _minmax(np.log1p(df["num_reviews"].clip(lower=0)))
+    ensure_dir(Path(path).parent)
+    table = pa.Table.from_pandas(table.sort_values(["Restaurant", "rank"], kind="stable"), preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, _TOP_TERMS_K: str(k).encode()})
+    pq.write_table(table, path, row_group_size=CFG.CLEAN_ROW_GROUP_ROWS)
 
-    df["final_score"] = (
-        CFG.W_SIM * df["similarity"]
-        + CFG.W_RATING * df["rating_norm"]
-        + CFG.W_POP * df["pop_norm"]
-    )
 
-    df = df.sort_values("final_score", ascending=False).head(top_n)
+def load_top_terms(restaurant: str, path, k: int = 15) -> pd.DataFrame | None:
+    """
+    Precomputed :func:`top_terms` of ``restaurant`` (keyword, tfidf_weight), or None when
+    the file does not exist or was built with fewer than ``k`` terms per restaurant.
+    For readers without the TF-IDF matrix; with it loaded, :func:`top_terms` is faster.
+    """
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    if not path.exists() or int((pq.read_schema(path).metadata or {}).get(_TOP_TERMS_K, 0)) < k:
+        return None
+    rows = pd.read_parquet(path, filters=[("Restaurant", "==", restaurant), ("rank", "<", k)])
+    return rows.sort_values("rank")[["keyword", "tfidf_weight"]].reset_index(drop=True)
+
+
+@dataclass(frozen=True)
+class InvertedIndex:
+    """
+    Term -> postings view of the TF-IDF matrix (CSC layout).
+
+    Postings of term ``t`` are ``rows[indptr[t]:indptr[t + 1]]`` with weights
+    ``weights[...]``; ``max_weights[t]`` bounds any restaurant's weight for ``t``.
+    """
+
+    indptr: np.ndarray
+    rows: np.ndarray
+    weights: np.ndarray
+    max_weights: np.ndarray
+
+    def postings(self, term: int) -> np.ndarray:
+        return self.rows[self.indptr[term]:self.indptr[term + 1]]
+
+
+def build_inverted_index(tfidf_matrix: sparse.csr_matrix) -> InvertedIndex:
+    csc = sparse.csc_matrix(tfidf_matrix)
+    csc.sort_indices()
+    max_weights = np.zeros(csc.shape[1])
+    non_empty = np.flatnonzero(np.diff(csc.indptr))
+    if len(non_empty):
+        max_weights[non_empty] = np.maximum.reduceat(csc.data, csc.indptr[non_empty])
+    return InvertedIndex(indptr=csc.indptr, rows=csc.indices, weights=csc.data, max_weights=max_weights)
+
+
+class _Utf8Column:
+    """Read-only string column over a UTF-8 blob + offsets; entries are decoded on access."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray) -> None:
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    column = _Utf8Column(blob, offsets)
+    return np.array([column[i] for i in range(len(column))], dtype=object)
+
+
+class RecommenderEngine:
+    """
+    Hybrid scorer built once from profiles + TF-IDF artifacts.
+
+    Keeps NumPy arrays aligned with the rows of ``profiles_df`` so each request is a
+    single dense scoring pass plus an ``argpartition`` top-k, instead of copying and
+    sorting the profiles DataFrame.
+
+    TF-IDF rows are L2-normalized by ``TfidfVectorizer``, so cosine similarity is a
+    plain dot product against ``tfidf_matrix``.
+
+    When a precomputed neighbor table (see :func:`build_neighbor_table`) is given,
+    seed-restaurant requests are answered from it in O(K) instead of scoring the
+    whole catalog. Single preference queries go through an inverted index
+    (``CFG.USE_INVERTED_INDEX``) so their cost follows posting-list length.
+
+    With an ``ann`` index (see src/ann.py) both request types instead take their
+    candidates from the ``ann_candidates`` nearest restaurants in embedding space
+    (probing ``ann_nprobe`` lists) plus the top static scores, and re-rank those
+    exactly. This is approximate; see evaluation.ann_recall_at_k.
+
+    A ``pq`` index (product-quantized embeddings) does the same with ADC scores over
+    every restaurant's uint8 codes as the first stage; only the candidates' TF-IDF
+    rows are read (and, with a memory-mapped matrix, paged in) for re-ranking. With
+    either index no inverted index is built.
+    """
+
+    def __init__(
+        self,
+        profiles_df: pd.DataFrame,
+        tfidf_matrix: sparse.csr_matrix,
+        index: Dict[str, int],
+        vectorizer: TfidfVectorizer | None = None,
+        neighbors: Tuple[np.ndarray, np.ndarray] | None = None,
+        ann: IVFIndex | None = None,
+        ann_nprobe: int = CFG.ANN_NPROBE,
+        ann_candidates: int = CFG.ANN_CANDIDATES,
+        pq: PQIndex | None = None,
+    ) -> None:
+        self.profiles_df = profiles_df
+        self.tfidf_matrix = tfidf_matrix
+        self.index = index
+        self.vectorizer = vectorizer
+        self.neighbors = neighbors
+        self.ann_nprobe = ann_nprobe
+        self.ann_candidates = ann_candidates
+        self._stale: List[object] = []
+        self._set_retrievers(ann, pq)
+
+        self.names = profiles_df["Restaurant"].astype(str).to_numpy(dtype=object)
+
+        # profile position -> matrix row (-1 when the restaurant is not in the model)
+        rows = np.fromiter((index.get(r, -1) for r in profiles_df["Restaurant"]), dtype=np.int64, count=len(profiles_df))
+        self.has_row = rows >= 0
+        self.rows = np.where(self.has_row, rows, 0)
+
+        # matrix row -> profile position (-1 when the row has no profile)
+        self.row_positions = np.full(tfidf_matrix.shape[0], -1, dtype=np.int64)
+        self.row_positions[rows[self.has_row]] = np.flatnonzero(self.has_row)
+
+        self.avg_rating = profiles_df["avg_rating"].to_numpy(dtype=float)
+        self.num_reviews = profiles_df["num_reviews"].to_numpy()
+        if "sample_review" in profiles_df.columns:
+            self.sample_reviews = profiles_df["sample_review"].to_numpy(dtype=object)
+        else:
+            self.sample_reviews = np.full(len(profiles_df), "", dtype=object)
+
+        self.log_pop = np.log1p(np.clip(self.num_reviews.astype(float), 0, None))
+        self.rating_norm = _minmax(self.avg_rating)
+        self.pop_norm = _minmax(self.log_pop)
+        self.rating_range = _value_range(self.avg_rating)
+        self.pop_range = _value_range(self.log_pop)
+
+        # similarity-independent part of the hybrid score, plus positions ordered by it
+        self.static_score = CFG.W_RATING * self.rating_norm + CFG.W_POP * self.pop_norm
+        self.static_order = _top_k(self.static_score, len(self.static_score))
+        self.static_sorted = np.nan_to_num(self.static_score[self.static_order], nan=-np.inf)
+
+        self.inverted_index = None
+        self._sync_inverted_index()
+        self._analyzer = None
+
+    def attach(
+        self,
+        vectorizer: TfidfVectorizer | None = None,
+        neighbors: Tuple[np.ndarray, np.ndarray] | None = None,
+        ann: IVFIndex | None = None,
+        pq: PQIndex | None = None,
+    ) -> None:
+        """Set the given optional artifacts in place, keeping the aligned arrays (None leaves a field as is)."""
+        if vectorizer is not None:
+            self.vectorizer = vectorizer
+            self._analyzer = None
+        if neighbors is not None:
+            self.neighbors = neighbors
+        self._set_retrievers(self.ann if ann is None else ann, self.pq if pq is None else pq)
+        self._sync_inverted_index()
+
+    def _sync_inverted_index(self) -> None:
+        """
+        Hold the inverted index (a CSC copy of the matrix) only when preference queries
+        use it: exact scoring with a vectorizer. An IVF / PQ first stage replaces it.
+        """
+        if self.vectorizer is None or self._first_stage is not None or not CFG.USE_INVERTED_INDEX:
+            self.inverted_index = None
+        elif self.inverted_index is None:
+            self.inverted_index = build_inverted_index(self.tfidf_matrix)
+
+    def _set_retrievers(self, ann: IVFIndex | None, pq: PQIndex | None) -> None:
+        """
+        Use ``ann`` / ``pq`` only when they cover every row of the matrix. An index left
+        over from before rows were added would misalign its scores with the rows, so it
+        is ignored (and remembered in ``_stale``) and those requests are scored exactly.
+        """
+        n_rows = self.tfidf_matrix.shape[0]
+        if ann is not None and ann.embeddings.shape[0] != n_rows:
+            logger.warning("Ignoring IVF index over %d rows; the TF-IDF matrix has %d", ann.embeddings.shape[0], n_rows)
+            self._stale.append(ann)
+            ann = None
+        if pq is not None and pq.codes.shape[0] != n_rows:
+            logger.warning("Ignoring PQ index over %d rows; the TF-IDF matrix has %d", pq.codes.shape[0], n_rows)
+            self._stale.append(pq)
+            pq = None
+        self.ann = ann
+        self.pq = pq
+        # first-stage retriever used for query embeddings (IVF wins when both are given)
+        self._first_stage = ann if ann is not None else pq
 
-    results: List[RecoResult] = []
-    for _, row in df.iterrows():
-        results.append(
+    def is_stale(self, retriever: object) -> bool:
+        """True when ``retriever`` was offered to this engine and ignored as stale."""
+        return any(retriever is stale for stale in self._stale)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Every array the engine scores with (matrix, profile vectors, inverted index,
+        neighbor table), strings as UTF-8 blobs. :meth:`from_arrays` rebuilds the
+        engine from them without copying, e.g. from shared memory.
+        """
+        index_names = list(self.index)
+        arrays = {
+            "matrix_data": self.tfidf_matrix.data,
+            "matrix_indices": self.tfidf_matrix.indices,
+            "matrix_indptr": self.tfidf_matrix.indptr,
+            "matrix_shape": np.asarray(self.tfidf_matrix.shape, dtype=np.int64),
+            "index_rows": np.fromiter(self.index.values(), dtype=np.int64, count=len(index_names)),
+            "has_row": self.has_row,
+            "rows": self.rows,
+            "row_positions": self.row_positions,
+            "avg_rating": self.avg_rating,
+            "num_reviews": self.num_reviews,
+            "log_pop": self.log_pop,
+            "rating_norm": self.rating_norm,
+            "pop_norm": self.pop_norm,
+            "rating_range": np.asarray(self.rating_range, dtype=np.float64),
+            "pop_range": np.asarray(self.pop_range, dtype=np.float64),
+            "static_score": self.static_score,
+            "static_order": self.static_order,
+            "static_sorted": self.static_sorted,
+        }
+        for name, values in (("names", self.names), ("index_names", index_names), ("sample_reviews", self.sample_reviews)):
+            arrays[f"{name}_blob"], arrays[f"{name}_offsets"] = encode_terms(values[i] for i in range(len(values)))
+        if self.inverted_index is not None:
+            ii = self.inverted_index
+            arrays.update(ii_indptr=ii.indptr, ii_rows=ii.rows, ii_weights=ii.weights, ii_max_weights=ii.max_weights)
+        if self.neighbors is not None:
+            arrays["neighbor_ids"], arrays["neighbor_scores"] = self.neighbors
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        vectorizer=None,
+        ann: IVFIndex | None = None,
+        ann_nprobe: int = CFG.ANN_NPROBE,
+        ann_candidates: int = CFG.ANN_CANDIDATES,
+        pq: PQIndex | None = None,
+    ) -> "RecommenderEngine":
+        """
+        Engine over arrays from :meth:`to_arrays`, used as-is (views stay views).
+        Only restaurant names and the index dict are materialized per process; sample
+        reviews are decoded when a result is built. ``profiles_df`` is None.
+        """
+        engine = cls.__new__(cls)
+        engine.profiles_df = None
+        engine.tfidf_matrix = sparse.csr_matrix(
+            (arrays["matrix_data"], arrays["matrix_indices"], arrays["matrix_indptr"]),
+            shape=tuple(int(n) for n in arrays["matrix_shape"]),
+            copy=False,
+        )
+        index_names = _decode_strings(arrays["index_names_blob"], arrays["index_names_offsets"])
+        engine.index = dict(zip(index_names, arrays["index_rows"].tolist()))
+        engine.vectorizer = vectorizer
+        engine.neighbors = (
+            (arrays["neighbor_ids"], arrays["neighbor_scores"]) if "neighbor_ids" in arrays else None
+        )
+        engine.ann_nprobe = ann_nprobe
+        engine.ann_candidates = ann_candidates
+        engine._stale = []
+        engine._set_retrievers(ann, pq)
+
+        engine.names = _decode_strings(arrays["names_blob"], arrays["names_offsets"])
+        engine.sample_reviews = _Utf8Column(arrays["sample_reviews_blob"], arrays["sample_reviews_offsets"])
+        for name in (
+            "has_row", "rows", "row_positions", "avg_rating", "num_reviews", "log_pop",
+            "rating_norm", "pop_norm", "static_score", "static_order", "static_sorted",
+        ):
+            setattr(engine, name, arrays[name])
+        lo, hi, n_lo, n_hi = arrays["rating_range"]
+        engine.rating_range = (lo, hi, int(n_lo), int(n_hi))
+        lo, hi, n_lo, n_hi = arrays["pop_range"]
+        engine.pop_range = (lo, hi, int(n_lo), int(n_hi))
+
+        engine.inverted_index = None
+        if "ii_indptr" in arrays and vectorizer is not None:
+            engine.inverted_index = InvertedIndex(
+                indptr=arrays["ii_indptr"],
+                rows=arrays["ii_rows"],
+                weights=arrays["ii_weights"],
+                max_weights=arrays["ii_max_weights"],
+            )
+        engine._analyzer = None
+        return engine
+
+    def _profile_similarity(self, sims: np.ndarray) -> np.ndarray:
+        """Map similarities over matrix rows (last axis) onto profile positions."""
+        return np.where(self.has_row, sims[..., self.rows], 0.0)
+
+    @timed("results")
+    def _results(self, positions: np.ndarray, sims: np.ndarray, scores: np.ndarray) -> List[RecoResult]:
+        """Build results for ``positions``; ``sims`` and ``scores`` are aligned with them."""
+        return [
             RecoResult(
-                restaurant=str(row["Restaurant"]),
-                final_score=float(row["final_score"]),
-                similarity=float(row["similarity"]),
-                avg_rating=float(row["avg_rating"]),
-                num_reviews=int(row["num_reviews"]),
-                sample_review=str(row["sample_review"]),
+                restaurant=str(self.names[p]),
+                final_score=float(score),
+                similarity=float(sim),
+                avg_rating=float(self.avg_rating[p]),
+                num_reviews=int(self.num_reviews[p]),
+                sample_review=str(self.sample_reviews[p]),
             )
+            for p, sim, score in zip(positions, sims, scores)
+        ]
+
+    def similar(self, seed_restaurant: str, top_n: int = 10) -> List[RecoResult]:
+        if seed_restaurant not in self.index:
+            raise ValueError(f"Unknown restaurant: {seed_restaurant}")
+
+        seed_idx = self.index[seed_restaurant]
+        interior = self._is_interior(self.row_positions[seed_idx])
+        if self.neighbors is not None and interior:
+            count("similar.neighbors")
+            return self._similar_from_neighbors(seed_restaurant, seed_idx, top_n)
+        if self._first_stage is not None and interior:
+            count("similar.ann")
+            if self.ann is not None:
+                query = np.asarray(self.ann.embeddings[seed_idx])
+            else:
+                query = self.pq.decode(seed_idx)
+            rows = self._ann_candidates(query, exclude_row=seed_idx)
+            return self._rerank(rows, self.tfidf_matrix[seed_idx], top_n, exclude=seed_restaurant)
+
+        # remove itself; rating/popularity are normalized over the remaining candidates
+        count("similar.full_scan")
+        with span("score"):
+            keep = np.flatnonzero(self.names != seed_restaurant)
+            seed_row = self.tfidf_matrix[seed_idx]
+            sims = self._profile_similarity((self.tfidf_matrix @ seed_row.T).toarray().ravel())[keep]
+
+            rating_norm = self._renormalize(self.avg_rating, self.rating_norm, self.rating_range, keep)
+            pop_norm = self._renormalize(self.log_pop, self.pop_norm, self.pop_range, keep)
+            scores = CFG.W_SIM * sims + (CFG.W_RATING * rating_norm + CFG.W_POP * pop_norm)
+
+        top = _top_k(scores, top_n)
+        return self._results(keep[top], sims[top], scores[top])
+
+    def _similar_from_neighbors(self, seed_restaurant: str, seed_idx: int, top_n: int) -> List[RecoResult]:
+        """
+        Exact hybrid top-n from the neighbor table. Restaurants outside the table have
+        similarity <= the smallest stored score, so only those whose rating/popularity
+        part could still beat the current n-th best are scored on demand.
+        """
+        nbr_ids, nbr_sims = self.neighbors
+        positions = self.row_positions[nbr_ids[seed_idx]]
+        sims = nbr_sims[seed_idx].astype(float)
+        found = positions >= 0
+        positions, sims = positions[found], sims[found]
+
+        complete = nbr_ids.shape[1] >= self.tfidf_matrix.shape[0] - 1
+        sim_floor = 0.0 if complete or nbr_ids.shape[1] == 0 else float(nbr_sims[seed_idx][-1])
+
+        n_candidates = len(self.names) - int(self.row_positions[seed_idx] >= 0)
+        k = max(0, min(int(top_n), n_candidates))
+        scores = CFG.W_SIM * sims + self.static_score[positions]
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k] if 0 < k <= len(scores) else -np.inf
+
+        # outside candidates, best static score first: stop once the bound cannot reach the threshold
+        n_extra = np.searchsorted(-self.static_sorted, -(threshold - CFG.W_SIM * sim_floor), side="right")
+        extra = self.static_order[:n_extra]
+        extra = extra[~np.isin(extra, positions) & (self.names[extra] != seed_restaurant)]
+        if len(extra):
+            extra_sims = np.zeros(len(extra))
+            with_row = self.has_row[extra]
+            if with_row.any():
+                with span("score"):
+                    seed_row = self.tfidf_matrix[seed_idx]
+                    extra_rows = self.tfidf_matrix[self.rows[extra[with_row]]]
+                    extra_sims[with_row] = (extra_rows @ seed_row.T).toarray().ravel()
+            positions = np.concatenate([positions, extra])
+            sims = np.concatenate([sims, extra_sims])
+            scores = np.concatenate([scores, CFG.W_SIM * extra_sims + self.static_score[extra]])
+
+        # rank with position as the tie-breaker, like the full scan
+        order = np.argsort(positions, kind="stable")
+        positions, sims, scores = positions[order], sims[order], scores[order]
+        top = _top_k(scores, k)
+        return self._results(positions[top], sims[top], scores[top])
+
+    @timed("candidates")
+    def _ann_candidates(self, query: np.ndarray, exclude_row: int = -1) -> np.ndarray:
+        """
+        Members of the probed IVF lists (or, with PQ, every restaurant) ranked by an
+        approximate hybrid score (embedding similarity in place of TF-IDF similarity);
+        the best ``ann_candidates`` rows go on to exact re-ranking.
+        """
+        if self.ann is not None:
+            rows, sims = self.ann.probe(query, self.ann_nprobe)
+        else:
+            rows, sims = np.arange(len(self.row_positions)), self.pq.scores(query)
+        positions = self.row_positions[rows]
+        approx = CFG.W_SIM * sims + np.where(positions >= 0, self.static_score[positions], -np.inf)
+        approx[rows == exclude_row] = -np.inf
+        return rows[_top_k(np.nan_to_num(approx, nan=-np.inf), self.ann_candidates)]
+
+    def _rerank(
+        self,
+        rows: np.ndarray,
+        q_vec: sparse.csr_matrix,
+        top_n: int,
+        exclude: str | None = None,
+    ) -> List[RecoResult]:
+        """
+        Exact hybrid top-n over ANN candidate ``rows`` plus the best static scores
+        (so highly rated / popular restaurants are never missed for lack of text).
+        """
+        k = max(0, min(int(top_n), len(self.names) - int(exclude is not None)))
+        if k == 0:
+            return []
+        positions = self.row_positions[rows]
+        positions = np.union1d(positions[positions >= 0], self.static_order[: k + 1])
+        if exclude is not None:
+            positions = positions[self.names[positions] != exclude]
+
+        with span("score"):
+            sims = np.zeros(len(positions))
+            with_row = self.has_row[positions]
+            if with_row.any():
+                sims[with_row] = (self.tfidf_matrix[self.rows[positions[with_row]]] @ q_vec.T).toarray().ravel()
+            scores = CFG.W_SIM * sims + self.static_score[positions]
+
+        top = _top_k(scores, k)
+        return self._results(positions[top], sims[top], scores[top])
+
+    def query_key(self, user_text: str) -> Tuple[Tuple[str, int], ...]:
+        """
+        Normalized form of a preference query: the multiset of analyzer tokens
+        (lowercased, stop words dropped, n-grams) that fully determines its vector,
+        so differently cased / spaced / stop-worded spellings share one key.
+        """
+        if self._analyzer is None:
+            self._analyzer = self.vectorizer.build_analyzer()
+        return tuple(sorted(Counter(self._analyzer(user_text)).items()))
+
+    @timed("transform")
+    def query_vector(self, user_text: str) -> sparse.csr_matrix:
+        query = validate_query(user_text)
+        if self.vectorizer is None:
+            raise ValueError("RecommenderEngine was built without a vectorizer.")
+        return self.vectorizer.transform([query])
+
+    def from_preferences(self, user_text: str, top_n: int = 10) -> List[RecoResult]:
+        return self.from_vector(self.query_vector(user_text), top_n=top_n)
+
+    def from_vector(self, q_vec: sparse.csr_matrix, top_n: int = 10) -> List[RecoResult]:
+        """Preference recommendations for an already transformed query (one row)."""
+        if self._first_stage is not None:
+            count("preferences.ann")
+            return self._rerank(self._ann_candidates(self._first_stage.embed(q_vec)[0]), q_vec, top_n)
+        if self.inverted_index is not None:
+            count("preferences.inverted_index")
+            return self._preferences_from_index(q_vec, top_n)
+        count("preferences.full_scan")
+        return self._preferences_full_scan(q_vec, top_n)[0]
+
+    def _preferences_from_index(self, q_vec: sparse.csr_matrix, top_n: int) -> List[RecoResult]:
+        """
+        Exact hybrid top-n via the inverted index (MaxScore-style).
+
+        Every score is at least its static part, so the n-th best static score is a
+        lower bound on the final threshold. Query terms are split into "essential"
+        and "non-essential" ones: a restaurant that only matches non-essential terms
+        gains at most W_SIM * sum(q_t * max_weight_t) from them, so it can only reach
+        the top-n if its static score is already close to the threshold. Candidates
+        are therefore the essential postings plus a prefix of the static ranking, and
+        only those rows are scored exactly.
+        """
+        k = max(0, min(int(top_n), len(self.names)))
+        if k == 0:
+            return []
+        threshold = self.static_sorted[k - 1]
+
+        with span("candidates"):
+            terms, q_weights = q_vec.indices, q_vec.data
+            ii = self.inverted_index
+            bounds = CFG.W_SIM * q_weights * ii.max_weights[terms]
+            order = np.argsort(bounds, kind="stable")
+            lengths = (ii.indptr[terms + 1] - ii.indptr[terms])[order]
+
+            # non-essential terms are order[:m]; pick the split that touches the fewest rows
+            non_essential_bound = np.concatenate([[0.0], np.cumsum(bounds[order])])
+            prefix_sizes = np.searchsorted(-self.static_sorted, -(threshold - non_essential_bound), side="right")
+            essential_sizes = np.concatenate([np.cumsum(lengths[::-1])[::-1], [0]])
+            m = int(np.argmin(prefix_sizes + essential_sizes))
+
+            essential_rows = [ii.postings(t) for t in terms[order[m:]]]
+            row_positions = self.row_positions[np.concatenate(essential_rows)] if essential_rows else np.empty(0, np.int64)
+            positions = np.union1d(row_positions[row_positions >= 0], self.static_order[:prefix_sizes[m]])
+
+        with span("score"):
+            sims = np.zeros(len(positions))
+            with_row = self.has_row[positions]
+            if with_row.any():
+                sims[with_row] = (self.tfidf_matrix[self.rows[positions[with_row]]] @ q_vec.T).toarray().ravel()
+            scores = CFG.W_SIM * sims + self.static_score[positions]
+
+        top = _top_k(scores, k)
+        return self._results(positions[top], sims[top], scores[top])
+
+    def from_preferences_batch(
+        self,
+        queries: Sequence[str],
+        top_n: int = 10,
+        chunk_size: int = 1024,
+    ) -> List[List[RecoResult]]:
+        """
+        Score many preference queries with one ``transform`` and one sparse
+        Q x M^T product per chunk of ``chunk_size`` queries (bounds the dense
+        score block to chunk_size x n_restaurants).
+        """
+        texts = [validate_query(q) for q in queries]
+        if self.vectorizer is None:
+            raise ValueError("RecommenderEngine was built without a vectorizer.")
+
+        results: List[List[RecoResult]] = []
+        for start in range(0, len(texts), chunk_size):
+            with span("transform"):
+                q_matrix = self.vectorizer.transform(texts[start:start + chunk_size])
+            if self._first_stage is not None:
+                embedded = self._first_stage.embed(q_matrix)
+                results.extend(
+                    self._rerank(self._ann_candidates(embedded[i]), q_matrix[i], top_n) for i in range(len(embedded))
+                )
+                continue
+            results.extend(self._preferences_full_scan(q_matrix, top_n))
+        return results
+
+    def _preferences_full_scan(self, q_matrix: sparse.csr_matrix, top_n: int) -> List[List[RecoResult]]:
+        with span("score"):
+            sims = self._profile_similarity((self.tfidf_matrix @ q_matrix.T).T.toarray())
+            scores = CFG.W_SIM * sims + self.static_score
+        with span("topk"):
+            top = _top_k_rows(scores, top_n)
+        return [self._results(top[i], sims[i, top[i]], scores[i, top[i]]) for i in range(len(top))]
+
+    def _is_interior(self, position: int) -> bool:
+        """True when dropping ``position`` leaves both min-max normalizations unchanged."""
+        if position < 0:
+            return True
+        return _keeps_range(self.rating_range, self.avg_rating[position]) and _keeps_range(
+            self.pop_range, self.log_pop[position]
         )
-    return results
+
+    @staticmethod
+    def _renormalize(
+        values: np.ndarray,
+        norm: np.ndarray,
+        value_range: Tuple[float, float, int, int],
+        keep: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Min-max normalization over ``values[keep]``. Reuses the precomputed vector
+        unless a dropped entry was the only holder of the min or max.
+        """
+        if len(keep) == len(values):
+            return norm
+        if len(values) - len(keep) == 1:
+            if _keeps_range(value_range, np.delete(values, keep)[0]):
+                return norm[keep]
+        return _minmax(values[keep])
+
+
+_RESULTS = ResultCache(CFG.RESULT_CACHE_SIZE, ttl=CFG.RESULT_CACHE_TTL_S or None)
+_QUERY_VECTORS = ResultCache(CFG.QUERY_VECTOR_CACHE_SIZE)
+
+
+def artifact_version(models_dir: Path = PATHS.MODELS_DIR) -> int | None:
+    """Published artifact generation (see src/generations.py); one readlink per call."""
+    return current_generation(models_dir)
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    return {"results": _RESULTS.stats(), "query_vectors": _QUERY_VECTORS.stats()}
+
+
+def _cached_query_vector(engine: RecommenderEngine, key: Hashable, user_text: str, version: Any) -> sparse.csr_matrix:
+    q_vec = _QUERY_VECTORS.get(key, version)
+    if q_vec is None:
+        q_vec = engine.query_vector(user_text)
+        _QUERY_VECTORS.put(key, q_vec, version)
+    return q_vec
+
+
+@timed("similar", profile=True)
+def cached_similar(engine: RecommenderEngine, seed_restaurant: str, top_n: int, version: Any) -> List[RecoResult]:
+    """``engine.similar`` through the result cache; ``version`` names the artifacts ``engine`` serves."""
+    key = ("similar", seed_restaurant, int(top_n))
+    recs = _RESULTS.get(key, version)
+    if recs is None:
+        recs = engine.similar(seed_restaurant, top_n=top_n)
+        _RESULTS.put(key, recs, version)
+    return list(recs)
+
+
+@timed("preferences", profile=True)
+def cached_from_preferences(engine: RecommenderEngine, user_text: str, top_n: int, version: Any) -> List[RecoResult]:
+    """``engine.from_preferences`` through the result and query-vector caches."""
+    query_key = engine.query_key(validate_query(user_text))
+    key = ("preferences", query_key, int(top_n))
+    recs = _RESULTS.get(key, version)
+    if recs is None:
+        q_vec = _cached_query_vector(engine, query_key, user_text, version)
+        recs = engine.from_vector(q_vec, top_n=top_n)
+        _RESULTS.put(key, recs, version)
+    return list(recs)
+
+
+@timed("preferences_batch", profile=True)
+def cached_from_preferences_batch(
+    engine: RecommenderEngine,
+    queries: Sequence[str],
+    top_n: int,
+    version: Any,
+) -> List[List[RecoResult]]:
+    """``engine.from_preferences_batch`` for the queries missing from the result cache."""
+    keys = [("preferences", engine.query_key(validate_query(q)), int(top_n)) for q in queries]
+    results = [_RESULTS.get(key, version) for key in keys]
+    missing = [i for i, recs in enumerate(results) if recs is None]
+    if missing:
+        scored = engine.from_preferences_batch([queries[i] for i in missing], top_n=top_n)
+        for i, recs in zip(missing, scored):
+            results[i] = recs
+            _RESULTS.put(keys[i], recs, version)
+    return [list(recs) for recs in results]
+
+
+_ENGINE: RecommenderEngine | None = None
+
+
+def get_engine(
+    profiles_df: pd.DataFrame,
+    tfidf_matrix: sparse.csr_matrix,
+    index: Dict[str, int],
+    vectorizer: TfidfVectorizer | None = None,
+    neighbors: Tuple[np.ndarray, np.ndarray] | None = None,
+    ann: IVFIndex | None = None,
+    pq: PQIndex | None = None,
+) -> RecommenderEngine:
+    """
+    Return the engine for these exact objects, rebuilding only when a different
+    profiles/matrix/index is passed in. A vectorizer / neighbor table / ANN or PQ index
+    the engine does not hold yet is attached to it, so callers that pass only what they
+    need (the similar path has no vectorizer, the preferences path no neighbor table)
+    share one engine. Rebuilding, replacing an artifact or adding an approximate index
+    empties the result caches.
+    """
+    global _ENGINE
+    engine = _ENGINE
+    if (
+        engine is None
+        or engine.profiles_df is not profiles_df
+        or engine.index is not index
+        or engine.tfidf_matrix is not tfidf_matrix
+    ):
+        with span("engine_build"):
+            engine = RecommenderEngine(
+                profiles_df, tfidf_matrix, index, vectorizer=vectorizer, neighbors=neighbors, ann=ann, pq=pq
+            )
+        _ENGINE = engine
+        _RESULTS.clear()
+        _QUERY_VECTORS.clear()
+        return engine
+
+    given = {"vectorizer": vectorizer, "neighbors": neighbors, "ann": ann, "pq": pq}
+    changed = {
+        name: value
+        for name, value in given.items()
+        if value is not None and getattr(engine, name) is not value and not engine.is_stale(value)
+    }
+    if changed:
+        # filling in a vectorizer or the (exact) neighbor table leaves cached results valid
+        if "ann" in changed or "pq" in changed or any(getattr(engine, name) is not None for name in changed):
+            _RESULTS.clear()
+            _QUERY_VECTORS.clear()
+        engine.attach(**changed)
+    return engine
+
+
+def recommend_similar_restaurants(
+    seed_restaurant: str,
+    profiles_df: pd.DataFrame,
+    tfidf_matrix: sparse.csr_matrix,
+    index: Dict[str, int],
+    top_n: int = 10,
+    neighbors: Tuple[np.ndarray, np.ndarray] | None = None,
+    ann: IVFIndex | None = None,
+    pq: PQIndex | None = None,
+) -> List[RecoResult]:
+    """
+    Recommend restaurants similar to a given restaurant based on TF-IDF cosine similarity
+    + hybrid ranking with rating and popularity.
+    Pass the table from load_neighbors() to avoid scoring the whole catalog, or an
+    index from ann.load_ivf_index() / ann.load_pq_index() for approximate candidate retrieval.
+    """
+    engine = get_engine(profiles_df, tfidf_matrix, index, neighbors=neighbors, ann=ann, pq=pq)
+    return cached_similar(engine, seed_restaurant, top_n, artifact_version())
 
 
 def recommend_from_preferences(
@@ -157,41 +1230,32 @@ def recommend_from_preferences(
     tfidf_matrix: sparse.csr_matrix,
     index: Dict[str, int],
     top_n: int = 10,
+    ann: IVFIndex | None = None,
+    pq: PQIndex | None = None,
 ) -> List[RecoResult]:
     """
     Recommend restaurants based on user's free-text preferences.
+    Results and query vectors are cached under the normalized query (see
+    RecommenderEngine.query_key), so re-runs and respellings skip the scoring.
     """
-    query = (user_text or "").strip()
-    if len(query) < 3:
-        raise ValueError("Please enter a longer preference text (at least 3 characters).")
+    engine = get_engine(profiles_df, tfidf_matrix, index, vectorizer, ann=ann, pq=pq)
+    return cached_from_preferences(engine, user_text, top_n, artifact_version())
 
-    q_vec = vectorizer.transform([query])
-    sims = cosine_similarity(q_vec, tfidf_matrix).ravel()
 
-    df = profiles_df.copy()
-    df["similarity"] = df["Restaurant"].map(lambda r: float(sims[index[r]]) if r in index else 0.0)
-
-    df["rating_norm"] = _minmax(df["avg_rating"])
-    df["pop_norm"] = _minmax(np.log1p(df["num_reviews"].clip(lower=0)))
-
-    df["final_score"] = (
-        CFG.W_SIM * df["similarity"]
-        + CFG.W_RATING * df["rating_norm"]
-        + CFG.W_POP * df["pop_norm"]
-    )
-
-    df = df.sort_values("final_score", ascending=False).head(top_n)
-
-    results: List[RecoResult] = []
-    for _, row in df.iterrows():
-        results.append(
-            RecoResult(
-                restaurant=str(row["Restaurant"]),
-                final_score=float(row["final_score"]),
-                similarity=float(row["similarity"]),
-                avg_rating=float(row["avg_rating"]),
-                num_reviews=int(row["num_reviews"]),
-                sample_review=str(row["sample_review"]),
-            )
-        )
-    return results
\ No newline at end of file
+def recommend_from_preferences_batch(
+    queries: Sequence[str],
+    profiles_df: pd.DataFrame,
+    vectorizer: TfidfVectorizer,
+    tfidf_matrix: sparse.csr_matrix,
+    index: Dict[str, int],
+    top_n: int = 10,
+    ann: IVFIndex | None = None,
+    pq: PQIndex | None = None,
+) -> List[List[RecoResult]]:
+    """
+    Recommend restaurants for many free-text preferences at once.
+    Returns one result list per query, identical to calling recommend_from_preferences on each.
+    Cached queries are answered from the result cache; the rest are scored together.
+    """
+    engine = get_engine(profiles_df, tfidf_matrix, index, vectorizer, ann=ann, pq=pq)
+    return cached_from_preferences_batch(engine, queries, top_n, artifact_version())
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .config import CFG, PATHS
+from .preprocessing import SCHEMA
+from .utils import ensure_dir, get_logger
+
+
+logger = get_logger(__name__)
+
+# On-disk layout of the cleaned reviews:
+#   reviews_clean.parquet  every column but the review text, plus REVIEW_ID (the row's
+#                          position in the cleaned input). Sorted by Rating then Time and
+#                          cut into row groups holding a single rating, so min/max
+#                          statistics let rating and date filters skip whole row groups.
+#                          Restaurant / Reviewer are dictionary-encoded.
+#   reviews_text.parquet   the Review column alone, row i holding REVIEW_ID i, so the
+#                          text of matched rows is fetched by position.
+# Reviews appended later go to numbered part files next to each (reviews_clean.part-0001.parquet,
+# reviews_text.part-0001.parquet, ...) laid out the same way, with ids continuing where the
+# previous files end; readers take the base file and its parts together (see review_files).
+REVIEW_ID = "review_id"
+
+# Arrow schema of the cleaned reviews (text included); every frame is cast to it so
+# the writers see one consistent schema.
+CLEAN_FIELDS = [
+    pa.field(SCHEMA.restaurant, pa.dictionary(pa.int32(), pa.string())),
+    pa.field(SCHEMA.reviewer, pa.dictionary(pa.int32(), pa.string())),
+    pa.field(SCHEMA.review, pa.string()),
+    pa.field(SCHEMA.rating, pa.float64()),
+    pa.field(SCHEMA.metadata, pa.string()),
+    pa.field(SCHEMA.time, pa.timestamp("ns")),
+    pa.field(SCHEMA.pictures, pa.int64()),
+    pa.field("reviewer_total_reviews", pa.int32()),
+    pa.field("reviewer_followers", pa.int32()),
+]
+_COLUMN_ORDER = {f.name: i for i, f in enumerate(CLEAN_FIELDS)}
+_TEXT_SCHEMA = pa.schema([pa.field(SCHEMA.review, pa.string())])
+
+
+def review_files(path: Path = PATHS.CLEAN_PARQUET) -> List[Path]:
+    """``path`` followed by its appended part files, in id order."""
+    path = Path(path)
+    return [path] + sorted(path.parent.glob(f"{path.stem}.part-*{path.suffix}"))
+
+
+def _part_path(path: Path, number: int) -> Path:
+    return path.with_name(f"{path.stem}.part-{number:04d}{path.suffix}")
+
+
+def _split_frame(df: pd.DataFrame, first_id: int, schema: pa.Schema | None) -> Tuple[pa.Table, pa.Table]:
+    """(row table, text table) of one cleaned frame; ids count up from ``first_id``."""
+    rows = df.drop(columns=[SCHEMA.review])
+    rows.insert(0, REVIEW_ID, np.arange(first_id, first_id + len(df), dtype=np.int64))
+    if schema is None:
+        fields = [pa.field(REVIEW_ID, pa.int64())] + [f for f in CLEAN_FIELDS if f.name in rows.columns]
+        schema = pa.schema(fields)
+    table = pa.Table.from_pandas(rows, schema=schema, preserve_index=False)
+    text = pa.Table.from_arrays([pa.array(df[SCHEMA.review], type=pa.string(), from_pandas=True)], schema=_TEXT_SCHEMA)
+    return table, text
+
+
+def _write_sorted(writer: pq.ParquetWriter, table: pa.Table, row_group_rows: int) -> None:
+    """Write ``table`` sorted by rating then time, one rating value per row group."""
+    keys = [(SCHEMA.rating, "ascending")]
+    if SCHEMA.time in table.column_names:
+        keys.append((SCHEMA.time, "ascending"))
+    table = table.take(pc.sort_indices(table, sort_keys=keys, null_placement="at_end"))
+
+    ratings = table.column(SCHEMA.rating).to_numpy(zero_copy_only=False)
+    changed = (ratings[1:] != ratings[:-1]) & ~(np.isnan(ratings[1:]) & np.isnan(ratings[:-1]))
+    bounds = np.concatenate([[0], np.flatnonzero(changed) + 1, [len(ratings)]])
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        for offset in range(start, stop, row_group_rows):
+            rows = table.slice(offset, min(row_group_rows, stop - offset))
+            writer.write_table(_compact_dictionaries(rows), row_group_size=row_group_rows)
+
+
+def _compact_dictionaries(table: pa.Table) -> pa.Table:
+    """
+    Re-encode dictionary columns against just the values present: Parquet stores an
+    Arrow dictionary as given, so a slice would otherwise carry the whole frame's.
+    """
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            values = pc.dictionary_encode(table.column(i).cast(field.type.value_type).combine_chunks())
+            table = table.set_column(i, field, values.cast(field.type))
+    return table
+
+
+def write_clean_reviews(
+    frames: Iterable[pd.DataFrame],
+    path: Path = PATHS.CLEAN_PARQUET,
+    text_path: Path = PATHS.CLEAN_TEXT_PARQUET,
+    row_group_rows: int = CFG.CLEAN_ROW_GROUP_ROWS,
+) -> int:
+    """
+    Write cleaned review frames (e.g. streamed chunks) in the columnar layout above.
+    Each frame is sorted on its own, so a single frame gives a fully sorted file.
+    Returns the number of rows written.
+    """
+    ensure_dir(path.parent)
+    # a full write replaces any appended parts
+    for part in review_files(path)[1:] + review_files(text_path)[1:]:
+        part.unlink()
+    writer = text_writer = None
+    schema = None
+    rows = 0
+    try:
+        for df in frames:
+            table, text = _split_frame(df, rows, schema)
+            if writer is None:
+                # first frame's schema carries the pandas metadata (e.g. nullable Int32)
+                schema = table.schema
+                writer = pq.ParquetWriter(path, schema)
+                text_writer = pq.ParquetWriter(text_path, _TEXT_SCHEMA, use_dictionary=False)
+            _write_sorted(writer, table, row_group_rows)
+            text_writer.write_table(text, row_group_size=row_group_rows)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+            text_writer.close()
+
+    if writer is None:
+        raise ValueError(f"No cleaned reviews to write to {path}")
+    return rows
+
+
+def append_clean_reviews(
+    df: pd.DataFrame,
+    path: Path = PATHS.CLEAN_PARQUET,
+    text_path: Path = PATHS.CLEAN_TEXT_PARQUET,
+    row_group_rows: int = CFG.CLEAN_ROW_GROUP_ROWS,
+) -> int:
+    """
+    Add cleaned reviews to an existing layout as one more pair of part files (row
+    groups sorted and one rating each, as in the base file), without reading or
+    rewriting the existing files. Returns the new total row count.
+    """
+    total = count_reviews(path=path)
+    number = len(review_files(path))
+    delta, delta_text = _split_frame(df, total, pq.read_schema(path))
+    with pq.ParquetWriter(_part_path(path, number), delta.schema) as writer:
+        _write_sorted(writer, delta, row_group_rows)
+    pq.write_table(delta_text, _part_path(text_path, number), row_group_size=row_group_rows, use_dictionary=False)
+    return total + len(df)
+
+
+def _timestamp(value: pd.Timestamp | str) -> pa.Scalar:
+    return pa.scalar(pd.Timestamp(value).as_unit("ns").value, pa.timestamp("ns"))
+
+
+def review_filter(
+    min_rating: float | None = None,
+    max_rating: float | None = None,
+    since: pd.Timestamp | str | None = None,
+    until: pd.Timestamp | str | None = None,
+) -> Optional[ds.Expression]:
+    """Dataset filter for a rating range and/or a [since, until] review date range."""
+    terms = []
+    if min_rating is not None:
+        terms.append(ds.field(SCHEMA.rating) >= float(min_rating))
+    if max_rating is not None:
+        terms.append(ds.field(SCHEMA.rating) <= float(max_rating))
+    if since is not None:
+        terms.append(ds.field(SCHEMA.time) >= _timestamp(since))
+    if until is not None:
+        terms.append(ds.field(SCHEMA.time) <= _timestamp(until))
+    if not terms:
+        return None
+    expr = terms[0]
+    for term in terms[1:]:
+        expr = expr & term
+    return expr
+
+
+def read_review_text(review_ids: Sequence[int] | pa.Array, text_path: Path = PATHS.CLEAN_TEXT_PARQUET) -> pa.Array:
+    """Review text for ``review_ids`` (any order), reading only the row groups holding them."""
+    ids = np.asarray(review_ids, dtype=np.int64)
+    files = [pq.ParquetFile(p) for p in review_files(text_path)]
+    # row groups of the base file and its parts, in id order: (file, group within it)
+    groups_of = [(f, i) for f in files for i in range(f.num_row_groups)]
+    sizes = [f.metadata.row_group(i).num_rows for f, i in groups_of]
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    if len(ids) and (ids.min() < 0 or ids.max() >= starts[-1]):
+        raise IndexError(f"Review ids out of range for {text_path} ({starts[-1]} rows)")
+    groups = np.searchsorted(starts, ids, side="right") - 1
+    needed = np.unique(groups)
+    if not len(needed):
+        return pa.array([], type=pa.string())
+    # offset of each needed row group within the concatenation of just those groups
+    bases = np.concatenate([[0], np.cumsum(np.asarray(sizes)[needed])])[:-1]
+    positions = ids - starts[groups] + bases[np.searchsorted(needed, groups)]
+    chunks = []
+    for f in files:
+        wanted = [groups_of[g][1] for g in needed if groups_of[g][0] is f]
+        if wanted:
+            chunks.extend(f.read_row_groups(wanted, columns=[SCHEMA.review]).column(SCHEMA.review).chunks)
+    return pa.chunked_array(chunks, type=pa.string()).take(pa.array(positions))
+
+
+def _with_text(table: pa.Table, columns: List[str], text_path: Path) -> pa.Table:
+    if SCHEMA.review in columns:
+        table = table.append_column(SCHEMA.review, read_review_text(table.column(REVIEW_ID).to_numpy(), text_path))
+    return table.select(columns)
+
+
+def _all_columns(path: Path) -> List[str]:
+    names = [n for n in pq.read_schema(path).names if n != REVIEW_ID] + [SCHEMA.review]
+    return sorted(names, key=lambda n: _COLUMN_ORDER.get(n, len(_COLUMN_ORDER)))
+
+
+def read_reviews(
+    columns: Sequence[str] | None = None,
+    min_rating: float | None = None,
+    max_rating: float | None = None,
+    since: pd.Timestamp | str | None = None,
+    until: pd.Timestamp | str | None = None,
+    limit: int | None = None,
+    path: Path = PATHS.CLEAN_PARQUET,
+    text_path: Path = PATHS.CLEAN_TEXT_PARQUET,
+) -> pd.DataFrame:
+    """
+    Cleaned reviews matching the filters, with only ``columns`` (default: all).
+
+    Row groups whose statistics rule the filter out are never read, and ``limit``
+    stops the scan once enough rows matched. Review text is read only when asked
+    for, and only for the matched rows. Rows come in file order (rating, then time,
+    within the base file and then each appended part); Restaurant / Reviewer come
+    back as categoricals.
+    """
+    columns = list(columns) if columns is not None else _all_columns(path)
+    scan = [c for c in columns if c != SCHEMA.review]
+    if SCHEMA.review in columns and REVIEW_ID not in scan:
+        scan.append(REVIEW_ID)
+
+    dataset = ds.dataset([str(p) for p in review_files(path)], format="parquet")
+    expr = review_filter(min_rating, max_rating, since, until)
+    if limit is None:
+        table = dataset.to_table(columns=scan, filter=expr)
+    else:
+        table = dataset.head(limit, columns=scan, filter=expr)
+    return _with_text(table, columns, text_path).to_pandas()
+
+
+def count_reviews(
+    min_rating: float | None = None,
+    max_rating: float | None = None,
+    since: pd.Timestamp | str | None = None,
+    until: pd.Timestamp | str | None = None,
+    path: Path = PATHS.CLEAN_PARQUET,
+) -> int:
+    """Number of reviews matching the filters (the row count from metadata when unfiltered)."""
+    expr = review_filter(min_rating, max_rating, since, until)
+    files = review_files(path)
+    if expr is None:
+        return sum(pq.ParquetFile(p).metadata.num_rows for p in files)
+    return ds.dataset([str(p) for p in files], format="parquet").count_rows(filter=expr)
+
+
+def column_range(column: str, path: Path = PATHS.CLEAN_PARQUET) -> Tuple[object, object]:
+    """(min, max) of ``column`` from the row-group statistics, without reading any data."""
+    lows, highs = [], []
+    for part in review_files(path):
+        metadata = pq.ParquetFile(part).metadata
+        position = metadata.schema.names.index(column)
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(position).statistics
+            if stats is not None and stats.has_min_max:
+                lows.append(stats.min)
+                highs.append(stats.max)
+    if not lows:
+        return None, None
+    return min(lows), max(highs)
+
+
+def read_clean_reviews(path: Path = PATHS.CLEAN_PARQUET, text_path: Path = PATHS.CLEAN_TEXT_PARQUET) -> pd.DataFrame:
+    """
+    The full cleaned table in its original row order with plain string columns, i.e.
+    the frame preprocess_reviews produced (feature building depends on that order).
+    """
+    tables = []
+    for part in review_files(path):
+        table = pq.read_table(part)
+        for name in (SCHEMA.restaurant, SCHEMA.reviewer):
+            if name in table.column_names:
+                i = table.schema.get_field_index(name)
+                table = table.set_column(i, name, table.column(name).cast(pa.string()))
+        tables.append(table)
+    table = pa.concat_tables(tables)
+    table = table.take(pc.sort_indices(table.column(REVIEW_ID)))
+    text = pa.chunked_array(
+        [c for part in review_files(text_path) for c in pq.read_table(part).column(SCHEMA.review).chunks],
+        type=pa.string(),
+    )
+    if len(text) != table.num_rows:
+        raise ValueError(f"{text_path} has {len(text)} rows, {path} has {table.num_rows}")
+    table = table.append_column(SCHEMA.review, text)
+    logger.info("Loaded clean reviews: rows=%d", table.num_rows)
+    return table.select(_all_columns(path)).to_pandas()
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.config import CFG
+from src.generations import ArtifactSet, current_artifacts
+from src.instrumentation import REGISTRY
+from src.recommender import (
+    RecoResult,
+    RecommenderEngine,
+    cache_stats,
+    cached_from_preferences_batch,
+    cached_similar,
+    get_engine,
+    load_model,
+    load_neighbors,
+    validate_query,
+)
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+# Latencies kept per endpoint for the /metrics percentiles
+_LATENCY_WINDOW = 10_000
+
+
+@dataclass
+class ServiceArtifacts:
+    profiles_df: pd.DataFrame
+    vectorizer: Any
+    tfidf_matrix: sparse.csr_matrix
+    index: Dict[str, int]
+    neighbors: Tuple[np.ndarray, np.ndarray] | None = None
+    ann: Any = None
+    pq: Any = None
+    generation: int | None = None
+
+
+def load_service_artifacts(artifacts: ArtifactSet | None = None) -> ServiceArtifacts:
+    """
+    Load everything the Recommender page loads, once, for the lifetime of the service
+    (default: the published artifact generation).
+    """
+    from src.ann import load_ivf_index, load_pq_index
+
+    artifacts = artifacts or current_artifacts()
+    vectorizer, tfidf_matrix, index = load_model(artifacts.tfidf_dir, artifacts.restaurant_index)
+    return ServiceArtifacts(
+        profiles_df=pd.read_parquet(artifacts.profiles),
+        vectorizer=vectorizer,
+        tfidf_matrix=tfidf_matrix,
+        index=index,
+        neighbors=load_neighbors(artifacts.neighbor_ids, artifacts.neighbor_scores),
+        ann=load_ivf_index(artifacts.ann_dir) if CFG.USE_ANN else None,
+        pq=load_pq_index(artifacts.ann_dir) if CFG.USE_PQ else None,
+        generation=artifacts.generation,
+    )
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceMetrics:
+    """Request counts and latency percentiles per endpoint, plus micro-batch sizes."""
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.requests: Dict[Tuple[str, int], int] = defaultdict(int)
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=_LATENCY_WINDOW))
+        self.batches = 0
+        self.batched_queries = 0
+        self.max_batch = 0
+
+    def record(self, endpoint: str, status: int, seconds: float) -> None:
+        self.requests[(endpoint, status)] += 1
+        self.latencies[endpoint].append(seconds)
+
+    def record_batch(self, size: int) -> None:
+        self.batches += 1
+        self.batched_queries += size
+        self.max_batch = max(self.max_batch, size)
+
+    def snapshot(self, **info: Any) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            ms = np.asarray(values) * 1000.0
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            endpoints[endpoint] = {
+                "count": sum(n for (e, _), n in self.requests.items() if e == endpoint),
+                "errors": sum(n for (e, status), n in self.requests.items() if e == endpoint and status >= 400),
+                "p50_ms": round(float(p50), 3),
+                "p90_ms": round(float(p90), 3),
+                "p99_ms": round(float(p99), 3),
+            }
+        return {
+            **info,
+            "uptime_s": round(time.time() - self.started, 1),
+            "endpoints": endpoints,
+            "micro_batches": {
+                "batches": self.batches,
+                "queries": self.batched_queries,
+                "mean_size": self.batched_queries / self.batches if self.batches else 0.0,
+                "max_size": self.max_batch,
+            },
+            "caches": cache_stats(),
+            "instrumentation": REGISTRY.snapshot(),
+        }
+
+    def prometheus(self, **info: Any) -> str:
+        """Request counts, micro-batching and cache counters plus the phase histograms, as Prometheus text."""
+        labels = "".join(f',{k}="{v}"' for k, v in info.items())
+        lines = ["# HELP reco_http_requests_total HTTP requests by endpoint and status.", "# TYPE reco_http_requests_total counter"]
+        for (endpoint, status), n in sorted(self.requests.items()):
+            lines.append(f'reco_http_requests_total{{endpoint="{endpoint}",status="{status}"{labels}}} {n}')
+        lines += [
+            "# HELP reco_micro_batches_total Micro-batches scored and the queries in them.",
+            "# TYPE reco_micro_batches_total counter",
+            f'reco_micro_batches_total{{kind="batches"{labels}}} {self.batches}',
+            f'reco_micro_batches_total{{kind="queries"{labels}}} {self.batched_queries}',
+            "# HELP reco_cache_lookups_total Result / query-vector cache lookups.",
+            "# TYPE reco_cache_lookups_total counter",
+        ]
+        for cache, stats in cache_stats().items():
+            for outcome in ("hits", "misses"):
+                lines.append(f'reco_cache_lookups_total{{cache="{cache}",outcome="{outcome}"{labels}}} {stats[outcome]}')
+        return "\n".join(lines) + "\n" + REGISTRY.prometheus()
+
+
+class MicroBatcher:
+    """
+    Collects preference queries that arrive within ``window`` seconds (or until
+    ``max_batch`` are waiting) and scores each group with one ``score_batch`` call,
+    i.e. one transform and one sparse Q x M^T product. Queries are grouped by top_n.
+    """
+
+    def __init__(
+        self,
+        score_batch: Callable[[List[str], int], List[List[RecoResult]]],
+        executor: ThreadPoolExecutor,
+        metrics: ServiceMetrics,
+        window: float = CFG.SERVICE_BATCH_WINDOW_MS / 1000.0,
+        max_batch: int = CFG.SERVICE_MAX_BATCH,
+    ) -> None:
+        self.score_batch = score_batch
+        self.executor = executor
+        self.metrics = metrics
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[int, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+
+    async def submit(self, text: str, top_n: int) -> List[RecoResult]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(top_n, [])
+        pending.append((text, future))
+        if len(pending) >= self.max_batch:
+            self._flush(top_n)
+        elif top_n not in self._timers:
+            self._timers[top_n] = loop.call_later(self.window, self._flush, top_n)
+        return await future
+
+    def _flush(self, top_n: int) -> None:
+        timer = self._timers.pop(top_n, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(top_n, [])
+        if items:
+            asyncio.get_running_loop().create_task(self._score(items, top_n))
+
+    async def _score(self, items: List[Tuple[str, asyncio.Future]], top_n: int) -> None:
+        self.metrics.record_batch(len(items))
+        texts = [text for text, _ in items]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.score_batch, texts, top_n)
+        except Exception as exc:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), recs in zip(items, results):
+            if not future.done():
+                future.set_result(recs)
+
+
+class RecommendationService:
+    """
+    Minimal asyncio HTTP/1.1 server (keep-alive, JSON bodies) over the recommender
+    functions. Artifacts are loaded once; scoring runs on a single worker thread so
+    the event loop keeps accepting and batching requests while NumPy works.
+
+    Endpoints:
+      GET|POST /similar    restaurant, top_n
+      GET|POST /recommend  text, top_n   (micro-batched)
+      POST     /batch      queries, top_n
+      GET      /metrics
+      GET      /metrics/prometheus   (text exposition format)
+    """
+
+    def __init__(self, artifacts: ServiceArtifacts | None) -> None:
+        self.artifacts = artifacts
+        self.metrics = ServiceMetrics()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reco")
+        self.batcher = MicroBatcher(self._score_batch, self.executor, self.metrics)
+        self.server: asyncio.AbstractServer | None = None
+
+    def engine(self) -> RecommenderEngine:
+        a = self.artifacts
+        return get_engine(a.profiles_df, a.tfidf_matrix, a.index, a.vectorizer, neighbors=a.neighbors, ann=a.ann, pq=a.pq)
+
+    def version(self) -> Any:
+        """Artifact version the result cache is keyed on (the generation this service loaded)."""
+        return self.artifacts.generation
+
+    def _score_batch(self, texts: List[str], top_n: int) -> List[List[RecoResult]]:
+        return cached_from_preferences_batch(self.engine(), texts, top_n, self.version())
+
+    def _similar(self, restaurant: str, top_n: int) -> List[RecoResult]:
+        return cached_similar(self.engine(), restaurant, top_n, self.version())
+
+    async def start(self, host: str = CFG.SERVICE_HOST, port: int = CFG.SERVICE_PORT, sock=None) -> None:
+        """Listen on ``host:port``, or on an already bound ``sock`` (shared by worker processes)."""
+        if sock is not None:
+            self.server = await asyncio.start_server(self._handle_connection, sock=sock)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host, port)
+        logger.info("Serving recommendations on port %d", self.port)
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    def info(self) -> Dict[str, Any]:
+        """Extra fields for /metrics."""
+        return {}
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                    headers = {}
+                    for line in lines[1:]:
+                        if ":" in line:
+                            name, value = line.split(":", 1)
+                            headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # the rest of the stream cannot be framed; answer and close
+                    await self._respond(writer, 400, {"error": "Malformed request"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                start = time.perf_counter()
+                path, status, payload = await self._dispatch(method, target, body)
+                self.metrics.record(path, status, time.perf_counter() - start)
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except asyncio.CancelledError:  # server shutting down with the connection idle
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + data
+        )
+        await writer.drain()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[str, int, Any]:
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        try:
+            params: Dict[str, Any] = dict(parse_qsl(url.query))
+            if body:
+                try:
+                    params.update(json.loads(body))
+                except (ValueError, TypeError):
+                    raise HTTPError(400, "Request body must be a JSON object")
+            return path, 200, await self._route(method, path, params)
+        except HTTPError as exc:
+            return path, exc.status, {"error": str(exc)}
+        except ValueError as exc:
+            return path, 400, {"error": str(exc)}
+        except Exception as exc:  # keep serving; the error is reported to the client
+            logger.exception("Request failed: %s %s", method, target)
+            return path, 500, {"error": str(exc)}
+
+    async def _route(self, method: str, path: str, params: Dict[str, Any]) -> Any:
+        if path == "/metrics":
+            return self.metrics.snapshot(**self.info())
+        if path == "/metrics/prometheus":
+            worker = self.info().get("worker")
+            return self.metrics.prometheus(**({} if worker is None else {"worker": worker}))
+        if path not in ("/similar", "/recommend", "/batch"):
+            raise HTTPError(404, f"Unknown endpoint: {path}")
+        if method not in ("GET", "POST") or (path == "/batch" and method != "POST"):
+            raise HTTPError(405, f"{method} not allowed on {path}")
+
+        top_n = int(params.get("top_n", CFG.TOP_N_DEFAULT))
+        loop = asyncio.get_running_loop()
+        if path == "/similar":
+            if "restaurant" not in params:
+                raise HTTPError(400, "Missing parameter: restaurant")
+            recs = await loop.run_in_executor(self.executor, self._similar, str(params["restaurant"]), top_n)
+            return {"results": [asdict(r) for r in recs]}
+        if path == "/recommend":
+            recs = await self.batcher.submit(validate_query(str(params.get("text", ""))), top_n)
+            return {"results": [asdict(r) for r in recs]}
+
+        queries = params.get("queries")
+        if not isinstance(queries, list):
+            raise HTTPError(400, "Missing parameter: queries (a JSON list of strings)")
+        texts = [validate_query(str(q)) for q in queries]
+        self.metrics.record_batch(len(texts))
+        results = await loop.run_in_executor(self.executor, self._score_batch, texts, top_n)
+        return {"results": [[asdict(r) for r in recs] for recs in results]}
+
+
+async def serve(host: str = CFG.SERVICE_HOST, port: int = CFG.SERVICE_PORT) -> None:
+    service = RecommendationService(load_service_artifacts())
+    await service.start(host, port)
+    async with service.server:
+        await service.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recommendations over HTTP.")
+    parser.add_argument("--host", default=CFG.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=CFG.SERVICE_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import multiprocessing as mp
+import os
+import socket
+import time
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.artifacts import MappedTfidfVectorizer, load_arrays
+from src.config import CFG, PATHS
+from src.generations import ArtifactSet, current_artifacts
+from src.recommender import RecommenderEngine, artifact_version, load_model, load_neighbors
+from src.service import RecommendationService
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Start of every array in a block is aligned to this many bytes
+_ALIGN = 64
+
+
+class SharedArrays:
+    """
+    Named NumPy arrays packed into one ``multiprocessing.shared_memory`` block.
+
+    The parent :meth:`create`\\ s the block and passes :attr:`layout` (small and
+    picklable) to workers, which :meth:`attach` and get zero-copy views.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, layout: Dict[str, Any]) -> None:
+        self.shm = shm
+        self.layout = layout
+        self.arrays: Dict[str, np.ndarray] = {
+            name: np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in layout["fields"].items()
+        }
+
+    @classmethod
+    def create(cls, arrays: Dict[str, np.ndarray], name: str, **extra: Any) -> "SharedArrays":
+        """Copy ``arrays`` into a new block; ``extra`` is stored in the layout as-is."""
+        fields = {}
+        size = 0
+        for key, array in arrays.items():
+            array = np.asarray(array)
+            size = -(-size // _ALIGN) * _ALIGN
+            fields[key] = (size, array.dtype.str, list(array.shape))
+            size += array.nbytes
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        shared = cls(shm, {**extra, "name": shm.name, "fields": fields})
+        for key, array in arrays.items():
+            shared.arrays[key][...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, layout: Dict[str, Any]) -> "SharedArrays":
+        return cls(shared_memory.SharedMemory(name=layout["name"]), layout)
+
+    @property
+    def nbytes(self) -> int:
+        return self.shm.size
+
+    def close(self) -> None:
+        """Drop the views and unmap the block (callers must not hold views any more)."""
+        self.arrays = {}
+        gc.collect()
+        try:
+            self.shm.close()
+        except BufferError:
+            logger.warning("Shared block %s still referenced; unmapped at exit", self.layout["name"])
+
+
+def load_engine_arrays(artifacts: ArtifactSet) -> Tuple[Dict[str, np.ndarray], Dict[str, Any] | None]:
+    """
+    Build an engine from ``artifacts`` and return its arrays (see
+    RecommenderEngine.to_arrays) plus the vocabulary arrays, so one generation is
+    self-consistent. The second item holds the vectorizer params, or is None for
+    model types whose vectorizer workers load from ``artifacts.tfidf_dir`` instead.
+    """
+    vectorizer, tfidf_matrix, index = load_model(artifacts.tfidf_dir, artifacts.restaurant_index)
+    engine = RecommenderEngine(
+        pd.read_parquet(artifacts.profiles),
+        tfidf_matrix,
+        index,
+        vectorizer=vectorizer,
+        neighbors=load_neighbors(artifacts.neighbor_ids, artifacts.neighbor_scores),
+    )
+    arrays = engine.to_arrays()
+    if not isinstance(vectorizer, MappedTfidfVectorizer):
+        return arrays, None
+    arrays.update(vocab_terms=vectorizer.terms, vocab_offsets=vectorizer.offsets, vocab_idf=vectorizer.idf_)
+    params = dict(vectorizer.params)
+    params["ngram_range"] = list(params["ngram_range"])
+    return arrays, params
+
+
+class _SharedEngineService(RecommendationService):
+    """Worker-side service answering from the engine of the current shared generation."""
+
+    def __init__(self, worker_id: int) -> None:
+        super().__init__(artifacts=None)
+        self.worker_id = worker_id
+        self.generation = -1
+        self.shared: SharedArrays | None = None
+        self._engine: RecommenderEngine | None = None
+
+    def engine(self) -> RecommenderEngine:
+        return self._engine
+
+    def version(self) -> Any:
+        return self.generation
+
+    def info(self) -> Dict[str, Any]:
+        return {"worker": self.worker_id, "pid": os.getpid(), "generation": self.generation}
+
+    def swap(self, generation: int, layout: Dict[str, Any]) -> None:
+        """
+        Attach the new generation and switch to it. Runs on the scoring thread, so
+        requests queued before the swap finish on the old engine and later ones use
+        the new one; none are dropped. If the new generation cannot be loaded the
+        error is raised and the old engine stays in use.
+        """
+        shared = SharedArrays.attach(layout)
+        try:
+            params = layout.get("vectorizer_params")
+            if params is not None:
+                a = shared.arrays
+                params = {**params, "ngram_range": tuple(params["ngram_range"])}
+                vectorizer = MappedTfidfVectorizer(a["vocab_terms"], a["vocab_offsets"], a["vocab_idf"], params)
+            else:
+                vectorizer, _ = load_arrays(Path(layout["model_dir"]))
+            engine = RecommenderEngine.from_arrays(shared.arrays, vectorizer=vectorizer)
+        except Exception:
+            shared.close()
+            raise
+
+        old = self.shared
+        self._engine, self.shared, self.generation = engine, shared, generation
+        if old is not None:
+            old.close()
+
+
+def _worker_main(sock: socket.socket, conn, worker_id: int) -> None:
+    service = _SharedEngineService(worker_id)
+    # the first generation arrives like any later one, so workers never inherit a mapping
+    _, generation, layout = conn.recv()
+    try:
+        service.swap(generation, layout)
+    except Exception as exc:
+        logger.exception("Worker %d could not load generation %d", worker_id, generation)
+        conn.send(("swap_failed", worker_id, generation, repr(exc)))
+        return
+
+    async def run() -> None:
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+
+        async def swap(new_generation: int, new_layout: Dict[str, Any]) -> None:
+            try:
+                await loop.run_in_executor(service.executor, service.swap, new_generation, new_layout)
+            except Exception as exc:
+                # keep serving the current generation; the parent decides what to do
+                logger.exception("Worker %d could not switch to generation %d", worker_id, new_generation)
+                conn.send(("swap_failed", worker_id, new_generation, repr(exc)))
+            else:
+                conn.send(("swapped", worker_id, new_generation))
+
+        def on_message() -> None:
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = ("stop",)
+            if message[0] == "swap":
+                loop.create_task(swap(message[1], message[2]))
+            elif not stopped.done():
+                stopped.set_result(None)
+
+        loop.add_reader(conn.fileno(), on_message)
+        await service.start(sock=sock)
+        conn.send(("swapped", worker_id, generation))
+        await stopped
+        await service.close()
+
+    asyncio.run(run())
+
+
+class SharedModelServer:
+    """
+    Parent process of the multi-worker service.
+
+    Artifacts are loaded once into a shared-memory block per *generation*
+    (CSR arrays, normalized rating/popularity vectors, inverted index, neighbor
+    table); ``n_workers`` forked workers attach zero-copy views and serve HTTP on
+    one shared listening socket. The vocabulary is shared the same way, so memory
+    only grows per worker by its restaurant names and index dict.
+
+    :meth:`swap` publishes a new generation: workers attach it and switch between
+    requests, then the old block is unlinked. Unless fixed ``artifacts`` are given,
+    each swap loads the artifact generation published under ``models_dir``. A
+    generation that fails to load leaves every worker on the previous one.
+
+    Workers serve the exact scoring path only: the IVF / PQ indexes (``CFG.USE_ANN``,
+    ``CFG.USE_PQ``) are not shared and are ignored in this mode.
+    """
+
+    def __init__(
+        self,
+        n_workers: int = CFG.SHARED_WORKERS,
+        host: str = CFG.SERVICE_HOST,
+        port: int = CFG.SERVICE_PORT,
+        models_dir: Path = PATHS.MODELS_DIR,
+        artifacts: ArtifactSet | None = None,
+    ) -> None:
+        self.n_workers = n_workers if n_workers > 0 else os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.models_dir = models_dir
+        self.artifacts = artifacts
+        self.generation = 0
+        self.shared: SharedArrays | None = None
+        self.sock: socket.socket | None = None
+        self.workers: List[Tuple[mp.Process, Any]] = []
+
+    def _publish(self, generation: int) -> SharedArrays:
+        artifacts = self.artifacts or current_artifacts(self.models_dir)
+        arrays, params = load_engine_arrays(artifacts)
+        shared = SharedArrays.create(
+            arrays,
+            name=f"reco_{os.getpid()}_{generation}",
+            vectorizer_params=params,
+            model_dir=str(artifacts.tfidf_dir),
+        )
+        logger.info("Published generation %d: %.1f MB shared", generation, shared.nbytes / 1e6)
+        return shared
+
+    def _switch(self, conns: List[Any], generation: int, layout: Dict[str, Any], timeout: float = 60.0) -> List[int]:
+        """Ask the workers behind ``conns`` to switch to ``generation``; returns the ids of those that failed."""
+        for conn in conns:
+            conn.send(("swap", generation, layout))
+        deadline = time.monotonic() + timeout
+        failed = []
+        for conn in conns:
+            if not conn.poll(max(0.0, deadline - time.monotonic())):
+                raise TimeoutError(f"Worker did not report on generation {generation}")
+            message = conn.recv()
+            if message[0] not in ("swapped", "swap_failed") or message[2] != generation:
+                raise RuntimeError(f"Unexpected worker message: {message!r}")
+            if message[0] == "swap_failed":
+                logger.error("Worker %d could not switch to generation %d: %s", message[1], generation, message[3])
+                failed.append(message[1])
+        return failed
+
+    @staticmethod
+    def _discard(shared: SharedArrays) -> None:
+        shared.close()
+        shared.shm.unlink()
+
+    def start(self) -> None:
+        if CFG.USE_ANN or CFG.USE_PQ:
+            logger.warning("USE_ANN / USE_PQ are not applied by the shared-memory workers; serving exact scores")
+        self.sock = socket.create_server((self.host, self.port))
+        self.port = self.sock.getsockname()[1]
+
+        # workers must share this process's tracker; one of their own would unlink
+        # the blocks when the worker exits
+        resource_tracker.ensure_running()
+        # keep the inherited heap out of the workers' collections (no copy-on-write faults)
+        gc.freeze()
+        ctx = mp.get_context("fork")
+        for worker_id in range(self.n_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_worker_main, args=(self.sock, child_conn, worker_id), daemon=True)
+            process.start()
+            self.workers.append((process, parent_conn))
+        gc.unfreeze()
+        try:
+            self.swap()
+        except Exception:
+            self.stop()
+            raise
+        logger.info("Started %d workers on http://%s:%d", self.n_workers, self.host, self.port)
+
+    def swap(self) -> int:
+        """
+        Load the artifacts on disk as a new generation and switch every worker to it.
+        Returns the generation served afterwards: if the artifacts cannot be loaded, or
+        any worker cannot attach them, the error is logged and every worker stays on
+        (or goes back to) the current generation.
+        """
+        old, generation = self.shared, self.generation + 1
+        try:
+            new = self._publish(generation)
+        except Exception:
+            if old is None:
+                raise
+            logger.exception("Could not load generation %d; still serving %d", generation, self.generation)
+            return self.generation
+
+        conns = [conn for _, conn in self.workers]
+        failed = self._switch(conns, generation, new.layout)
+        if failed:
+            if old is None:
+                self._discard(new)
+                raise RuntimeError(f"Workers {failed} could not load generation {generation}")
+            # workers must not serve different generations; switch the others back
+            switched = [conn for worker_id, conn in enumerate(conns) if worker_id not in failed]
+            self._switch(switched, self.generation, old.layout)
+            self._discard(new)
+            logger.error("Generation %d rejected; still serving %d", generation, self.generation)
+            return self.generation
+
+        self.shared, self.generation = new, generation
+        if old is not None:
+            self._discard(old)
+        logger.info("Workers switched to generation %d", self.generation)
+        return self.generation
+
+    def stop(self) -> None:
+        for process, conn in self.workers:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process, _ in self.workers:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self.workers = []
+        if self.sock is not None:
+            self.sock.close()
+        if self.shared is not None:
+            self._discard(self.shared)
+            self.shared = None
+
+    def serve_forever(self, poll_seconds: float = CFG.SHARED_SWAP_POLL_S) -> None:
+        """Serve until interrupted, swapping generations when pipeline_build publishes new artifacts."""
+        version = artifact_version(self.models_dir)
+        try:
+            while True:
+                time.sleep(poll_seconds)
+                latest = artifact_version(self.models_dir)
+                if latest != version:
+                    version = latest
+                    self.swap()
+        finally:
+            self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recommendations from N workers over shared-memory arrays.")
+    parser.add_argument("--workers", type=int, default=CFG.SHARED_WORKERS, help="Worker processes (-1 = all CPUs).")
+    parser.add_argument("--host", default=CFG.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=CFG.SERVICE_PORT)
+    args = parser.parse_args()
+
+    server = SharedModelServer(n_workers=args.workers, host=args.host, port=args.port)
+    server.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from benchmarks.bench_recommender import compare
+from benchmarks.synthetic import make_reviews
+from src.preprocessing import preprocess_reviews
+
+
+def test_synthetic_reviews_match_raw_schema():
+    raw = make_reviews(n_restaurants=4, reviews_per_restaurant=3, vocab_size=50, seed=0)
+    clean = preprocess_reviews(raw)
+    assert len(clean) == 12 and clean["Restaurant"].nunique() == 4
+    assert clean["Rating"].between(1, 5).all() and clean["Time"].notna().all()
+    assert clean["reviewer_followers"].notna().all()
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"train_tfidf_s": 1.0, "similar.p50_ms": 0.2, "batch.throughput_qps": 1000.0, "load_s": 0.01}
+    metrics = {"train_tfidf_s": 1.5, "similar.p50_ms": 0.6, "batch.throughput_qps": 600.0, "load_s": 0.04}
+    regressions = compare(metrics, baseline, tolerance=0.3)
+    # similar.p50_ms and load_s tripled but stay under the noise floor
+    assert [r.split(":")[0] for r in regressions] == ["train_tfidf_s", "batch.throughput_qps"]
+    assert compare(baseline, baseline, tolerance=0.3) == []
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.eda_aggregates import build_eda_aggregates, reviews_at_least, sample_reviews, top_restaurants
+from src.review_store import write_clean_reviews
+
+
+def test_aggregates_match_full_table(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 300
+    df = pd.DataFrame({
+        "Restaurant": [f"R{i % 9}" for i in range(n)],
+        "Reviewer": [f"u{i}" for i in range(n)],
+        "Review": [f"review {i}" for i in range(n)],
+        "Rating": rng.choice([1.0, 2.5, 3.0, 4.0, 4.5, 5.0, np.nan], size=n),
+        "Time": pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 900, size=n), unit="D"),
+    })
+    path, text_path = tmp_path / "clean.parquet", tmp_path / "text.parquet"
+    write_clean_reviews([df.iloc[:170], df.iloc[170:]], path, text_path, row_group_rows=32)
+    profiles = df.groupby("Restaurant").agg(num_reviews=("Review", "count"), avg_rating=("Rating", "mean")).reset_index()
+
+    agg = build_eda_aggregates(profiles, path, text_path, bins=8, sample_per_rating=10, top_restaurants=5)
+
+    rated = df["Rating"].dropna()
+    assert agg["total_reviews"] == n and agg["rated_reviews"] == len(rated)
+    assert np.isclose(agg["mean_rating"], rated.mean())
+    assert agg["rating_histogram"]["counts"] == np.histogram(rated, bins=8, range=(1, 5))[0].tolist()
+    assert pd.Timestamp(agg["date_min"]) == df["Time"].min() and pd.Timestamp(agg["date_max"]) == df["Time"].max()
+    for threshold in (1.0, 2.0, 4.5, 5.0, 5.5):
+        assert reviews_at_least(agg, threshold) == (rated >= threshold).sum()
+    assert top_restaurants(agg, 3)["num_reviews"].tolist() == sorted(profiles["num_reviews"], reverse=True)[:3]
+
+    sample = sample_reviews(agg, 4.0, n=10)
+    assert len(sample) == 10 and (sample["Rating"] >= 4.0).all()
+    # sampled rows are real reviews with their own text and attributes
+    merged = sample.merge(df, on=["Review", "Restaurant", "Reviewer", "Rating", "Time"], how="left", indicator=True)
+    assert (merged["_merge"] == "both").all()
+    assert len(sample_reviews(agg, 5.0, n=50)) == min(10, (rated == 5.0).sum())
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import pandas as pd
+import pandas.testing as pdt
+
+from src.feature_engineering import (
+    aggregate_restaurant_profiles,
+    build_restaurant_corpus,
+    build_restaurant_profiles,
+    merge_restaurant_corpus,
+    merge_restaurant_profiles,
+)
+
+
+def _clean_reviews() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Restaurant": ["A", "B", "A", "C", "B", "D", "A"],
+        "Review": ["good food", "nice", "too salty", "ok", "great view", "new spot", "loved it"],
+        "Rating": [5.0, 4.0, None, 3.0, 2.0, None, 4.5],
+        "Time": pd.to_datetime(["2019-05-01", "2019-05-02", "2019-05-03", "2019-05-04", "2019-05-05", "2019-05-06", "2019-05-07"]),
+    })
+
+
+def test_merging_new_reviews_matches_full_rebuild():
+    df = _clean_reviews()
+    old, new = df.iloc[:4], df.iloc[4:]
+
+    profiles = merge_restaurant_profiles(build_restaurant_profiles(old), aggregate_restaurant_profiles(new))
+    corpus = merge_restaurant_corpus(build_restaurant_corpus(old), build_restaurant_corpus(new))
+
+    pdt.assert_frame_equal(profiles, build_restaurant_profiles(df))
+    pdt.assert_frame_equal(corpus, build_restaurant_corpus(df))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import numpy as np
+
+from src.artifacts import save_npy
+from src.generations import (
+    ArtifactSet,
+    current_artifacts,
+    current_generation,
+    publish_generation,
+    verify_generation,
+)
+
+
+def _write_working(root, value):
+    work = ArtifactSet.in_dir(root)
+    work.tfidf_dir.mkdir(parents=True, exist_ok=True)
+    save_npy(work.tfidf_dir / "idf.npy", np.full(4, value, dtype=np.float64))
+    (work.tfidf_dir / "meta.json").write_text('{"format_version": 1}', encoding="utf-8")
+    work.restaurant_index.write_text('{"A": 0}', encoding="utf-8")
+    save_npy(work.neighbor_ids, np.arange(4, dtype=np.int32))
+    return work
+
+
+def test_publish_switches_current_and_keeps_old_generation_intact(tmp_path):
+    models = tmp_path / "models"
+    assert current_generation(models) is None
+
+    work = _write_working(tmp_path / "work", 1.0)
+    assert publish_generation(work, models_dir=models) == 1
+    first = current_artifacts(models)
+    assert first.generation == 1 and np.load(first.tfidf_dir / "idf.npy")[0] == 1.0
+
+    # rewriting the working copy (rename-based, like the pipeline) must not touch generation 1
+    _write_working(tmp_path / "work", 2.0)
+    assert publish_generation(work, models_dir=models) == 2
+    second = current_artifacts(models)
+    assert current_generation(models) == 2
+    assert np.load(second.tfidf_dir / "idf.npy")[0] == 2.0
+    assert np.load(first.tfidf_dir / "idf.npy")[0] == 1.0
+    assert verify_generation(first.tfidf_dir.parent) == {}
+    assert verify_generation(second.tfidf_dir.parent) == {}
+
+
+def test_verify_detects_tampering_and_prune_keeps_newest(tmp_path):
+    models = tmp_path / "models"
+    work = _write_working(tmp_path / "work", 1.0)
+    for _ in range(4):
+        publish_generation(work, models_dir=models, keep=2)
+    assert sorted(p.name for p in (models / "generations").iterdir()) == ["000003", "000004"]
+
+    root = current_artifacts(models).tfidf_dir.parent
+    (root / "restaurant_index.json").write_text('{"B": 0}', encoding="utf-8")
+    (root / "tfidf" / "idf.npy").unlink()
+    assert verify_generation(root) == {"restaurant_index.json": "checksum mismatch", "tfidf/idf.npy": "missing"}
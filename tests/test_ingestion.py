@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from src.ingestion import load_raw_csv, stream_clean_reviews
+from src.preprocessing import preprocess_reviews
+from src.review_store import read_clean_reviews, write_clean_reviews
+
+
+def test_stream_clean_reviews_matches_in_memory(tmp_path):
+    csv_path = tmp_path / "reviews.csv"
+    pd.DataFrame({
+        "Restaurant": ["A", "B", "A", "C", "B"],
+        "Reviewer": ["u1", "u2", "u3", "u1", "u4"],
+        "Review": ["Great food!", "Nice place", "Too salty", "Visit www.example.com", "Ok"],
+        "Rating": ["5", "4", "Like", "3", "2"],
+        "Metadata": ["1 Review , 2 Followers", "3 Reviews , 0 Followers", None, "2 Reviews", "5 Reviews , 1 Follower"],
+        "Time": ["5/25/2019 15:54", "6/01/2019 10:00", "6/02/2019 11:00", "6/03/2019 12:00", "6/04/2019 13:00"],
+        "Pictures": [1, 0, "3.0", "a few", 0],
+        "7514": [None, None, None, None, None],
+    }).to_csv(csv_path, index=False)
+
+    out_path, text_path = tmp_path / "clean.parquet", tmp_path / "text.parquet"
+    rows = stream_clean_reviews(csv_path, out_path, text_path, chunksize=2)
+
+    in_memory = preprocess_reviews(load_raw_csv(csv_path))
+    write_clean_reviews([in_memory], tmp_path / "in_memory.parquet", tmp_path / "in_memory_text.parquet")
+
+    expected = read_clean_reviews(tmp_path / "in_memory.parquet", tmp_path / "in_memory_text.parquet")
+    streamed = read_clean_reviews(out_path, text_path)
+    # rows come back in cleaning order although the files are sorted by rating
+    assert streamed["Review"].tolist() == in_memory["Review"].tolist()
+    assert rows == len(expected)
+    # non-integer Pictures values are coerced by preprocess_reviews, not rejected by read_csv
+    assert streamed["Pictures"].tolist()[:3] == [1, 0, 3] and pd.isna(streamed["Pictures"][3])
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+    assert streamed["reviewer_total_reviews"].dtype == "Int32"
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from src import instrumentation as inst
+from src.recommender import recommend_from_preferences, recommend_similar_restaurants, train_tfidf
+
+
+def test_spans_counters_and_prometheus_text():
+    inst.REGISTRY.clear()
+
+    @inst.timed("work")
+    def work(n):
+        return sum(range(n))
+
+    assert work(1000) == sum(range(1000))
+    with inst.span("block"):
+        work(10)
+    inst.count("events", 3)
+
+    snap = inst.snapshot()
+    assert snap["phases"]["work"]["count"] == 2 and snap["phases"]["block"]["count"] == 1
+    assert snap["counters"] == {"events": 3}
+
+    text = inst.prometheus_text()
+    assert "# TYPE reco_phase_seconds histogram" in text
+    assert 'reco_phase_seconds_bucket{phase="work",le="+Inf"} 2' in text
+    assert 'reco_phase_seconds_count{phase="block"} 1' in text
+    assert 'reco_events_total{event="events"} 3' in text
+
+    inst.set_enabled(False)
+    try:
+        work(10)
+        inst.count("events")
+        assert inst.snapshot()["phases"]["work"]["count"] == 2 and inst.snapshot()["counters"]["events"] == 3
+    finally:
+        inst.set_enabled(True)
+
+
+def test_recommend_phases_and_sampled_profile():
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C"],
+        "corpus": ["spicy chicken rice", "romantic wine ambience", "quick lunch cheap"],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({"Restaurant": ["A", "B", "C"], "avg_rating": [4.5, 4.0, 3.8], "num_reviews": [100, 50, 30]})
+
+    inst.REGISTRY.clear()
+    inst.enable_profiling(sample_rate=1.0, memory=True)
+    try:
+        recommend_from_preferences("spicy wine instrumented", profiles, vectorizer, tfidf_matrix, index, top_n=2)
+        recommend_similar_restaurants("A", profiles, tfidf_matrix, index, top_n=2)
+        report = inst.profile_report()
+    finally:
+        inst.disable_profiling()
+
+    phases = inst.snapshot()["phases"]
+    for phase in ("preferences", "similar", "transform", "score", "topk", "results"):
+        assert phases[phase]["count"] >= 1, phase
+    assert "sampled spans" in report and "from_vector" in report
+    assert "peak allocation preferences" in report
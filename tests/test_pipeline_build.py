@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pandas.testing as pdt
+
+from src.pipeline_build import build_features, shard_by_restaurant
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _raw_reviews() -> pd.DataFrame:
+    restaurants = ["A", "B", " C ", "D", "E", "F"]
+    n = 24
+    return pd.DataFrame({
+        "Restaurant": [restaurants[i % len(restaurants)] for i in range(n)],
+        "Reviewer": [f"u{i}" for i in range(n)],
+        "Review": [f"review {i} tasty food" if i % 7 else "" for i in range(n)],
+        "Rating": [str(i % 5 + 1) if i % 5 else "Like" for i in range(n)],
+        "Metadata": [f"{i} Reviews , {i % 3} Followers" for i in range(n)],
+        "Time": [f"5/{i % 28 + 1}/2019 15:54" for i in range(n)],
+        "Pictures": [i % 2 for i in range(n)],
+    })
+
+
+def test_shard_by_restaurant_keeps_restaurants_together():
+    df = _raw_reviews()
+    shards = shard_by_restaurant(df, 3)
+    assert sum(len(s) for s in shards) == len(df)
+    seen = [set(s["Restaurant"].str.strip()) for s in shards]
+    for i, names in enumerate(seen):
+        for other in seen[i + 1:]:
+            assert not names & other
+
+
+def test_build_features_parallel_matches_serial():
+    serial = build_features(_raw_reviews(), n_jobs=1)
+    parallel = build_features(_raw_reviews(), n_jobs=3)
+    for expected, got in zip(serial, parallel):
+        pdt.assert_frame_equal(got, expected)
+
+
+def _package_copy(tmp_path: Path) -> None:
+    # a copy of the package, so the build writes under tmp_path (PATHS follow src/config.py)
+    shutil.copytree(ROOT / "src", tmp_path / "src", ignore=shutil.ignore_patterns("__pycache__"))
+    raw_dir = tmp_path / "data" / "raw"
+    raw_dir.mkdir(parents=True)
+    _raw_reviews().to_csv(raw_dir / "Restaurant reviews.csv", index=False)
+    delta = _raw_reviews().head(4).assign(Restaurant="G", Review="tasty food review")
+    delta.to_csv(tmp_path / "delta.csv", index=False)
+
+
+def test_full_build_after_delta_reuses_it_and_never_drops_appended_reviews(tmp_path):
+    _package_copy(tmp_path)
+    script = """
+import pandas as pd
+import pytest
+from src.config import PATHS
+from src.pipeline_build import main, update_incremental
+from src.review_store import count_reviews
+from src.utils import read_json
+
+main()
+n_reviews = count_reviews()
+update_incremental("delta.csv", max_vocab_drift=1.0)
+assert count_reviews() == n_reviews + 4
+main()
+stages = read_json(PATHS.BUILD_MANIFEST)["stages"]
+assert {s["status"] for s in stages.values()} == {"reused"}, stages
+assert count_reviews() == n_reviews + 4
+assert "G" in set(pd.read_parquet(PATHS.PROFILES_PARQUET)["Restaurant"])
+
+with PATHS.RAW_CSV.open("a", encoding="utf-8") as f:
+    f.write("H,u99,fine,4,1 Review,5/1/2019 15:54,0\\n")
+for force in (False, True):
+    with pytest.raises(RuntimeError, match="delta"):
+        main(force=force)
+assert count_reviews() == n_reviews + 4
+"""
+    result = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_ann_index_follows_delta_builds_and_enabled_modes(tmp_path):
+    _package_copy(tmp_path)
+
+    script = """
+import pandas as pd
+from src.ann import load_ivf_index, load_pq_index
+from src.generations import current_artifacts
+from src.pipeline_build import main, update_incremental
+from src.recommender import RecommenderEngine, load_model
+
+main(ann=True)
+update_incremental("delta.csv", max_vocab_drift=1.0, ann=True)
+a = current_artifacts()
+vectorizer, tfidf_matrix, index = load_model(a.tfidf_dir, a.restaurant_index)
+ivf = load_ivf_index(a.ann_dir)
+assert "G" in index and ivf.embeddings.shape[0] == tfidf_matrix.shape[0]
+assert index["G"] in set(ivf.list_ids.tolist())
+engine = RecommenderEngine(pd.read_parquet(a.profiles), tfidf_matrix, index, vectorizer=vectorizer, ann=ivf)
+assert engine.ann is ivf
+assert engine.similar("G", top_n=3)
+assert engine.from_preferences("tasty food", top_n=3)
+
+update_incremental("delta.csv", max_vocab_drift=1.0, ann=False)
+assert load_ivf_index(current_artifacts().ann_dir) is None
+
+main(ann=True)
+main(pq=True)
+assert load_ivf_index(current_artifacts().ann_dir) is None and load_pq_index(current_artifacts().ann_dir) is not None
+"""
+    result = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
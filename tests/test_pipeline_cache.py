@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from src.pipeline_cache import Stage, StageCache
+
+
+def test_stage_cache_skips_until_inputs_params_or_outputs_change(tmp_path):
+    src = tmp_path / "in.txt"
+    out = tmp_path / "out.txt"
+    manifest = tmp_path / "manifest.json"
+    src.write_text("a")
+    runs = []
+
+    def build() -> None:
+        runs.append(1)
+        out.write_text(src.read_text().upper())
+
+    def run(params) -> bool:
+        cache = StageCache(manifest, root=tmp_path)
+        return cache.run(Stage("upper", [src], [out], params=params), build)
+
+    assert run({"k": 1}) is True
+    assert run({"k": 1}) is False
+    assert run({"k": 2}) is True
+
+    src.write_text("b")
+    assert run({"k": 2}) is True
+
+    out.write_text("tampered")
+    assert run({"k": 2}) is True
+    assert out.read_text() == "B"
+
+    cache = StageCache(manifest, root=tmp_path, force=True)
+    assert cache.run(Stage("upper", [src], [out], params={"k": 2}), build) is True
+    assert len(runs) == 5
+    assert cache.stages["upper"]["status"] == "built"
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from src.components import plotting
+
+
+def test_figure_cache_prerendered_lru_and_closed_figures(tmp_path, monkeypatch):
+    aggregates = {
+        "data_version": "v1",
+        "mean_rating": 3.5,
+        "rating_histogram": {"counts": [1, 0, 2, 5], "edges": [1.0, 2.0, 3.0, 4.0, 5.0]},
+        "top_restaurants": {"Restaurant": ["A", "B", "C"], "num_reviews": [9, 5, 2]},
+    }
+    written = plotting.prerender_eda_figures(aggregates, tmp_path, top_ns=(2, 3))
+    assert len(written) == 3 and all(p.read_bytes().startswith(b"\x89PNG") for p in written)
+    assert plt.get_fignums() == []
+
+    plotting._FIGURES.clear()
+    top = pd.DataFrame(aggregates["top_restaurants"]).head(2)
+
+    def no_plotting(*args, **kwargs):
+        raise AssertionError("figure should come from the pre-rendered file or the LRU")
+
+    monkeypatch.setattr(plotting, "plot_top_restaurants_by_reviews", no_plotting)
+    image = plotting.top_restaurants_image(top, top_n=2, version="v1", figure_dir=tmp_path)
+    assert image == written[1].read_bytes()
+    written[1].unlink()
+    assert plotting.top_restaurants_image(top, top_n=2, version="v1", figure_dir=tmp_path) == image
+    monkeypatch.undo()
+
+    # a new data version renders again, once, in the requested format
+    svg = plotting.top_restaurants_image(top, top_n=2, version="v2", fmt="svg", figure_dir=tmp_path)
+    assert svg.lstrip().startswith(b"<?xml") and plt.get_fignums() == []
+    assert plotting.data_version(top) != plotting.data_version(top.head(1))
@@ -2,7 +2,13 @@ from __future__ import annotations
 
 import pandas as pd
 
-from src.preprocessing import preprocess_reviews
+from src.preprocessing import (
+    _clean_text,
+    _parse_metadata,
+    clean_text_series,
+    parse_metadata_series,
+    preprocess_reviews,
+)
 
 
 def test_preprocess_reviews_basic():
@@ -22,4 +28,24 @@ def test_preprocess_reviews_basic():
     assert out["Rating"].dtype.kind in ("i", "f")
     assert "reviewer_total_reviews" in out.columns
     assert "reviewer_followers" in out.columns
-    assert out.shape[0] == 2
\ No newline at end of file
+    assert out.shape[0] == 2
+
+
+def test_vectorized_cleaning_matches_scalar_functions():
+    texts = pd.Series([
+        "  Great food!  ",
+        "see http://x.y/z\xa0and www.example.com now",
+        "tabs\t\tand\nnewlines\x00\x01 here\x85",
+        "\u3000wide\u2009spaces\u3000",
+        "",
+    ], index=[10, 11, 12, 13, 14])
+    assert clean_text_series(texts).tolist() == texts.map(_clean_text).tolist()
+
+    meta = pd.Series(["1 Review , 2 Followers", "3 reviews", None, float("nan"), "٣ Reviews , 0012 Followers", "x"])
+    parsed = parse_metadata_series(meta)
+    assert parsed["reviewer_total_reviews"].dtype == "Int32"
+    for (reviews, followers), got_r, got_f in zip(
+        meta.map(_parse_metadata), parsed["reviewer_total_reviews"], parsed["reviewer_followers"]
+    ):
+        assert (got_r is pd.NA) if reviews is None else got_r == reviews
+        assert (got_f is pd.NA) if followers is None else got_f == followers
@@ -1,8 +1,28 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import normalize
 
-from src.recommender import train_tfidf, recommend_from_preferences
+from src.ann import build_ivf_index, build_pq_index, fit_svd_embeddings
+from src.recommender import (
+    RecommenderEngine,
+    build_neighbor_table,
+    build_top_terms_table,
+    load_model,
+    load_top_terms,
+    patch_tfidf_rows,
+    recommend_from_preferences,
+    recommend_from_preferences_batch,
+    recommend_similar_restaurants,
+    save_model,
+    save_top_terms,
+    top_terms,
+    train_model,
+    train_tfidf,
+    update_neighbor_table,
+)
 
 
 def test_recommend_from_preferences_runs():
@@ -21,4 +41,377 @@ def test_recommend_from_preferences_runs():
 
     recs = recommend_from_preferences("spicy chicken", profiles, vectorizer, tfidf_matrix, index, top_n=2)
     assert len(recs) == 2
-    assert recs[0].restaurant in {"A", "B", "C"}
\ No newline at end of file
+    assert recs[0].restaurant in {"A", "B", "C"}
+
+
+def test_recommend_similar_restaurants_excludes_seed_and_ranks():
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "corpus": ["spicy chicken rice", "spicy chicken curry", "romantic wine ambience", "quick lunch cheap"],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+
+    profiles = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "avg_rating": [4.5, 4.0, 3.8, 4.1],
+        "num_reviews": [100, 50, 30, 10],
+        "sample_review": ["a", "b", "c", "d"],
+    })
+
+    engine = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer)
+    recs = recommend_similar_restaurants("A", profiles, tfidf_matrix, index, top_n=10)
+    assert [r.restaurant for r in recs] == [r.restaurant for r in engine.similar("A", top_n=10)]
+    assert len(recs) == 3
+    assert "A" not in {r.restaurant for r in recs}
+    assert recs[0].restaurant == "B"
+    assert [r.final_score for r in recs] == sorted((r.final_score for r in recs), reverse=True)
+
+
+def test_recommend_from_preferences_batch_matches_single():
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "corpus": ["spicy chicken rice", "spicy chicken curry", "romantic wine ambience", "quick lunch cheap"],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "avg_rating": [4.5, 4.0, 3.8, 4.1],
+        "num_reviews": [100, 50, 30, 10],
+    })
+
+    queries = ["spicy chicken", "wine ambience", "cheap lunch", "nothing matches here"]
+    batch = recommend_from_preferences_batch(queries, profiles, vectorizer, tfidf_matrix, index, top_n=3)
+    assert len(batch) == len(queries)
+    for q, recs in zip(queries, batch):
+        single = recommend_from_preferences(q, profiles, vectorizer, tfidf_matrix, index, top_n=3)
+        assert recs == single
+
+
+def test_neighbor_table_matches_full_scan():
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D", "E", "F"],
+        "corpus": [
+            "spicy chicken rice",
+            "spicy chicken curry",
+            "romantic wine ambience",
+            "wine and cheese",
+            "quick lunch cheap",
+            "cheap chicken lunch",
+        ],
+    })
+    _, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D", "E", "F"],
+        "avg_rating": [4.5, 4.0, 3.8, 4.1, 4.9, 2.0],
+        "num_reviews": [100, 50, 30, 10, 80, 5],
+    })
+
+    ids, scores = build_neighbor_table(tfidf_matrix, k=2, block_size=4)
+    assert ids.dtype == np.int32 and scores.dtype == np.float32
+    assert ids.shape == (6, 2)
+    assert all(i not in row for i, row in enumerate(ids))
+
+    full = RecommenderEngine(profiles, tfidf_matrix, index)
+    table = RecommenderEngine(profiles, tfidf_matrix, index, neighbors=(ids, scores))
+    for seed in profiles["Restaurant"]:
+        for top_n in (1, 3, 10):
+            expected = [r.restaurant for r in full.similar(seed, top_n=top_n)]
+            assert [r.restaurant for r in table.similar(seed, top_n=top_n)] == expected
+
+
+def test_inverted_index_path_matches_dense_scoring():
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D", "E"],
+        "corpus": [
+            "spicy chicken rice",
+            "spicy chicken curry",
+            "romantic wine ambience",
+            "wine and cheese",
+            "quick lunch cheap",
+        ],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": ["E", "D", "C", "B", "A", "Z"],
+        "avg_rating": [4.9, 4.1, 3.8, 4.0, 4.5, 5.0],
+        "num_reviews": [80, 10, 30, 50, 100, 1],
+    })
+
+    engine = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer)
+    assert engine.inverted_index is not None
+    for q in ["spicy chicken", "wine", "cheap lunch", "no matching terms"]:
+        for top_n in (1, 3, 10):
+            assert engine.from_preferences(q, top_n=top_n) == engine.from_preferences_batch([q], top_n=top_n)[0]
+
+
+def test_update_neighbor_table_matches_rebuild():
+    rng = np.random.default_rng(3)
+    matrix = normalize(sparse.random(60, 40, density=0.2, format="csr", random_state=rng))
+    ids, scores = build_neighbor_table(matrix, k=5)
+
+    changed = np.array([4, 17, 60, 61])
+    new_rows = normalize(sparse.random(len(changed), 40, density=0.2, format="csr", random_state=rng))
+    patched = patch_tfidf_rows(matrix, changed, new_rows)
+    assert patched.shape == (62, 40)
+    assert abs(patched[changed] - new_rows).max() == 0
+    assert abs(patched[:4] - matrix[:4]).max() == 0
+
+    expected_ids, expected_scores = build_neighbor_table(patched, k=5)
+    got_ids, got_scores = update_neighbor_table(patched, ids, scores, changed, k=5, block_size=7)
+    np.testing.assert_array_equal(got_ids, expected_ids)
+    np.testing.assert_allclose(got_scores, expected_scores, rtol=1e-6)
+
+
+def test_ann_path_matches_exact_when_probing_everything():
+    rng = np.random.default_rng(5)
+    words = [f"w{i}" for i in range(60)]
+    names = [f"R{i:02d}" for i in range(40)]
+    corpus = pd.DataFrame({
+        "Restaurant": names,
+        "corpus": [" ".join(rng.choice(words, 30)) for _ in names],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": names,
+        "avg_rating": rng.uniform(1, 5, len(names)).round(1),
+        "num_reviews": rng.integers(1, 100, len(names)),
+    })
+
+    ann = build_ivf_index(*fit_svd_embeddings(tfidf_matrix, n_components=8), n_lists=5)
+    assert sorted(ann.list_ids.tolist()) == list(range(len(names)))
+
+    exact = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer)
+    approx = RecommenderEngine(
+        profiles, tfidf_matrix, index, vectorizer=vectorizer, ann=ann, ann_nprobe=5, ann_candidates=len(names)
+    )
+    for seed in ["R03", "R17"]:
+        assert approx.similar(seed, top_n=5) == exact.similar(seed, top_n=5)
+    query = " ".join(words[:5])
+    assert approx.from_preferences(query, top_n=5) == exact.from_preferences(query, top_n=5)
+    assert approx.from_preferences_batch([query], top_n=5) == exact.from_preferences_batch([query], top_n=5)
+
+    # an index built before the last restaurant was added is ignored rather than indexed out of range
+    stale = build_ivf_index(*fit_svd_embeddings(tfidf_matrix[:-1], n_components=8), n_lists=5)
+    fallback = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer, ann=stale)
+    assert fallback.ann is None and fallback.is_stale(stale)
+    assert fallback.similar("R39", top_n=5) == exact.similar("R39", top_n=5)
+
+
+def test_pq_codes_approximate_embeddings_and_rerank_exactly():
+    rng = np.random.default_rng(7)
+    words = [f"w{i}" for i in range(80)]
+    names = [f"R{i:02d}" for i in range(60)]
+    corpus = pd.DataFrame({"Restaurant": names, "corpus": [" ".join(rng.choice(words, 30)) for _ in names]})
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": names,
+        "avg_rating": rng.uniform(1, 5, len(names)).round(1),
+        "num_reviews": rng.integers(1, 100, len(names)),
+    })
+
+    components_t, embeddings = fit_svd_embeddings(tfidf_matrix, n_components=12)
+    pq = build_pq_index(components_t, embeddings, n_subspaces=5, n_codewords=16)
+    assert pq.codes.dtype == np.uint8 and pq.codes.shape == (len(names), 5)
+
+    # ADC scores match inner products with the reconstructed vectors
+    query = embeddings[0]
+    n_sub, _, sub_dims = pq.codebooks.shape
+    reconstructed = pq.codebooks[np.arange(n_sub), pq.codes].reshape(len(names), n_sub * sub_dims)[:, :12]
+    np.testing.assert_allclose(pq.scores(query), reconstructed @ query, rtol=1e-5, atol=1e-6)
+
+    exact = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer)
+    compact = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer, pq=pq, ann_candidates=len(names))
+    # the first stage replaces the inverted index, so no CSC copy of the matrix is held
+    assert exact.inverted_index is not None and compact.inverted_index is None
+    assert compact.similar("R05", top_n=5) == exact.similar("R05", top_n=5)
+    query_text = " ".join(words[:6])
+    assert compact.from_preferences(query_text, top_n=5) == exact.from_preferences(query_text, top_n=5)
+
+    # codes built before a restaurant was added are ignored; scoring falls back to exact
+    stale = build_pq_index(components_t, embeddings[:-1], n_subspaces=5, n_codewords=16)
+    fallback = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer, pq=stale)
+    assert fallback.pq is None and fallback.is_stale(stale)
+    assert fallback.from_preferences(query_text, top_n=5) == exact.from_preferences(query_text, top_n=5)
+
+
+def test_hashing_model_matches_sklearn_and_streams(tmp_path):
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+    from src.hashing_model import HashingTfidf
+
+    texts = [
+        "spicy chicken rice", "spicy chicken curry", "romantic wine ambience",
+        "quick lunch cheap", "cheap spicy noodles", "wine and cheese night",
+    ]
+    corpus = pd.DataFrame({"Restaurant": list("ABCDEF"), "corpus": texts})
+    params = {"lowercase": True, "stop_words": "english", "ngram_range": (1, 2)}
+    counts = HashingVectorizer(n_features=2**10, alternate_sign=False, norm=None, **params).transform(texts)
+    expected = TfidfTransformer().fit_transform(counts)
+
+    model = HashingTfidf(params, n_features=2**10)
+    for start in range(0, len(texts), 4):
+        model.partial_fit(texts[start:start + 4])
+    model.finalize()
+    assert abs(model.transform(texts) - expected).max() < 1e-12
+
+    corpus.to_parquet(tmp_path / "corpus.parquet", index=False, row_group_size=4)
+    vectorizer, tfidf_matrix, index = train_model(
+        tmp_path / "corpus.parquet", model_type="hashing", n_features=2**10, chunk_rows=4
+    )
+    assert abs(tfidf_matrix - expected).max() < 1e-12
+    top = np.argmax(tfidf_matrix[index["D"]].toarray().ravel())
+    assert set(vectorizer.feature_names([top])[0].split(" / ")) & {"quick", "lunch", "cheap", "quick lunch", "lunch cheap"}
+
+    save_model(vectorizer, tfidf_matrix, index, tmp_path / "tfidf", tmp_path / "index.json")
+    loaded, loaded_matrix, _ = load_model(tmp_path / "tfidf", tmp_path / "index.json")
+    assert abs(loaded_matrix - tfidf_matrix).max() == 0
+    assert abs(loaded.transform(["spicy wine"]) - vectorizer.transform(["spicy wine"])).max() == 0
+    assert list(loaded.feature_names([top])) == list(vectorizer.feature_names([top]))
+
+
+def test_hashing_labels_cover_precomputed_top_terms(tmp_path):
+    rng = np.random.default_rng(3)
+    words = [f"word{i}" for i in range(300)]
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C"],
+        "corpus": [" ".join(rng.choice(words, 200)) for _ in range(3)],
+    })
+    corpus.to_parquet(tmp_path / "corpus.parquet", index=False)
+    vectorizer, tfidf_matrix, index = train_model(tmp_path / "corpus.parquet", model_type="hashing", n_features=2**12)
+
+    # rows hold far more terms than the Insights slider shows; all precomputed ones get a label
+    assert min(np.diff(tfidf_matrix.indptr)) > 50
+    table = build_top_terms_table(vectorizer, tfidf_matrix, index, k=50)
+    assert len(table) == 150 and not table["keyword"].str.startswith("#").any()
+
+
+def test_streamed_tfidf_matches_in_memory_training(tmp_path):
+    words = ["spicy", "chicken", "rice", "curry", "wine", "romantic", "cheap", "lunch", "quick", "naïve", "café"]
+    rng = np.random.default_rng(0)
+    corpus = pd.DataFrame({
+        "Restaurant": [f"R{i:02d}" for i in range(30)],
+        "corpus": [" ".join(rng.choice(words, size=rng.integers(1, 12))) for _ in range(30)],
+    })
+    corpus.to_parquet(tmp_path / "corpus.parquet", index=False, row_group_size=7)
+
+    expected_vec, expected_matrix, expected_index = train_tfidf(corpus)
+    vectorizer, tfidf_matrix, index = train_model(tmp_path / "corpus.parquet", model_type="tfidf", chunk_rows=7)
+
+    assert index == expected_index
+    assert list(vectorizer.get_feature_names_out()) == list(expected_vec.get_feature_names_out())
+    assert np.array_equal(vectorizer.idf_, expected_vec.idf_)
+    assert abs(tfidf_matrix - expected_matrix).max() < 1e-12
+    assert abs(vectorizer.transform(["spicy café lunch"]) - expected_vec.transform(["spicy café lunch"])).max() < 1e-12
+
+
+def test_result_cache_lru_ttl_and_version(monkeypatch):
+    import src.cache
+
+    cache = src.cache.ResultCache(max_size=2, ttl=10)
+    now = [0.0]
+    monkeypatch.setattr(src.cache.time, "monotonic", lambda: now[0])
+    cache.put("a", 1, version="v1")
+    cache.put("b", 2, version="v1")
+    assert cache.get("a", "v1") == 1
+    cache.put("c", 3, version="v1")  # evicts "b", the least recently used
+    assert cache.get("b", "v1") is None
+    now[0] = 11.0
+    assert cache.get("a", "v1") is None  # expired
+    cache.put("a", 1, version="v1")
+    assert cache.get("a", "v2") is None  # new artifact version empties the cache
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_preference_results_are_cached_by_normalized_query(monkeypatch):
+    import src.recommender as reco
+
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C"],
+        "corpus": ["spicy chicken rice", "romantic wine ambience", "quick lunch cheap"],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": ["A", "B", "C"],
+        "avg_rating": [4.5, 4.0, 3.8],
+        "num_reviews": [100, 50, 30],
+    })
+    monkeypatch.setattr(reco, "artifact_version", lambda: "v1")
+
+    first = recommend_from_preferences("Spicy chicken", profiles, vectorizer, tfidf_matrix, index, top_n=2)
+    before = reco.cache_stats()
+    again = recommend_from_preferences("  the SPICY   chicken ", profiles, vectorizer, tfidf_matrix, index, top_n=2)
+    assert again == first
+    assert reco.cache_stats()["results"]["hits"] == before["results"]["hits"] + 1
+
+    wider = recommend_from_preferences("spicy chicken", profiles, vectorizer, tfidf_matrix, index, top_n=3)
+    assert wider[:2] == first
+    assert reco.cache_stats()["query_vectors"]["hits"] == before["query_vectors"]["hits"] + 1
+
+    monkeypatch.setattr(reco, "artifact_version", lambda: "v2")
+    recommend_from_preferences("spicy chicken", profiles, vectorizer, tfidf_matrix, index, top_n=2)
+    assert reco.cache_stats()["results"]["hits"] == before["results"]["hits"] + 1
+
+
+def test_alternating_recommenders_share_one_engine_and_cache(monkeypatch):
+    import src.recommender as reco
+
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "corpus": ["spicy chicken rice", "spicy chicken curry", "romantic wine ambience", "quick lunch cheap"],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "avg_rating": [4.5, 4.0, 3.8, 4.2],
+        "num_reviews": [100, 50, 30, 70],
+    })
+    neighbors = build_neighbor_table(tfidf_matrix, k=2)
+    monkeypatch.setattr(reco, "artifact_version", lambda: "v1")
+
+    similar = recommend_similar_restaurants("A", profiles, tfidf_matrix, index, top_n=2, neighbors=neighbors)
+    engine = reco._ENGINE
+    preferences = recommend_from_preferences("spicy chicken", profiles, vectorizer, tfidf_matrix, index, top_n=2)
+    assert reco._ENGINE is engine
+    assert engine.vectorizer is vectorizer and engine.neighbors is neighbors
+
+    before = reco.cache_stats()["results"]["hits"]
+    for _ in range(2):
+        assert recommend_similar_restaurants("A", profiles, tfidf_matrix, index, top_n=2, neighbors=neighbors) == similar
+        assert recommend_from_preferences("spicy chicken", profiles, vectorizer, tfidf_matrix, index, top_n=2) == preferences
+    assert reco._ENGINE is engine
+    assert reco.cache_stats()["results"]["hits"] == before + 4
+
+
+def test_top_terms_sparse_matches_dense_and_precomputed_lookup(tmp_path):
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C"],
+        "corpus": [
+            "spicy chicken rice spicy biryani rice chicken",
+            "romantic wine ambience wine pasta",
+            "quick lunch cheap rice",
+        ],
+    })
+    trained = train_tfidf(corpus)
+    save_model(*trained, model_dir=tmp_path / "tfidf", index_path=tmp_path / "index.json")
+    vectorizer, tfidf_matrix, index = load_model(tmp_path / "tfidf", tmp_path / "index.json")
+
+    for name, row in index.items():
+        dense = tfidf_matrix[row].toarray().ravel()
+        nonzero = np.flatnonzero(dense)
+        order = nonzero[np.lexsort((nonzero, -dense[nonzero]))][:4]
+        got = top_terms(name, vectorizer, tfidf_matrix, index, k=4)
+        assert got["keyword"].tolist() == list(vectorizer.feature_names(order))
+        np.testing.assert_allclose(got["tfidf_weight"], dense[order])
+        # the sklearn vectorizer from train_tfidf, before it is saved and memory-mapped
+        pd.testing.assert_frame_equal(top_terms(name, *trained, k=4), got, check_exact=False)
+
+    pd.testing.assert_frame_equal(
+        build_top_terms_table(*trained, k=5), build_top_terms_table(vectorizer, tfidf_matrix, index, k=5), check_exact=False
+    )
+
+    path = tmp_path / "top_terms.parquet"
+    save_top_terms(build_top_terms_table(vectorizer, tfidf_matrix, index, k=5), path, k=5)
+    looked_up = load_top_terms("A", path, k=3)
+    pd.testing.assert_frame_equal(looked_up, top_terms("A", vectorizer, tfidf_matrix, index, k=3))
+    assert load_top_terms("A", path, k=6) is None and load_top_terms("A", tmp_path / "missing.parquet") is None
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.review_store import (
+    append_clean_reviews,
+    column_range,
+    count_reviews,
+    read_clean_reviews,
+    read_review_text,
+    read_reviews,
+    review_files,
+    write_clean_reviews,
+)
+
+
+def _clean_reviews(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ratings = rng.choice([1.0, 2.0, 3.5, 4.0, 5.0, np.nan], size=n)
+    return pd.DataFrame({
+        "Restaurant": [f"R{i % 7}" for i in range(n)],
+        "Reviewer": [f"u{i % 11}" for i in range(n)],
+        "Review": [f"review {i}" for i in range(n)],
+        "Rating": ratings,
+        "Time": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 365, size=n), unit="D"),
+    })
+
+
+def test_layout_prunes_row_groups_and_projects_columns(tmp_path):
+    path, text_path = tmp_path / "clean.parquet", tmp_path / "text.parquet"
+    df = _clean_reviews(200)
+    assert write_clean_reviews([df], path, text_path, row_group_rows=16) == 200
+
+    metadata = pq.ParquetFile(path).metadata
+    rating = metadata.schema.names.index("Rating")
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(rating).statistics
+        assert not stats.has_min_max or stats.min == stats.max
+    assert pq.read_schema(path).field("Restaurant").type.value_type == "string"
+    assert "Review" not in pq.read_schema(path).names
+
+    high = read_reviews(["Restaurant", "Review", "Rating"], min_rating=4.0, path=path, text_path=text_path)
+    expected = df[df["Rating"] >= 4.0]
+    assert list(high.columns) == ["Restaurant", "Review", "Rating"]
+    assert sorted(high["Review"]) == sorted(expected["Review"])
+    assert (high["Rating"] >= 4.0).all() and high["Restaurant"].dtype == "category"
+    assert count_reviews(min_rating=4.0, path=path) == len(expected)
+    assert count_reviews(path=path) == 200
+
+    head = read_reviews(["Review", "Rating"], min_rating=3.5, max_rating=3.5, limit=5, path=path, text_path=text_path)
+    assert len(head) == 5 and (head["Rating"] == 3.5).all()
+    assert set(head["Review"]) <= set(df.loc[df["Rating"] == 3.5, "Review"])
+
+    since = read_reviews(["Time"], since="2019-07-01", path=path, text_path=text_path)
+    assert len(since) == (df["Time"] >= "2019-07-01").sum()
+    assert column_range("Time", path) == (df["Time"].min(), df["Time"].max())
+    assert read_review_text([199, 3, 3], text_path).to_pylist() == ["review 199", "review 3", "review 3"]
+
+
+def test_append_writes_sorted_parts_and_keeps_original_order(tmp_path):
+    path, text_path = tmp_path / "clean.parquet", tmp_path / "text.parquet"
+    df, delta, more = _clean_reviews(50), _clean_reviews(10, seed=1), _clean_reviews(5, seed=2)
+    delta["Review"] = [f"new {i}" for i in range(10)]
+    more["Review"] = [f"more {i}" for i in range(5)]
+    write_clean_reviews([df.iloc[:30], df.iloc[30:]], path, text_path, row_group_rows=8)
+    base, base_text = path.read_bytes(), text_path.read_bytes()
+    assert append_clean_reviews(delta, path, text_path, row_group_rows=8) == 60
+    assert append_clean_reviews(more, path, text_path, row_group_rows=8) == 65
+
+    # the existing files are left alone; each delta is its own pair of part files
+    assert path.read_bytes() == base and text_path.read_bytes() == base_text
+    assert [p.name for p in review_files(path)] == ["clean.parquet", "clean.part-0001.parquet", "clean.part-0002.parquet"]
+    delta_ratings = pq.read_table(review_files(path)[1], columns=["Rating"]).column("Rating").to_pandas()
+    assert delta_ratings.dropna().is_monotonic_increasing
+    for part in review_files(path):
+        metadata = pq.ParquetFile(part).metadata
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(metadata.schema.names.index("Rating")).statistics
+            assert not stats.has_min_max or stats.min == stats.max
+
+    both = pd.concat([df, delta, more], ignore_index=True)
+    pd.testing.assert_frame_equal(read_clean_reviews(path, text_path), both)
+    assert count_reviews(path=path) == 65
+    assert count_reviews(min_rating=4.0, path=path) == (both["Rating"] >= 4.0).sum()
+    high = read_reviews(["Review", "Rating"], min_rating=4.0, path=path, text_path=text_path)
+    assert sorted(high["Review"]) == sorted(both.loc[both["Rating"] >= 4.0, "Review"])
+    assert read_review_text([62, 0, 55], text_path).to_pylist() == ["more 2", "review 0", "new 5"]
+    assert column_range("Time", path) == (both["Time"].min(), both["Time"].max())
+
+    # a full write starts over
+    write_clean_reviews([df], path, text_path)
+    assert review_files(path) == [path] and review_files(text_path) == [text_path]
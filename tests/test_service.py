@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pandas as pd
+
+from src.recommender import recommend_from_preferences, recommend_similar_restaurants, train_tfidf
+from src.service import RecommendationService, ServiceArtifacts
+
+
+def _artifacts() -> ServiceArtifacts:
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "corpus": ["spicy chicken rice", "spicy chicken curry", "romantic wine ambience", "quick lunch cheap"],
+    })
+    vectorizer, tfidf_matrix, index = train_tfidf(corpus)
+    profiles = pd.DataFrame({
+        "Restaurant": ["A", "B", "C", "D"],
+        "avg_rating": [4.5, 4.0, 3.8, 4.1],
+        "num_reviews": [100, 50, 30, 10],
+        "sample_review": ["a", "b", "c", "d"],
+    })
+    return ServiceArtifacts(profiles, vectorizer, tfidf_matrix, index)
+
+
+async def _request(port: int, method: str, target: str, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    if b"text/plain" in head:
+        return int(head.split()[1]), data.decode()
+    return int(head.split()[1]), json.loads(data)
+
+
+def test_service_endpoints_match_recommender_and_batch_queries():
+    artifacts = _artifacts()
+
+    async def run():
+        service = RecommendationService(artifacts)
+        service.batcher.window = 0.05
+        await service.start("127.0.0.1", 0)
+        try:
+            port = service.port
+            similar = await _request(port, "GET", "/similar?restaurant=A&top_n=2")
+            texts = ["spicy chicken", "wine night", "cheap lunch", "spicy curry"]
+            concurrent = await asyncio.gather(
+                *(_request(port, "POST", "/recommend", {"text": t, "top_n": 3}) for t in texts)
+            )
+            batch = await _request(port, "POST", "/batch", {"queries": texts, "top_n": 3})
+            bad = await _request(port, "POST", "/recommend", {"text": "a"})
+            missing = await _request(port, "GET", "/nope")
+            metrics = await _request(port, "GET", "/metrics")
+            prometheus = await _request(port, "GET", "/metrics/prometheus")
+        finally:
+            await service.close()
+        return similar, concurrent, batch, bad, missing, metrics, prometheus
+
+    similar, concurrent, batch, bad, missing, metrics, prometheus = asyncio.run(run())
+    a = artifacts
+
+    expected = recommend_similar_restaurants("A", a.profiles_df, a.tfidf_matrix, a.index, top_n=2)
+    assert similar[0] == 200
+    assert [r["restaurant"] for r in similar[1]["results"]] == [r.restaurant for r in expected]
+
+    for text, (status, payload) in zip(["spicy chicken", "wine night", "cheap lunch", "spicy curry"], concurrent):
+        expected = recommend_from_preferences(text, a.profiles_df, a.vectorizer, a.tfidf_matrix, a.index, top_n=3)
+        assert status == 200
+        assert [r["restaurant"] for r in payload["results"]] == [r.restaurant for r in expected]
+    assert [[r["restaurant"] for r in recs] for recs in batch[1]["results"]] == [
+        [r["restaurant"] for r in payload["results"]] for _, payload in concurrent
+    ]
+
+    assert bad[0] == 400 and "longer" in bad[1]["error"]
+    assert missing[0] == 404
+    assert metrics[1]["micro_batches"]["max_size"] == 4
+    assert metrics[1]["endpoints"]["/recommend"]["count"] == 5
+    assert metrics[1]["instrumentation"]["phases"]["preferences_batch"]["count"] >= 1
+    assert prometheus[0] == 200
+    assert 'reco_http_requests_total{endpoint="/recommend",status="200"} 4' in prometheus[1]
+    assert 'reco_phase_seconds_count{phase="score"}' in prometheus[1]
+
+
+def test_malformed_request_line_gets_400_and_service_keeps_serving():
+    async def run():
+        service = RecommendationService(_artifacts())
+        await service.start("127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+            writer.write(b"GARBAGE\r\n\r\n")
+            await writer.drain()
+            garbage = await reader.read()
+            writer.close()
+            after = await _request(service.port, "GET", "/similar?restaurant=A&top_n=2")
+        finally:
+            await service.close()
+        return garbage, after
+
+    garbage, after = asyncio.run(run())
+    head, _, data = garbage.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400 Bad Request") and b"Connection: close" in head
+    assert json.loads(data) == {"error": "Malformed request"}
+    assert after[0] == 200
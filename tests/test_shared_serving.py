@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.generations import ArtifactSet, current_artifacts, publish_generation
+from src.recommender import (
+    RecommenderEngine,
+    build_neighbor_table,
+    load_model,
+    save_model,
+    save_neighbors,
+    train_tfidf,
+)
+import src.shared_serving as shared_serving
+from src.shared_serving import SharedArrays, SharedModelServer
+
+
+def _write_artifacts(tmp_path, corpus_texts):
+    """Build artifacts in a working dir and publish them as a generation under tmp_path/models."""
+    work = ArtifactSet.in_dir(tmp_path / "work")
+    names = [f"R{i}" for i in range(len(corpus_texts))]
+    vectorizer, tfidf_matrix, index = train_tfidf(pd.DataFrame({"Restaurant": names, "corpus": corpus_texts}))
+    save_model(vectorizer, tfidf_matrix, index, work.tfidf_dir, work.restaurant_index)
+    save_neighbors(*build_neighbor_table(tfidf_matrix, k=2), work.neighbor_ids, work.neighbor_scores)
+    pd.DataFrame({
+        "Restaurant": names,
+        "avg_rating": np.linspace(3.0, 5.0, len(names)),
+        "num_reviews": np.arange(10, 10 + len(names)),
+        "sample_review": [f"review {n} ✓" for n in names],
+    }).to_parquet(work.profiles, index=False)
+    publish_generation(work, models_dir=tmp_path / "models")
+    return current_artifacts(tmp_path / "models")
+
+
+def _expected_similar(artifacts, seed):
+    vectorizer, tfidf_matrix, index = load_model(artifacts.tfidf_dir, artifacts.restaurant_index)
+    engine = RecommenderEngine(pd.read_parquet(artifacts.profiles), tfidf_matrix, index)
+    return [r.restaurant for r in engine.similar(seed, top_n=2)]
+
+
+def _get(port, target):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", target)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_engine_from_shared_arrays_matches_original(tmp_path):
+    texts = ["spicy chicken rice", "spicy chicken curry", "romantic wine ambience", "quick lunch cheap", "wine bar"]
+    artifacts = _write_artifacts(tmp_path, texts)
+    vectorizer, tfidf_matrix, index = load_model(artifacts.tfidf_dir, artifacts.restaurant_index)
+    profiles = pd.read_parquet(artifacts.profiles)
+    engine = RecommenderEngine(profiles, tfidf_matrix, index, vectorizer=vectorizer)
+
+    shared = SharedArrays.create(engine.to_arrays(), name="test_reco_engine")
+    try:
+        attached = SharedArrays.attach(shared.layout)
+        copy = RecommenderEngine.from_arrays(attached.arrays, vectorizer=vectorizer)
+        for seed in index:
+            assert copy.similar(seed, top_n=3) == engine.similar(seed, top_n=3)
+        assert copy.from_preferences("spicy wine", top_n=4) == engine.from_preferences("spicy wine", top_n=4)
+        del copy
+        attached.close()
+    finally:
+        shared.close()
+        shared.shm.unlink()
+
+
+def test_workers_serve_and_hot_swap_generations(tmp_path):
+    first = _write_artifacts(tmp_path, ["spicy chicken rice", "spicy chicken curry", "romantic wine ambience", "quick lunch"])
+    server = SharedModelServer(n_workers=2, host="127.0.0.1", port=0, models_dir=tmp_path / "models")
+    server.start()
+    try:
+        status, payload = _get(server.port, "/similar?restaurant=R0&top_n=2")
+        before = _expected_similar(first, "R0")
+        assert status == 200 and [r["restaurant"] for r in payload["results"]] == before
+        assert payload["results"][0]["sample_review"] == f"review {before[0]} ✓"
+
+        # keep requests flowing while the new generation is published
+        second = _write_artifacts(tmp_path, ["spicy chicken rice", "romantic wine ambience", "spicy chicken curry", "quick lunch"])
+        statuses = []
+        stop = threading.Event()
+
+        def hammer():
+            while not stop.is_set():
+                statuses.append(_get(server.port, "/recommend?text=spicy+chicken&top_n=2")[0])
+
+        thread = threading.Thread(target=hammer)
+        thread.start()
+        assert server.swap() == 2
+        stop.set()
+        thread.join()
+        assert statuses and set(statuses) == {200}
+
+        after = _expected_similar(second, "R0")
+        assert after != before
+        for _ in range(4):
+            status, payload = _get(server.port, "/similar?restaurant=R0&top_n=2")
+            assert [r["restaurant"] for r in payload["results"]] == after
+        assert _get(server.port, "/metrics")[1]["generation"] == 2
+    finally:
+        server.stop()
+
+
+def test_failed_swap_keeps_serving_the_old_generation(tmp_path, monkeypatch):
+    first = _write_artifacts(tmp_path, ["spicy chicken rice", "spicy chicken curry", "romantic wine ambience", "quick lunch"])
+    server = SharedModelServer(n_workers=2, host="127.0.0.1", port=0, models_dir=tmp_path / "models")
+    server.start()
+    try:
+        load_engine_arrays = shared_serving.load_engine_arrays
+
+        def broken(artifacts):
+            arrays, params = load_engine_arrays(artifacts)
+            del arrays["names_blob"]  # the parent can publish it, workers cannot build an engine from it
+            return arrays, params
+
+        monkeypatch.setattr(shared_serving, "load_engine_arrays", broken)
+        assert server.swap() == 1
+        status, payload = _get(server.port, "/similar?restaurant=R0&top_n=2")
+        assert status == 200 and [r["restaurant"] for r in payload["results"]] == _expected_similar(first, "R0")
+        assert _get(server.port, "/metrics")[1]["generation"] == 1
+
+        monkeypatch.setattr(shared_serving, "load_engine_arrays", load_engine_arrays)
+        assert server.swap() == 2
+        assert _get(server.port, "/metrics")[1]["generation"] == 2
+    finally:
+        server.stop()
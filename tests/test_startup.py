@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.artifacts import vectorizer_params, word_analyzer
+from src.recommender import save_model, train_model, train_tfidf
+
+ROOT = Path(__file__).resolve().parents[1]
+DOCS = ["Spicy chicken & the BEST naïve café rice!", "a an the", "", "Crème brûlée—wine 2 go, wine bar"]
+
+
+def test_word_analyzer_matches_sklearn():
+    for params in (
+        {"lowercase": True, "stop_words": "english", "ngram_range": (1, 2)},
+        {"lowercase": False, "stop_words": None, "ngram_range": (2, 3), "strip_accents": "unicode"},
+        {"lowercase": True, "stop_words": ["wine"], "ngram_range": (1, 1), "strip_accents": "ascii"},
+    ):
+        vectorizer = TfidfVectorizer(**params)
+        analyze = word_analyzer(vectorizer_params(vectorizer))
+        expected = vectorizer.build_analyzer()
+        for doc in DOCS:
+            assert sorted(analyze(doc)) == sorted(expected(doc))
+
+
+def test_serving_path_does_not_import_sklearn_or_matplotlib(tmp_path):
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C"],
+        "corpus": ["spicy chicken rice", "romantic wine ambience", "quick lunch cheap"],
+    })
+    save_model(*train_tfidf(corpus), tmp_path / "tfidf", tmp_path / "index.json")
+    pd.DataFrame({"Restaurant": ["A", "B", "C"], "avg_rating": [4.5, 4.0, 3.8], "num_reviews": [100, 50, 30]}).to_parquet(
+        tmp_path / "profiles.parquet", index=False
+    )
+
+    script = f"""
+import json, sys
+from pathlib import Path
+import pandas as pd
+from src.recommender import RecommenderEngine, load_model
+import src.service, src.components.plotting
+
+root = Path({str(tmp_path)!r})
+vectorizer, tfidf_matrix, index = load_model(root / "tfidf", root / "index.json")
+engine = RecommenderEngine(pd.read_parquet(root / "profiles.parquet"), tfidf_matrix, index, vectorizer=vectorizer)
+top = engine.from_preferences("spicy chicken", top_n=1)[0].restaurant
+print(json.dumps({{"top": top, "heavy": sorted(m for m in ("sklearn", "matplotlib", "joblib") if m in sys.modules)}}))
+"""
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result == {"top": "A", "heavy": []}
+
+
+def test_plotting_does_not_import_the_recommender():
+    script = (
+        "import json, sys; import src.components.plotting; "
+        "print(json.dumps(sorted(m for m in ('scipy', 'src.recommender', 'src.ann') if m in sys.modules)))"
+    )
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def test_loading_a_hashing_model_does_not_import_sklearn(tmp_path):
+    corpus = pd.DataFrame({
+        "Restaurant": ["A", "B", "C"],
+        "corpus": ["spicy chicken rice", "romantic wine ambience", "quick lunch cheap"],
+    })
+    corpus.to_parquet(tmp_path / "corpus.parquet", index=False)
+    trained = train_model(tmp_path / "corpus.parquet", model_type="hashing", n_features=2**10)
+    save_model(*trained, tmp_path / "tfidf", tmp_path / "index.json")
+
+    script = f"""
+import json, sys
+from pathlib import Path
+from src.recommender import load_model, top_terms
+
+root = Path({str(tmp_path)!r})
+vectorizer, tfidf_matrix, index = load_model(root / "tfidf", root / "index.json")
+keywords = top_terms("A", vectorizer, tfidf_matrix, index, k=3)["keyword"].tolist()
+print(json.dumps({{"keywords": keywords, "sklearn": "sklearn" in sys.modules}}))
+"""
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result["sklearn"] is False and "spicy" in " / ".join(result["keywords"])